@@ -0,0 +1,227 @@
+"""
+대본 여러 개를 한 번에 넘버링하는 명령줄 도구. (Streamlit 없이)
+
+배역은 scan_candidates 결과 중 등장 횟수가 --min-count 이상인 이름을 쓴다.
+결과 PDF 와 manifest.json(사용한 배역, 번호 수, 소요 시간)을 --out 폴더에 쓰고,
+다시 실행하면 같은 내용(SHA-256)·같은 설정으로 이미 끝낸 파일은 건너뛴다.
+
+    python batch_numbering.py scripts/ "festival/**/*.pdf" --out numbered/ --style bracket --min-count 3 --workers 4
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import script_model
+from logic import analyze_and_get_coordinates, create_overlay_pdf, register_korean_font, scan_candidates
+from script_model import file_content_hash
+
+# 화면의 "이름 스타일" / "구분 기호" 선택지와 같은 설정
+NAME_STYLES = {
+    'none': None,
+    'bracket': r'^\s*\[(.+?)\]',
+    'paren': r'^\s*\((.+?)\)',
+    'angle': r'^\s*<(.+?)>',
+}
+MANIFEST_NAME = 'manifest.json'
+
+
+# ---------------------------------------------------------
+# 1. 입력 파일 모으기
+# ---------------------------------------------------------
+def collect_inputs(patterns, recursive=False):
+    """폴더 또는 glob 패턴 -> PDF 경로 목록 (중복 없이, 정렬)"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '**', '*.pdf') if recursive else os.path.join(pattern, '*.pdf')
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith('.pdf'):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def output_names(sources_by_digest, previous):
+    """
+    내용별 결과 파일 이름. 이전 실행(manifest)에서 정한 이름은 그대로 쓰고,
+    이름이 겹치면(이번 입력끼리 또는 이전 결과와) 해시 앞부분을 붙인다.
+    """
+    names = {}
+    used = {entry['output'] for entry in previous.values() if entry.get('output')}
+    stems = {}
+    for digest, sources in sources_by_digest.items():
+        if previous.get(digest, {}).get('output'):
+            names[digest] = previous[digest]['output']
+            continue
+        stem = os.path.splitext(os.path.basename(sources[0]))[0]
+        stems.setdefault(stem, []).append(digest)
+    for stem, digests in stems.items():
+        for digest in digests:
+            name = f"{stem}_넘버링.pdf"
+            if len(digests) > 1 or name in used:
+                name = f"{stem}_{digest[:8]}_넘버링.pdf"
+            names[digest] = name
+            used.add(name)
+    return names
+
+
+# ---------------------------------------------------------
+# 2. 파일 하나 처리 (워커 프로세스)
+# ---------------------------------------------------------
+def _init_worker():
+    # 워커 안에서 다시 페이지 병렬 파싱용 프로세스를 띄우지 않는다.
+    script_model.PARSE_WORKERS = 0
+
+
+def number_script(pdf_path, out_path, config, min_count, max_roles):
+    """[워커 프로세스] 배역 스캔 -> 좌표 분석 -> 번호 PDF 저장. manifest 항목 dict 를 돌려준다."""
+    timings = {}
+    t0 = time.perf_counter()
+    candidates = scan_candidates(pdf_path, config)
+    timings['scan'] = time.perf_counter() - t0
+
+    roles = [name for name, cnt in candidates if cnt >= min_count]
+    if max_roles: roles = roles[:max_roles]
+    result = {
+        'candidates': [[name, cnt] for name, cnt in candidates],
+        'roles': roles,
+        'pages': script_model.load_script(pdf_path, config.get('backend')).page_count,
+    }
+    if not roles:
+        result.update(status='error', error=f"등장 횟수 {min_count}회 이상인 배역이 없습니다.")
+        return result
+
+    t = time.perf_counter()
+    coords = analyze_and_get_coordinates(pdf_path, roles, config)
+    timings['coordinates'] = time.perf_counter() - t
+
+    # 다른 실행이 중간에 멈춰도 깨진 결과가 남지 않게 임시 파일에 쓴 뒤 바꾼다.
+    t = time.perf_counter()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(out_path), suffix='.tmp')
+    os.close(fd)
+    try:
+        create_overlay_pdf(pdf_path, tmp_path, coords, register_korean_font())
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+    timings['overlay'] = time.perf_counter() - t
+    timings['total'] = time.perf_counter() - t0
+
+    stamped = Counter(coord['role'] for coord in coords)
+    result.update(
+        status='done',
+        numbers=len(coords),
+        # 실제로 번호를 찍은 줄 수 (시작 위치, 배역 매칭 규칙이 반영된 값. 스캔 등장 횟수와 다를 수 있다)
+        role_lines={name: stamped[name] for name in roles},
+        timings_ms={stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+    )
+    return result
+
+
+# ---------------------------------------------------------
+# 3. manifest (이어서 하기)
+# ---------------------------------------------------------
+def load_manifest(path):
+    if not os.path.exists(path): return {'files': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_done(entry, settings, out_dir):
+    return (entry is not None and entry.get('status') == 'done' and entry.get('settings') == settings
+            and os.path.exists(os.path.join(out_dir, entry['output'])))
+
+
+# ---------------------------------------------------------
+# 4. 실행
+# ---------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="대본 PDF 일괄 넘버링")
+    parser.add_argument('inputs', nargs='+', help="PDF 가 있는 폴더 또는 glob 패턴 (예: 'scripts/**/*.pdf')")
+    parser.add_argument('--out', required=True, help="결과 PDF 와 manifest.json 을 쓸 폴더")
+    parser.add_argument('--style', choices=list(NAME_STYLES), default='none', help="이름 스타일")
+    parser.add_argument('--separator', default=None, help="구분 기호 (예: ':'). 없으면 공백 2칸/탭")
+    parser.add_argument('--min-count', type=int, default=3, help="배역으로 쓸 최소 등장 횟수")
+    parser.add_argument('--max-roles', type=int, default=0, help="배역 수 상한 (0 = 제한 없음)")
+    parser.add_argument('--backend', choices=list(script_model.BACKENDS), default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--recursive', action='store_true', help="폴더 입력의 하위 폴더까지")
+    parser.add_argument('--force', action='store_true', help="이미 끝낸 파일도 다시 처리")
+    args = parser.parse_args(argv)
+
+    config = {'wrapper_regex': NAME_STYLES[args.style], 'separator': args.separator or None}
+    if args.backend: config['backend'] = args.backend
+    # 결과에 영향을 주는 설정. 바뀌면 이미 끝낸 파일도 다시 처리한다.
+    settings = {'config': config, 'min_count': args.min_count, 'max_roles': args.max_roles}
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    sources_by_digest = {}
+    for path in collect_inputs(args.inputs, args.recursive):
+        sources_by_digest.setdefault(file_content_hash(path), []).append(path)
+    if not sources_by_digest:
+        print("처리할 PDF 가 없습니다.", file=sys.stderr)
+        return 2
+    names = output_names(sources_by_digest, manifest['files'])
+
+    todo = []
+    for digest, sources in sources_by_digest.items():
+        entry = manifest['files'].get(digest)
+        if not args.force and is_done(entry, settings, args.out):
+            entry['sources'] = sources
+            continue
+        todo.append(digest)
+    skipped = len(sources_by_digest) - len(todo)
+    print(f"PDF {len(sources_by_digest)}개 (건너뜀 {skipped}개, 처리 {len(todo)}개), 워커 {args.workers}개")
+
+    failed = 0
+    started = time.perf_counter()
+    # Streamlit 서버와 같은 이유로 fork 대신 spawn 을 쓴다.
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=ctx, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(number_script, sources_by_digest[digest][0], os.path.join(args.out, names[digest]),
+                        config, args.min_count, args.max_roles): digest
+            for digest in todo
+        }
+        for done_count, future in enumerate(as_completed(futures), 1):
+            digest = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+            entry.update(sources=sources_by_digest[digest], output=names[digest], settings=settings)
+            manifest['files'][digest] = entry
+            # 파일 하나 끝날 때마다 기록해 두어야 중간에 멈춰도 이어서 할 수 있다.
+            save_manifest(manifest, manifest_path)
+
+            label = os.path.basename(entry['sources'][0])
+            if entry['status'] == 'done':
+                print(f"[{done_count}/{len(todo)}] {label}: 배역 {len(entry['roles'])}명, 번호 {entry['numbers']}개, "
+                      f"{entry['timings_ms']['total'] / 1000:.1f}s")
+            else:
+                failed += 1
+                print(f"[{done_count}/{len(todo)}] {label}: 실패 - {entry['error']}", file=sys.stderr)
+
+    save_manifest(manifest, manifest_path)
+    print(f"완료 {len(todo) - failed}개, 실패 {failed}개, {time.perf_counter() - started:.1f}s -> {manifest_path}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
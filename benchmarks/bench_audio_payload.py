@@ -0,0 +1,123 @@
+"""
+연습 화면에서 상대 대사 음성 1건이 브라우저로 나가는 바이트 수 비교.
+기존: base64 로 인라인한 <audio> HTML 을 st.markdown 으로 매 rerun 전송
+현재: st.audio (미디어 파일 매니저의 내용 해시 URL 만 전송, 음성 파일은 URL 별로 한 번만 내려받음)
+
+연습 화면을 AppTest 로 그대로 돌리며 내 대사를 차례로 맞히고, --passes 만큼 처음으로 돌아가 반복한다.
+(같은 큐를 다시 듣는 상황 = 점프/재연습)
+
+    python benchmarks/bench_audio_payload.py [--cues 10] [--passes 2]
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import uuid
+
+from streamlit.proto.Markdown_pb2 import Markdown as MarkdownProto
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+import tts
+from logic import extract_script_data
+from sample_scripts import ROLES, STYLE_CONFIGS, make_sample_script
+
+PRACTICE_PAGE = os.path.join(ROOT, 'pages', '2_script_practice.py')
+MY_ROLE = '철수'
+
+
+def legacy_audio_html(audio_data, mime_type):
+    """비교 기준: 변경 전 get_audio_html 이 만들던 HTML 그대로."""
+    b64_audio = base64.b64encode(audio_data).decode()
+    unique_id = f"audio_{uuid.uuid4()}"
+    return f"""
+            <div style="margin-top: 5px; margin-bottom: 10px;">
+                <audio id="{unique_id}" controls autoplay playsinline style="width: 100%;">
+                    <source src="data:{mime_type};base64,{b64_audio}" type="{mime_type}">
+                </audio>
+                <script>
+                    // 로드 후 즉시 재생 시도 (브라우저 정책에 따라 막힐 수 있음)
+                    var audio = document.getElementById("{unique_id}");
+                    audio.volume = 1.0;
+                    var playPromise = audio.play();
+                    if (playPromise !== undefined) {{
+                        playPromise.catch(error => {{
+                            console.log("Autoplay blocked. User needs to click play.");
+                        }});
+                    }}
+                </script>
+            </div>
+        """
+
+
+def legacy_payload(audio_data, mime_type):
+    proto = MarkdownProto(body=legacy_audio_html(audio_data, mime_type), allow_html=True)
+    return proto.ByteSize()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cues', type=int, default=10)
+    parser.add_argument('--passes', type=int, default=2)
+    args = parser.parse_args()
+
+    tts.set_tts_provider(tts.StubTTSProvider(latency=0))
+    tts.set_audio_cache(tts.AudioCache(disk_dir=None))
+    mime_type = tts.get_tts_provider().mime_type
+
+    # 연습 화면은 매 rerun 마다 tts 에서 get_audio 를 새로 import 하므로 여기서 감싸 두면 된다.
+    played = []
+    original_get_audio = tts.get_audio
+
+    def recording_get_audio(*args, **kwargs):
+        audio_data = original_get_audio(*args, **kwargs)
+        played.append(audio_data)
+        return audio_data
+    tts.get_audio = recording_get_audio
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), 'bracket', pages=10)
+        script = extract_script_data(pdf_path, MY_ROLE, STYLE_CONFIGS['bracket'], allowed_roles=ROLES)
+        targets = [i for i, line in enumerate(script) if line['role'] == MY_ROLE and line['type'] == 'dialogue']
+
+        at = AppTest.from_file(PRACTICE_PAGE, default_timeout=120)
+        at.session_state['is_practice_started'] = True
+        at.session_state['script_data'] = script
+        at.session_state['my_role'] = MY_ROLE
+
+        cues = 0
+        legacy_bytes = 0
+        element_bytes = 0
+        media_bytes = 0
+        seen_urls = set()
+        for _ in range(args.passes):
+            at.session_state['current_index'] = 0
+            at.session_state['last_played_index'] = -1
+            for target in targets[:args.cues]:
+                del played[:]
+                at.run()
+                if at.exception:
+                    raise RuntimeError(at.exception)
+                for element, audio_data in zip(at.get('audio'), played):
+                    cues += 1
+                    legacy_bytes += legacy_payload(audio_data, mime_type)
+                    element_bytes += element.proto.ByteSize()
+                    # 같은 URL 은 브라우저가 한 번만 내려받는다.
+                    if element.proto.url not in seen_urls:
+                        seen_urls.add(element.proto.url)
+                        media_bytes += len(audio_data)
+                at.session_state['current_index'] = target + 1
+
+    if not cues:
+        print("재생된 큐 없음")
+        return
+    print(f"재생된 큐 {cues}개 (서로 다른 음성 {len(seen_urls)}개, {args.passes}회 반복)")
+    print(f"기존  base64 HTML  : rerun 당 {legacy_bytes / cues:10.0f} B, 합계 {legacy_bytes / 1024:9.1f} KB")
+    print(f"현재  st.audio     : rerun 당 {element_bytes / cues:10.0f} B, 합계 {element_bytes / 1024:9.1f} KB "
+          f"+ 음성 파일 {media_bytes / 1024:.1f} KB (URL 당 1회)")
+
+
+if __name__ == '__main__':
+    main()
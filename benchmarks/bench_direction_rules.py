@@ -0,0 +1,154 @@
+"""
+지문 판단: 기존 is_likely_direction(줄마다 키워드 목록을 도는 방식) vs direction_rules(규칙 묶음별 정규식, 페이지 단위 일괄 분류)
+
+1) 일치: 정답 말뭉치(direction_corpus.tsv)와 무작위로 섞은 줄에서 두 방식의 판단이 모두 같은지 (다르면 실패)
+2) 정확도: 말뭉치 정답 대비 정확도, 지문 정밀도/재현율 (--errors 면 틀린 줄 목록)
+3) 처리량: 말뭉치를 페이지(--page-lines 줄) 단위로 반복해 초당 분류 줄 수
+
+    python benchmarks/bench_direction_rules.py [--lines 200000] [--page-lines 40] [--errors]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from direction_rules import classify_lines, is_direction
+from sample_scripts import DIRECTIONS, SPEECHES
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'direction_corpus.tsv')
+FUZZ_ALPHABET = "다함음장가나 ()막사이퇴등암커튼콜그리고런데하지만우는내의.!?a1\t"
+
+
+def legacy_is_likely_direction(line_text, is_speaking):
+    """비교 기준: 변경 전 _iter_script_entries 안의 is_likely_direction 그대로."""
+    line_text = line_text.strip()
+    if not line_text: return False
+    if line_text.startswith('(') and line_text.endswith(')'): return True
+    keywords = ["사이", "퇴장", "등장", "암전", "막", "커튼콜"]
+    for kw in keywords:
+        if kw in line_text and len(line_text) < 15: return True
+    first_person_keywords = ["나 ", "나는", "내가", "나의", "내 ", "우리는", "우리가"]
+    for kw in first_person_keywords:
+        if line_text.startswith(kw): return False
+    conjunctions = ["그리고", "그런데", "하지만", "그렇게", "그래서", "그러자", "또한"]
+    for conj in conjunctions:
+        if line_text.startswith(conj): return False
+    if len(line_text) > 35: return False
+    clean_end = re.sub(r'[^가-힣]', '', line_text[-5:])
+    ends_with_jimum = clean_end.endswith('다') or clean_end.endswith('함') or clean_end.endswith('음') or clean_end.endswith('장')
+    if ends_with_jimum:
+        if not is_speaking:
+            return True
+        return len(line_text) < 20
+    return False
+
+
+def load_corpus(path=CORPUS_PATH):
+    """[(말하는 중인지, 정답이 지문인지, 줄)]"""
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'): continue
+            situation, label, text = line.split('\t', 2)
+            rows.append((situation == 'speaking', label == '지문', text))
+    return rows
+
+
+def fuzz_lines(rnd, n):
+    """규칙 경계(길이 15/20/35, 괄호, 끝 5글자)를 자주 건드리는 무작위 줄"""
+    return [''.join(rnd.choice(FUZZ_ALPHABET) for _ in range(rnd.randint(0, 40))) for _ in range(n)]
+
+
+def check_parity(lines):
+    """두 방식의 판단이 다른 (줄, 말하는 중인지) 목록"""
+    mismatches = []
+    for line, verdict in zip(lines, classify_lines(lines)):
+        for is_speaking in (False, True):
+            if legacy_is_likely_direction(line, is_speaking) != is_direction(verdict, is_speaking):
+                mismatches.append((line, is_speaking))
+    return mismatches
+
+
+def accuracy(corpus):
+    verdicts = classify_lines([text for _, _, text in corpus])
+    tp = fp = fn = tn = 0
+    errors = []
+    for (is_speaking, truth, text), verdict in zip(corpus, verdicts):
+        predicted = is_direction(verdict, is_speaking)
+        if predicted and truth: tp += 1
+        elif predicted: fp += 1
+        elif truth: fn += 1
+        else: tn += 1
+        if predicted != truth: errors.append((text, is_speaking, truth))
+    return {
+        'accuracy': (tp + tn) / len(corpus),
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'errors': errors,
+    }
+
+
+def throughput(pages, rounds=3):
+    """(기존 초, 일괄 초) 최소값. 말하는 중 여부는 줄마다 번갈아 준다."""
+    def run_legacy():
+        for page in pages:
+            for k, line in enumerate(page):
+                legacy_is_likely_direction(line, k % 2 == 1)
+
+    def run_batch():
+        for page in pages:
+            for k, verdict in enumerate(classify_lines(page)):
+                is_direction(verdict, k % 2 == 1)
+
+    best = []
+    for fn in (run_legacy, run_batch):
+        elapsed = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            fn()
+            t = time.perf_counter() - t0
+            elapsed = t if elapsed is None else min(elapsed, t)
+        best.append(elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=200000, help="처리량 측정에 쓸 줄 수")
+    parser.add_argument('--page-lines', type=int, default=40, help="페이지 하나의 줄 수")
+    parser.add_argument('--fuzz', type=int, default=50000, help="일치 검사에 더할 무작위 줄 수")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--errors', action='store_true', help="정답과 다르게 판단한 줄 출력")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    corpus = load_corpus()
+    texts = [text for _, _, text in corpus] + SPEECHES + DIRECTIONS
+
+    mismatches = check_parity(texts + fuzz_lines(rnd, args.fuzz))
+    if mismatches:
+        for line, is_speaking in mismatches[:20]:
+            print(f"불일치: {line!r} (말하는 중={is_speaking})")
+        sys.exit(f"기존 방식과 판단이 다른 줄 {len(mismatches)}개")
+
+    stats = accuracy(corpus)
+    print(f"말뭉치 {len(corpus)}줄 (지문 {sum(truth for _, truth, _ in corpus)}줄), 기존 방식과 판단 일치 (무작위 {args.fuzz}줄 포함)")
+    print(f"정확도 {stats['accuracy']:.1%}  지문 정밀도 {stats['precision']:.1%}  재현율 {stats['recall']:.1%}  (틀린 줄 {len(stats['errors'])}개)")
+    if args.errors:
+        for text, is_speaking, truth in stats['errors']:
+            print(f"  정답 {'지문' if truth else '대사'} / {'말하는 중' if is_speaking else '장면 시작'}: {text}")
+
+    lines = [rnd.choice(texts) for _ in range(args.lines)]
+    pages = [lines[k:k + args.page_lines] for k in range(0, len(lines), args.page_lines)]
+    legacy, batch = throughput(pages)
+    print(f"처리량 ({len(lines)}줄, 페이지당 {args.page_lines}줄)")
+    print(f"  기존 (줄마다 키워드 목록) : {len(lines) / legacy:12,.0f} 줄/초")
+    print(f"  규칙 컴파일 + 페이지 일괄 : {len(lines) / batch:12,.0f} 줄/초  ({legacy / batch:.1f}배)")
+
+
+if __name__ == '__main__':
+    main()
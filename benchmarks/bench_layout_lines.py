@@ -0,0 +1,76 @@
+"""
+자동(공백 2칸/탭) 모드의 줄/이름 경계: pdfplumber extract_text(layout=True) + '\\s{2,}|\\t' 분리 vs 단어 좌표(layout_lines)
+
+1) 일치: 샘플 대본(모든 형식)에서 layout 텍스트의 빈 줄이 아닌 줄(앞뒤 공백 제거)과
+   layout_lines 의 줄, 그리고 이름/대사 분리 결과가 모두 같은지 (다르면 실패)
+2) 시간: 글자 목록(page.chars)은 두 방식이 함께 쓰므로 미리 읽어 두고, 그 뒤 페이지당 ms
+3) 크기: 페이지당 만들어지는 문자열 글자 수
+
+    python benchmarks/bench_layout_lines.py [--pages 10]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+import pdfplumber
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from script_model import chars_to_words, layout_lines
+from sample_scripts import STYLE_CONFIGS, make_sample_script
+
+AUTO_SPLIT = re.compile(r'\s{2,}|\t')
+
+
+def legacy_lines(page):
+    """변경 전 방식: layout 텍스트 -> (줄 목록, [(이름, 대사) 또는 None], 만든 문자열 글자 수)"""
+    text = page.extract_text(layout=True) or ""
+    lines = [line.strip() for line in text.split('\n')]
+    lines = [line for line in lines if line]
+    splits = []
+    for line in lines:
+        parts = AUTO_SPLIT.split(line, maxsplit=1)
+        splits.append((parts[0].strip(), parts[1].strip()) if len(parts) == 2 else None)
+    return lines, splits, len(text)
+
+
+def geometry_lines(page):
+    lines, name_ends = layout_lines(chars_to_words(page.chars, keep_blank_chars=False))
+    splits = [(line[:end], line[end:].strip()) if end else None for line, end in zip(lines, name_ends)]
+    return lines, splits, sum(len(line) for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=10)
+    args = parser.parse_args()
+
+    totals = {'legacy': [0.0, 0], 'geometry': [0.0, 0]}
+    n_pages = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, style in enumerate(STYLE_CONFIGS):
+            pdf_path = make_sample_script(os.path.join(tmp_dir, f"{style}.pdf"), style, pages=args.pages, seed=i, cast=20)
+            with pdfplumber.open(pdf_path) as pdf:
+                for page in pdf.pages:
+                    page.chars  # 글자 목록은 두 방식 공통이므로 측정에서 뺀다.
+                    results = {}
+                    for name, fn in (('legacy', legacy_lines), ('geometry', geometry_lines)):
+                        t0 = time.perf_counter()
+                        results[name] = fn(page)
+                        totals[name][0] += time.perf_counter() - t0
+                        totals[name][1] += results[name][2]
+                    if results['legacy'][:2] != results['geometry'][:2]:
+                        sys.exit(f"{style} {page.page_number}쪽: layout 텍스트와 줄/이름 분리가 다릅니다.")
+                    n_pages += 1
+
+    print(f"샘플 대본 {len(STYLE_CONFIGS)}개 형식, {n_pages}쪽: 줄과 이름/대사 분리 모두 일치")
+    for name, label in (('legacy', 'layout=True + 정규식 분리'), ('geometry', '단어 좌표 (layout_lines)')):
+        elapsed, size = totals[name]
+        print(f"  {label:24s}: {elapsed / n_pages * 1000:6.2f} ms/쪽, 문자열 {size / n_pages:8,.0f}자/쪽")
+    print(f"  -> {totals['legacy'][0] / totals['geometry'][0]:.1f}배 빠름, 문자열 {totals['legacy'][1] / totals['geometry'][1]:.1f}배 작음")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+넘버링 PDF 생성 시간/용량 비교: 기존 ReportLab 임시 오버레이 방식 vs PyMuPDF 직접 기록.
+
+    python benchmarks/bench_overlay.py [--pages 150] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from logic import analyze_and_get_coordinates, create_overlay_pdf, register_korean_font, scan_candidates
+from sample_scripts import STYLE_CONFIGS, make_sample_script
+
+
+def legacy_create_overlay_pdf(original_pdf_path, output_path, coordinates, font_name):
+    """비교 기준: 변경 전 create_overlay_pdf 구현 그대로."""
+    if font_name != "Helvetica":
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        pdfmetrics.registerFont(TTFont(font_name, os.path.join(os.path.dirname(__file__), '..', 'fonts', f'{font_name}.ttf')))
+    doc = fitz.open(original_pdf_path)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_overlay:
+        c = canvas.Canvas(tmp_overlay.name, pagesize=A4)
+        current_page = -1
+        for item in coordinates:
+            while current_page < item['page']:
+                if current_page != -1: c.showPage()
+                current_page += 1
+                c.setFont(font_name, 10)
+                c.setFillColorRGB(1, 0, 0)
+            c.drawString(item['x'], item['y'], str(item['number']))
+        c.save()
+        tmp_path = tmp_overlay.name
+
+    overlay_doc = fitz.open(tmp_path)
+    for i in range(len(doc)):
+        if i < len(overlay_doc):
+            doc[i].show_pdf_page(doc[i].rect, overlay_doc, i)
+    doc.save(output_path)
+    overlay_doc.close()
+    os.remove(tmp_path)
+
+
+def measure(fn, pdf_path, out_path, coords, font_name, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(pdf_path, out_path, coords, font_name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, os.path.getsize(out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=150)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    config = STYLE_CONFIGS['bracket']
+    font_name = register_korean_font()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), 'bracket', pages=args.pages)
+        roles = [name for name, _ in scan_candidates(pdf_path, config)]
+        coords = analyze_and_get_coordinates(pdf_path, roles, config)
+
+        print(f"pages={args.pages} numbers={len(coords)} font={font_name} input={os.path.getsize(pdf_path):,}B")
+        for label, fn in (("reportlab-overlay", legacy_create_overlay_pdf), ("fitz-direct", create_overlay_pdf)):
+            elapsed, size = measure(fn, pdf_path, os.path.join(tmp_dir, f"{label}.pdf"), coords, font_name, args.repeat)
+            print(f"{label:18s} {elapsed * 1000:8.1f} ms  {size:>12,} B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+영구 파싱 캐시(SQLite) 효과: 같은 대본을 여러 프로세스(레플리카/재시작)가 열 때
+load_script + scan_candidates + extract_script_data 에 걸리는 시간.
+
+프로세스마다 새로 띄우므로 메모리 캐시(load_script LRU)는 도움이 되지 않고 영구 캐시만 효과가 있다.
+마지막에 용량 제한을 작게 준 캐시로 오래된 항목이 밀려나는지도 확인한다.
+
+    python benchmarks/bench_parse_cache.py [--pages 60] [--replicas 5]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from sample_scripts import ROLES, STYLE_CONFIGS, make_sample_script
+
+STYLE = 'bracket'
+
+
+def open_script(pdf_path):
+    """[새 프로세스] 배우 한 명이 대본을 열 때 하는 일. (소요 시간, 결과, 캐시 통계)"""
+    from logic import extract_script_data, scan_candidates
+    from parse_cache import get_parse_cache
+
+    config = STYLE_CONFIGS[STYLE]
+    t0 = time.perf_counter()
+    candidates = scan_candidates(pdf_path, config)
+    lines = extract_script_data(pdf_path, '철수', config, allowed_roles=ROLES)
+    elapsed = time.perf_counter() - t0
+    cache = get_parse_cache()
+    return elapsed, (candidates, lines), cache.stats() if cache is not None else None
+
+
+def run_in_new_process(pdf_path, cache_path):
+    os.environ['SCRIPT_MATE_PARSE_CACHE'] = cache_path
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(open_script, pdf_path).result()
+
+
+def check_eviction(tmp_dir):
+    from parse_cache import ParseCache
+
+    cache = ParseCache(os.path.join(tmp_dir, 'small.sqlite3'), limit_bytes=64 * 1024)
+    payload = ['x' * 16 + str(i) for i in range(4000)]  # 압축 후 약 10KB
+    for i in range(20):
+        cache.put('doc', 'script', i, payload + [i])
+        time.sleep(0.001)
+    stats = cache.stats()
+    assert stats['bytes'] <= cache.limit_bytes
+    assert cache.get('doc', 'script', 0) is None and cache.get('doc', 'script', 19) is not None
+    cache.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--replicas', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), STYLE, pages=args.pages)
+        cache_path = os.path.join(tmp_dir, 'parse_cache.sqlite3')
+
+        off_time, expected, _ = run_in_new_process(pdf_path, 'off')
+        cold_time, cold_result, _ = run_in_new_process(pdf_path, cache_path)
+        warm = [run_in_new_process(pdf_path, cache_path) for _ in range(args.replicas)]
+        for _, result, _ in warm:
+            assert result == expected == cold_result
+        warm_times = sorted(t for t, _, _ in warm)
+        stats = warm[-1][2]
+        file_bytes = os.path.getsize(cache_path)
+        eviction = check_eviction(tmp_dir)
+
+    print(f"{args.pages}쪽 대본, 새 프로세스에서 후보 스캔 + 대사 추출")
+    print(f"캐시 끔        : {off_time * 1000:8.1f} ms")
+    print(f"캐시 첫 실행   : {cold_time * 1000:8.1f} ms  (파싱 + 기록)")
+    print(f"캐시 적중 ({args.replicas}회): {warm_times[len(warm_times) // 2] * 1000:8.1f} ms  (중앙값)")
+    print(f"적중률 (마지막 프로세스): {stats['hit_rate']:.0%}, 항목 {stats['items']}개, "
+          f"값 {stats['bytes'] / 1024:.0f} KB / 파일 {file_bytes / 1024:.0f} KB")
+    print(f"용량 제한 64KB: 항목 {eviction['items']}개, {eviction['bytes'] / 1024:.0f} KB, 밀려난 항목 {eviction['evictions']}개")
+
+
+if __name__ == '__main__':
+    main()
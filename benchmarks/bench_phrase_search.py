@@ -0,0 +1,60 @@
+"""
+시작 문구 찾기: 기존 방식(줄마다 공백 제거 후 부분 문자열 검사) vs n-gram 색인(ParsedScript.find_phrase).
+두 방식 모두 파싱이 끝난 페이지를 대상으로 하며, 기존 방식은 모든 일치를 찾도록 끝까지 훑는다.
+
+    python benchmarks/bench_phrase_search.py [--pages 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from script_model import load_script
+from sample_scripts import make_sample_script
+
+PHRASES = ['어디 갔다 왔어', '철수가 퇴장', '너무늦었어', '(사이)', '없는 문구입니다']
+
+
+def legacy_find_all(parsed_script, phrase):
+    clean_start_phrase = phrase.replace(" ", "").replace("\t", "").replace("\n", "")
+    hits = []
+    for parsed_page in parsed_script.iter_pages():
+        for line_idx, line in enumerate(parsed_page.lines):
+            clean_line = line['text'].replace(" ", "").replace("\t", "")
+            if clean_start_phrase in clean_line:
+                hits.append((parsed_page.index, line_idx))
+    return hits
+
+
+def best_of(fn, repeat=20):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), 'bracket', pages=args.pages)
+        parsed_script = load_script(pdf_path)
+        parsed_script.pages  # 파싱 (색인도 이때 만들어진다)
+
+        print(f"{args.pages}페이지")
+        for phrase in PHRASES:
+            legacy_time, legacy_hits = best_of(lambda: legacy_find_all(parsed_script, phrase))
+            index_time, hits = best_of(lambda: parsed_script.find_phrase(phrase))
+            assert [(h['page'], h['line']) for h in hits] == legacy_hits
+            print(f"{phrase:16s} 일치 {len(hits):4d}곳  기존 {legacy_time * 1000:7.2f} ms  색인 {index_time * 1000:6.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+연습 화면 rerun 시간이 대본 위치에 따라 얼마나 늘어나는지 잰다.
+기존처럼 지난 대사를 전부 그리는 경우(history_shown = 위치)와 최근 HISTORY_WINDOW 줄만 그리는 경우를 비교한다.
+(AppTest 는 fragment 단위 rerun 을 흉내 내지 않으므로 화면 전체 rerun 기준. 오답 입력은 실제로는 이보다 가볍다.)
+
+    python benchmarks/bench_practice_rerun.py [--pages 40] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+import tts
+from logic import extract_script_data
+from sample_scripts import ROLES, STYLE_CONFIGS, make_sample_script
+
+PRACTICE_PAGE = os.path.join(ROOT, 'pages', '2_script_practice.py')
+MY_ROLE = '철수'
+
+
+def time_rerun(script, position, history_shown, repeat):
+    at = AppTest.from_file(PRACTICE_PAGE, default_timeout=120)
+    at.session_state['is_practice_started'] = True
+    at.session_state['script_data'] = script
+    at.session_state['my_role'] = MY_ROLE
+    at.session_state['current_index'] = position
+    if history_shown is not None:
+        at.session_state['history_shown'] = history_shown
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(at.exception)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(at.chat_message)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # 오디오는 재생 직후 rerun 부터는 다시 만들지 않지만, 첫 rerun 에서 지연이 섞이지 않게 한다.
+    tts.set_tts_provider(tts.StubTTSProvider(latency=0))
+    tts.set_audio_cache(tts.AudioCache(disk_dir=None))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), 'bracket', pages=args.pages)
+        script = extract_script_data(pdf_path, MY_ROLE, STYLE_CONFIGS['bracket'], allowed_roles=ROLES)
+
+    positions = [p for p in (10, 100, 400, 1000) if p < len(script)]
+    print(f"대본 {len(script)}줄  (괄호 안은 그려진 말풍선 수)")
+    print(f"{'위치':>6s} {'전체 내역':>18s} {'최근 창':>18s}")
+    for position in positions:
+        full_time, full_bubbles = time_rerun(script, position, position, args.repeat)
+        window_time, window_bubbles = time_rerun(script, position, None, args.repeat)
+        print(f"{position:6d} {full_time * 1000:9.1f} ms ({full_bubbles:4d}) {window_time * 1000:9.1f} ms ({window_bubbles:4d})")
+
+
+if __name__ == '__main__':
+    main()
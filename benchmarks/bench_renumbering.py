@@ -0,0 +1,122 @@
+"""
+다시 넘버링하기: 같은 대본에서 배역 체크나 시작 페이지만 바꿔 analyze_and_get_coordinates 를 다시 부를 때의 시간.
+
+  첫 실행      : 페이지 파싱 + 줄 묶기 + 매칭
+  같은 프로세스 : 문서별로 보관한 줄 정보(PageLines)로 매칭만
+  새 프로세스   : 영구 캐시의 'lines' 항목만 읽어 매칭 (다른 작업 워커/레플리카에서 다시 실행한 경우)
+
+결과는 ParsedPage.lines 를 직접 훑는 기존 방식과 같은지 확인한다.
+
+    python benchmarks/bench_renumbering.py [--pages 200] [--repeat 5]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from sample_scripts import ROLES, STYLE_CONFIGS, make_sample_script
+
+STYLE = 'bracket'
+# (배역, 시작 페이지) - 체크를 바꾸고 시작 페이지를 옮겨 가며 다시 실행하는 경우
+VARIANTS = [
+    (ROLES, 1),
+    (ROLES[:2], 1),
+    (ROLES[1:], 1),
+    (ROLES[:3], 50),
+    (list(reversed(ROLES)), 120),
+]
+
+
+def reference_coordinates(pdf_path, roles, config, start_page):
+    """기존 방식: 파싱된 페이지의 줄(단어 포함)을 직접 훑는다."""
+    from logic import RoleMatcher
+    from script_model import load_script
+
+    matcher = RoleMatcher(roles, config)
+    results = []
+    for parsed_page in load_script(pdf_path).iter_pages(start_page - 1):
+        for line in parsed_page.lines:
+            role = matcher.match(line['text'])
+            if role:
+                first_word = line['words'][0]
+                results.append({
+                    'page': parsed_page.index,
+                    'x': first_word['x0'] - 20,
+                    'y': parsed_page.height - first_word['bottom'] + 2,
+                    'number': len(results) + 1,
+                    'role': role,
+                })
+    return results
+
+
+def renumber(pdf_path, repeat):
+    """변형마다 (최소 시간 초, 결과)."""
+    from logic import analyze_and_get_coordinates
+
+    config = STYLE_CONFIGS[STYLE]
+    out = []
+    for roles, start_page in VARIANTS:
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            coords = analyze_and_get_coordinates(pdf_path, roles, config, start_page=start_page)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        out.append((best, coords))
+    return out
+
+
+def renumber_in_new_process(pdf_path, cache_path, repeat):
+    """[새 프로세스] 첫 호출(영구 캐시에서 줄 정보 읽기) 시간과 이후 변형별 시간."""
+    os.environ['SCRIPT_MATE_PARSE_CACHE'] = cache_path
+    from logic import analyze_and_get_coordinates
+
+    roles, start_page = VARIANTS[1]
+    t0 = time.perf_counter()
+    analyze_and_get_coordinates(pdf_path, roles, STYLE_CONFIGS[STYLE], start_page=start_page)
+    first = time.perf_counter() - t0
+    return first, renumber(pdf_path, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, 'parse_cache.sqlite3')
+        os.environ['SCRIPT_MATE_PARSE_CACHE'] = cache_path
+        from logic import analyze_and_get_coordinates
+
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), STYLE, pages=args.pages)
+        config = STYLE_CONFIGS[STYLE]
+
+        t0 = time.perf_counter()
+        analyze_and_get_coordinates(pdf_path, ROLES, config)
+        first = time.perf_counter() - t0
+
+        warm = renumber(pdf_path, args.repeat)
+        for (roles, start_page), (_, coords) in zip(VARIANTS, warm):
+            assert coords == reference_coordinates(pdf_path, roles, config, start_page)
+
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            fresh_first, fresh = pool.submit(renumber_in_new_process, pdf_path, cache_path, args.repeat).result()
+        for (_, expected), (_, coords) in zip(warm, fresh):
+            assert coords == expected
+
+    print(f"{args.pages}쪽 대본, 배역/시작 페이지를 바꿔 다시 넘버링 (변형 {len(VARIANTS)}개, 최소 시간)")
+    print(f"첫 실행 (파싱 포함)          : {first * 1000:9.1f} ms")
+    for (roles, start_page), (elapsed, coords) in zip(VARIANTS, warm):
+        print(f"같은 프로세스 배역 {len(roles)}명 {start_page:3d}쪽부터: {elapsed * 1000:9.1f} ms  (번호 {len(coords)}개)")
+    print(f"새 프로세스 첫 호출 (캐시 읽기): {fresh_first * 1000:9.1f} ms")
+    print(f"새 프로세스 이후 (최대)       : {max(elapsed for elapsed, _ in fresh) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+대사 채점 비교: 기존 difflib.SequenceMatcher.ratio() vs scoring.py 비트 병렬 편집 거리.
+(indel = 삽입/삭제 거리 기반 2*LCS/길이합, levenshtein = 1 - 거리/긴 쪽 길이, 각각 음절 / 자모 단위)
+
+1) 속도: 긴 독백(수백~천 자) 입력 한 건 채점 시간, 입력 하나를 대본 전체와 비교하는 일괄 채점 시간
+2) 일치도: 오타/누락/어순 변경 등을 섞은 입력에 대해 80% 기준 통과/탈락 판정이 기존과 얼마나 같은지
+
+    python benchmarks/bench_scoring.py [--pairs 3000] [--seed 0]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from scoring import clean_text_for_comparison, similarity, similarity_many
+from sample_scripts import SPEECHES
+
+THRESHOLD = 80
+METHODS = [('indel/음절', 'indel', False), ('indel/자모', 'indel', True),
+           ('levenshtein/음절', 'levenshtein', False), ('levenshtein/자모', 'levenshtein', True)]
+
+
+def legacy_check_similarity(original, user_input):
+    """비교 기준: 변경 전 check_similarity 그대로."""
+    if not user_input: return 0.0
+    clean_org = clean_text_for_comparison(original)
+    clean_user = clean_text_for_comparison(user_input)
+    if not clean_org and not clean_user: return 100.0
+    if not clean_org or not clean_user: return 0.0
+    matcher = difflib.SequenceMatcher(None, clean_org, clean_user)
+    return matcher.ratio() * 100
+
+
+# ---------------------------------------------------------
+# 입력 변형 (배우가 칠 법한 실수)
+# ---------------------------------------------------------
+def random_syllable(rnd):
+    return chr(0xAC00 + rnd.randrange(11172))
+
+
+def jamo_typo(rnd, ch):
+    """음절의 중성 또는 종성 하나만 바꾼다. (예: 세 -> 새, 각 -> 간)"""
+    idx = ord(ch) - 0xAC00
+    cho, jung, jong = idx // 588, (idx % 588) // 28, idx % 28
+    if rnd.random() < 0.5: jung = (jung + rnd.randint(1, 20)) % 21
+    else: jong = (jong + rnd.randint(1, 27)) % 28
+    return chr(0xAC00 + cho * 588 + jung * 28 + jong)
+
+
+def perturb(rnd, text, n_edits):
+    chars = list(text)
+    for _ in range(n_edits):
+        hangul = [i for i, ch in enumerate(chars) if '가' <= ch <= '힣']
+        kind = rnd.choice(['jamo', 'jamo', 'syllable', 'delete', 'insert', 'swap_words'])
+        if kind == 'swap_words':
+            words = "".join(chars).split(' ')
+            if len(words) > 1:
+                i = rnd.randrange(len(words) - 1)
+                words[i], words[i + 1] = words[i + 1], words[i]
+            chars = list(" ".join(words))
+        elif not hangul or kind == 'insert':
+            chars.insert(rnd.randrange(len(chars) + 1), random_syllable(rnd))
+        else:
+            i = rnd.choice(hangul)
+            if kind == 'jamo': chars[i] = jamo_typo(rnd, chars[i])
+            elif kind == 'syllable': chars[i] = random_syllable(rnd)
+            else: del chars[i]
+    return "".join(chars)
+
+
+def make_line(rnd, min_len):
+    parts = []
+    while sum(len(p) for p in parts) < min_len:
+        parts.append(rnd.choice(SPEECHES))
+    return " ".join(parts)
+
+
+# ---------------------------------------------------------
+# 1. 속도
+# ---------------------------------------------------------
+def bench_speed(rnd):
+    print("[속도] 한 건 채점 (ms, 10회 평균)")
+    print(f"{'길이':>6s} {'difflib':>10s}" + "".join(f"{label:>18s}" for label, _, _ in METHODS))
+    for length in (50, 200, 500, 1000):
+        original = make_line(rnd, length)
+        user_input = perturb(rnd, original, max(1, length // 25))
+        row = []
+        start = time.perf_counter()
+        for _ in range(10): legacy_check_similarity(original, user_input)
+        row.append((time.perf_counter() - start) / 10 * 1000)
+        for _, metric, jamo in METHODS:
+            start = time.perf_counter()
+            for _ in range(10): similarity(original, user_input, jamo, metric)
+            row.append((time.perf_counter() - start) / 10 * 1000)
+        print(f"{len(original):6d} {row[0]:10.3f}" + "".join(f"{t:18.3f}" for t in row[1:]))
+
+    lines = [make_line(rnd, rnd.randint(10, 120)) for _ in range(1000)]
+    user_input = perturb(rnd, lines[500], 3)
+    start = time.perf_counter()
+    legacy = [legacy_check_similarity(line, user_input) for line in lines]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = similarity_many(user_input, lines)
+    batch_time = time.perf_counter() - start
+    best = max(range(len(lines)), key=batch.__getitem__)
+    print(f"[속도] 입력 1건 vs 대사 {len(lines)}줄: difflib {legacy_time * 1000:.1f} ms, "
+          f"similarity_many {batch_time * 1000:.1f} ms (최고점 줄 {best}, 기존 최고점 줄 {max(range(len(lines)), key=legacy.__getitem__)})")
+
+
+# ---------------------------------------------------------
+# 2. 80% 기준 일치도
+# ---------------------------------------------------------
+def bench_agreement(rnd, pairs):
+    cases = []
+    for _ in range(pairs):
+        original = make_line(rnd, rnd.randint(5, 80))
+        if rnd.random() < 0.1:
+            user_input = make_line(rnd, rnd.randint(5, 80))  # 엉뚱한 대사
+        else:
+            n_edits = rnd.randint(0, max(1, len(original) // 6))
+            user_input = perturb(rnd, original, n_edits)
+        cases.append((original, user_input))
+
+    legacy_pass = [legacy_check_similarity(o, u) >= THRESHOLD for o, u in cases]
+    print(f"[일치도] {pairs}쌍, 기준 {THRESHOLD}%, 기존 통과 {sum(legacy_pass)}건")
+    for label, metric, jamo in METHODS:
+        new_pass = [similarity(o, u, jamo, metric) >= THRESHOLD for o, u in cases]
+        both = sum(a and b for a, b in zip(legacy_pass, new_pass))
+        only_legacy = sum(a and not b for a, b in zip(legacy_pass, new_pass))
+        only_new = sum(b and not a for a, b in zip(legacy_pass, new_pass))
+        agree = sum(a == b for a, b in zip(legacy_pass, new_pass)) / len(cases) * 100
+        print(f"  {label:16s}: 일치 {agree:5.1f}%  (둘 다 통과 {both}, 기존만 통과 {only_legacy}, 새 방식만 통과 {only_new})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=3000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    bench_speed(rnd)
+    bench_agreement(rnd, args.pairs)
+
+
+if __name__ == '__main__':
+    main()
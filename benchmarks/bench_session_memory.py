@@ -0,0 +1,70 @@
+"""
+접속한 배우 N명이 각자 대본을 session_state 에 들고 있을 때의 메모리 (tracemalloc 기준).
+기존: 줄마다 dict 4~5개 키 / 현재: CompactScript (열 단위 저장)
+연습 화면은 대본과 함께 ScriptIndex 도 세션에 두므로, 세션 전체(대본 + 색인)도 따로 잰다.
+
+각 세션은 실제 앱처럼 iter_script_data 로 직접 대사를 뽑는다. (PDF 파싱 결과는 서버 공용 캐시를 함께 씀)
+
+    python benchmarks/bench_session_memory.py [--sessions 50] [--pages 60]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from compact_script import CompactScript
+from logic import iter_script_data
+from script_index import ScriptIndex
+from script_model import load_script
+from sample_scripts import ROLES, STYLE_CONFIGS, make_sample_script
+
+
+def measure(make_session, sessions):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [make_session() for _ in range(sessions)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used, kept
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), 'bracket', pages=args.pages)
+        config = STYLE_CONFIGS['bracket']
+        load_script(pdf_path).pages  # 공용 파싱 캐시는 측정에서 제외
+
+        def entries():
+            return iter_script_data(pdf_path, '철수', config, allowed_roles=ROLES)
+
+        dict_bytes, dict_sessions = measure(lambda: list(entries()), args.sessions)
+        compact_bytes, compact_sessions = measure(lambda: CompactScript(entries()), args.sessions)
+        assert compact_sessions[0].to_dicts() == dict_sessions[0]
+
+        def session_state():
+            script = CompactScript(entries())
+            return script, ScriptIndex().sync(script)
+
+        session_bytes, _ = measure(session_state, args.sessions)
+
+    lines = len(dict_sessions[0])
+    print(f"{args.sessions}개 세션, 세션당 {lines}줄")
+    print(f"dict 목록     : {dict_bytes / 1024 / 1024:7.2f} MB  (줄당 {dict_bytes / args.sessions / lines:6.0f} B)")
+    print(f"CompactScript : {compact_bytes / 1024 / 1024:7.2f} MB  (줄당 {compact_bytes / args.sessions / lines:6.0f} B)")
+    index_bytes = session_bytes - compact_bytes
+    print(f"대본 + 색인   : {session_bytes / 1024 / 1024:7.2f} MB  (줄당 {session_bytes / args.sessions / lines:6.0f} B, "
+          f"색인만 {index_bytes / args.sessions / lines:6.0f} B)")
+
+
+if __name__ == '__main__':
+    main()
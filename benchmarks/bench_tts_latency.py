@@ -0,0 +1,99 @@
+"""
+연습 화면(pages/2_script_practice.py)을 그대로 실행해 큐 -> 재생 가능까지 걸리는 시간을 잰다.
+TTS 제공자별로, 미리 합성(prefetch)이 없을 때와 있을 때를 비교한다.
+
+    python benchmarks/bench_tts_latency.py --provider stub --latency-ms 400
+    python benchmarks/bench_tts_latency.py --provider edge      # 외부 네트워크 필요
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+import tts
+from logic import extract_script_data
+from sample_scripts import ROLES, STYLE_CONFIGS, make_sample_script
+
+PRACTICE_PAGE = os.path.join(ROOT, 'pages', '2_script_practice.py')
+MY_ROLE = '철수'
+
+
+class NoPrefetch(tts.CuePrefetcher):
+    def schedule(self, cues):
+        pass
+
+
+def my_line_indices(script):
+    """배우가 입력해야 하는 내 대사 위치 (지문 제외)"""
+    return [i for i, line in enumerate(script) if line['role'] == MY_ROLE and line['type'] == 'dialogue']
+
+
+def run_session(script, prefetcher, cues, think_time):
+    """내 대사를 차례로 맞히면서 매 rerun 시간을 잰다. (상대 대사가 재생된 경우만 집계)"""
+    at = AppTest.from_file(PRACTICE_PAGE, default_timeout=120)
+    at.session_state['is_practice_started'] = True
+    at.session_state['script_data'] = script
+    at.session_state['my_role'] = MY_ROLE
+    at.session_state['current_index'] = 0
+    at.session_state['tts_prefetcher'] = prefetcher
+
+    latencies = []
+    for target in my_line_indices(script):
+        if len(latencies) >= cues:
+            break
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            break
+        if at.get('audio'):
+            latencies.append(elapsed)
+        # 배우가 대사를 입력하는 시간
+        time.sleep(think_time)
+        at.session_state['current_index'] = target + 1
+    return latencies
+
+
+def summarize(label, latencies):
+    if not latencies:
+        print(f"{label:22s} (재생된 큐 없음)")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:22s} n={len(latencies):3d} mean={statistics.mean(latencies) * 1000:7.1f} ms "
+          f"p50={statistics.median(latencies) * 1000:7.1f} ms p95={p95 * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--provider', choices=['stub', 'edge'], default='stub')
+    parser.add_argument('--latency-ms', type=float, default=400, help="stub 합성 지연")
+    parser.add_argument('--cues', type=int, default=15)
+    parser.add_argument('--think-time', type=float, default=1.0, help="큐 사이 배우 입력 시간(초)")
+    args = parser.parse_args()
+
+    if args.provider == 'stub':
+        tts.set_tts_provider(tts.StubTTSProvider(latency=args.latency_ms / 1000))
+    else:
+        tts.set_tts_provider(tts.EdgeTTSProvider())
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = STYLE_CONFIGS['bracket']
+        pdf_path = make_sample_script(os.path.join(tmp_dir, "script.pdf"), 'bracket', pages=10)
+        script = extract_script_data(pdf_path, MY_ROLE, config, allowed_roles=ROLES)
+
+        print(f"provider={args.provider} cues={args.cues} think_time={args.think_time}s")
+        for label, prefetcher in (("no-prefetch", NoPrefetch()), ("prefetch", tts.CuePrefetcher())):
+            # 매 모드마다 빈 캐시로 시작 (디스크 계층 없음)
+            tts.set_audio_cache(tts.AudioCache(disk_dir=None))
+            summarize(label, run_session(script, prefetcher, args.cues, args.think_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+pdfplumber / PyMuPDF(fitz) 백엔드가 같은 넘버링 좌표와 연습용 대사를 만드는지 확인한다.
+
+    python benchmarks/check_backend_parity.py [--pages 6]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from logic import scan_candidates, analyze_and_get_coordinates, extract_script_data
+from sample_scripts import STYLE_CONFIGS, make_sample_script
+
+# 두 백엔드의 글자 상자 계산 방식 차이를 허용하는 좌표 오차 (pt)
+COORD_TOLERANCE = 0.5
+
+
+def coords_match(a, b):
+    if len(a) != len(b): return False
+    for x, y in zip(a, b):
+        if x['page'] != y['page'] or x['number'] != y['number']: return False
+        if abs(x['x'] - y['x']) > COORD_TOLERANCE or abs(x['y'] - y['y']) > COORD_TOLERANCE: return False
+    return True
+
+
+def run(pdf_path, config):
+    start = time.perf_counter()
+    candidates = scan_candidates(pdf_path, config)
+    roles = [name for name, _ in candidates[:6]]
+    coords = analyze_and_get_coordinates(pdf_path, roles, config)
+    script = extract_script_data(pdf_path, roles[0] if roles else "", config, allowed_roles=roles)
+    return candidates, coords, script, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=6)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, (style, config) in enumerate(STYLE_CONFIGS.items()):
+            pdf_path = make_sample_script(os.path.join(tmp_dir, f"{style}.pdf"), style, pages=args.pages, seed=i)
+            base = run(pdf_path, dict(config, backend='pdfplumber'))
+            other = run(pdf_path, dict(config, backend='fitz'))
+
+            ok = base[0] == other[0] and coords_match(base[1], other[1]) and base[2] == other[2]
+            failed |= not ok
+            print(f"{style:8s} {'OK  ' if ok else 'FAIL'} "
+                  f"candidates={len(base[0])} numbers={len(base[1])} lines={len(base[2])} "
+                  f"pdfplumber={base[3]:.2f}s fitz={other[3]:.2f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+연습용 추출이 사용자가 고른 시작 문구 위치에서 그대로 시작하는지 확인한다.
+
+한 페이지에 같은 문구가 두 번 나오고, 그 앞에 위아래로 4pt 어긋난 두 줄이 있는 대본을 만든다.
+단어 묶음 줄(y_gap=5)은 두 줄을 한 줄로 합치고 레이아웃 줄(Y_TOLERANCE=3)은 두 줄로 나누므로,
+한쪽 줄 묶음에서 센 "몇 번째 일치"를 다른 쪽에 쓰면 다른 줄에서 시작하게 된다.
+
+    python benchmarks/check_start_phrase.py
+"""
+import os
+import sys
+import tempfile
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfgen import canvas
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from logic import extract_script_data
+from script_model import load_script
+from text_search import compact
+from sample_scripts import FONT_NAME, STYLE_CONFIGS
+
+PHRASE = '막이 오른다'
+CONFIG = STYLE_CONFIGS['bracket']
+
+# (x, 줄 위치 y, 텍스트). 두 번째/세 번째 항목은 4pt 차이라 단어 묶음에서만 한 줄이 된다.
+PAGE = [
+    (60, 780, '[철수] 안녕.'),
+    (60, 750, '[영희] 막이 오른다'),
+    (300, 746, '[민수] 막이 오른다'),
+    (60, 720, '[영희] 첫 대사.'),
+    (60, 690, '[철수] 둘째 장. 막이 오른다'),
+    (60, 660, '[영희] 끝 대사.'),
+]
+# 레이아웃 줄 기준으로 고른 위치마다 추출의 첫 대사 (공백 무시)
+EXPECTED_FIRST = ['막이 오른다', '막이 오른다', '둘째 장. 막이 오른다']
+
+
+def make_script(path):
+    pdfmetrics.registerFont(UnicodeCIDFont(FONT_NAME))
+    c = canvas.Canvas(path)
+    c.setFont(FONT_NAME, 11)
+    for x, y, text in PAGE:
+        c.drawString(x, y, text)
+    c.showPage()
+    c.save()
+    return path
+
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_script(os.path.join(tmp_dir, "start_phrase.pdf"))
+        parsed_script = load_script(pdf_path)
+        word_hits = parsed_script.find_phrase(PHRASE)
+        hits = parsed_script.find_phrase(PHRASE, layout=True)
+        print(f"단어 묶음 줄 일치 {len(word_hits)}곳, 레이아웃 줄 일치 {len(hits)}곳")
+        if len(word_hits) == len(hits):
+            sys.exit("두 줄 묶음이 같게 나뉘었습니다. (검증용 대본이 의도와 다름)")
+
+        for hit, expected in zip(hits, EXPECTED_FIRST):
+            script = extract_script_data(pdf_path, '철수', CONFIG, start_at=hit)
+            ok = bool(script) and compact(script[0]['text']) == compact(expected)
+            failed |= not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {hit['page']+1}페이지 {hit['line']}번째 줄 '{hit['text']}' -> "
+                  f"{[entry['text'] for entry in script]}")
+        if len(hits) != len(EXPECTED_FIRST):
+            failed = True
+            print(f"FAIL 레이아웃 줄 일치 {len(hits)}곳 (기대 {len(EXPECTED_FIRST)}곳)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+파이프라인 단계별 벤치마크. 샘플 대본(sample_scripts)을 형식별로 만들어
+scan_candidates / analyze_and_get_coordinates / create_overlay_pdf / extract_script_data 의
+실행 시간(중앙값), 최대 메모리(tracemalloc, 파이썬 힙 기준), 초당 페이지 수를 잰다.
+
+기본은 단계마다 PDF 를 처음부터 파싱한다. (메모리/영구 파싱 캐시를 끄고 측정)
+--warm 이면 파싱된 페이지를 재사용해 단계 자체의 처리 비용만 잰다.
+결과는 JSON 으로 저장하고, --compare 로 이전 결과와 비교한다.
+
+    python benchmarks/run_benchmarks.py [--styles bracket colon] [--pages 20] [--cast 8] [--repeat 3]
+                                        [--warm] [--out result.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from logic import analyze_and_get_coordinates, create_overlay_pdf, extract_script_data, register_korean_font, scan_candidates
+from parse_cache import set_parse_cache
+from script_model import DEFAULT_BACKEND, clear_script_cache, load_script
+from sample_scripts import STYLE_CONFIGS, make_cast, make_sample_script
+
+STAGES = ('scan', 'coordinates', 'overlay', 'extract')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def stage_runner(stage, pdf_path, config, cast, out_path, font_name):
+    """단계 하나를 실행하는 함수. (앞 단계 결과가 필요한 단계는 미리 준비해 둔다)"""
+    if stage == 'scan':
+        return lambda: scan_candidates(pdf_path, config)
+    if stage == 'coordinates':
+        return lambda: analyze_and_get_coordinates(pdf_path, cast, config)
+    if stage == 'overlay':
+        coords = analyze_and_get_coordinates(pdf_path, cast, config)
+        return lambda: create_overlay_pdf(pdf_path, out_path, coords, font_name)
+    if stage == 'extract':
+        return lambda: extract_script_data(pdf_path, cast[0], config, allowed_roles=cast)
+    raise ValueError(stage)
+
+
+def measure(fn, repeat, warm):
+    """(실행 시간 목록, 최대 메모리 bytes). 메모리는 시간 측정과 따로 한 번 더 실행해 잰다."""
+    def run():
+        if not warm: clear_script_cache()
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return times, peak
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result['style'], result['pages'], result['cast'], result['warm'], result['stage'])
+
+
+def compare(results, old_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = {result_key(r): r for r in json.load(f)['results']}
+    print(f"\n이전 결과와 비교: {old_path}")
+    matched = 0
+    for result in results:
+        before = old.get(result_key(result))
+        if before is None: continue
+        matched += 1
+        ratio = result['wall_ms'] / before['wall_ms'] if before['wall_ms'] else float('inf')
+        print(f"{result['style']:8s} {result['stage']:12s} {before['wall_ms']:9.1f} -> {result['wall_ms']:9.1f} ms  (x{ratio:.2f})")
+    if not matched:
+        print("같은 조건(형식/페이지/배역 수/warm/단계)의 결과가 없습니다.")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--styles', nargs='+', choices=list(STYLE_CONFIGS), default=list(STYLE_CONFIGS))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--cast', type=int, default=8)
+    parser.add_argument('--directions', type=float, default=0.2, help="지문 줄 비율")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--warm', action='store_true', help="파싱된 페이지를 재사용 (단계 처리 비용만)")
+    parser.add_argument('--out', help="결과 JSON 경로 (기본: benchmarks/results/bench-시각.json)")
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    # 영구 캐시가 켜져 있으면 두 번째 실행부터 파싱을 건너뛰어 측정이 의미 없어진다.
+    set_parse_cache(None)
+    font_name = register_korean_font()
+    cast = make_cast(args.cast)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, style in enumerate(args.styles):
+            config = STYLE_CONFIGS[style]
+            pdf_path = make_sample_script(os.path.join(tmp_dir, f"{style}.pdf"), style, pages=args.pages, seed=i,
+                                          cast=cast, direction_ratio=args.directions)
+            if args.warm: load_script(pdf_path).pages
+            for stage in args.stages:
+                fn = stage_runner(stage, pdf_path, config, cast, os.path.join(tmp_dir, f"{style}-numbered.pdf"), font_name)
+                times, peak = measure(fn, args.repeat, args.warm)
+                wall = statistics.median(times)
+                result = {
+                    'style': style,
+                    'stage': stage,
+                    'pages': args.pages,
+                    'cast': args.cast,
+                    'warm': args.warm,
+                    'wall_ms': round(wall * 1000, 2),
+                    'runs_ms': [round(t * 1000, 2) for t in times],
+                    'peak_mb': round(peak / 1024 / 1024, 2),
+                    'pages_per_sec': round(args.pages / wall, 1) if wall else None,
+                }
+                results.append(result)
+                print(f"{style:8s} {stage:12s} {result['wall_ms']:9.1f} ms  {result['peak_mb']:7.2f} MB  "
+                      f"{result['pages_per_sec']:8.1f} pages/s")
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': DEFAULT_BACKEND,
+            'font': font_name,
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    out_path = args.out
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out_path = os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out_path}")
+
+    if args.compare: compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
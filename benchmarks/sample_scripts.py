@@ -0,0 +1,114 @@
+"""
+벤치마크/검증용 샘플 대본 PDF 생성기.
+ReportLab 내장 한글 CID 글꼴을 쓰므로 fonts/ 폴더 없이도 동작한다.
+
+    python benchmarks/sample_scripts.py out.pdf --style bracket --pages 50 --cast 12
+"""
+import argparse
+import random
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'HYSMyeongJo-Medium'
+
+ROLES = ['철수', '영희', '민수', '지은', '할머니', '김선생', '박형사', '수진']
+SPEECHES = [
+    '안녕하세요. 오늘 날씨가 참 좋네요.',
+    '그래, 오랜만이야. 어디 갔다 왔어?',
+    '나는 몰라. 정말 아무것도 몰라!',
+    '그런데 말이야, 그 사람은 왜 그랬을까',
+    '어서 와.',
+    '우리가 함께 했던 시간들을 기억해?',
+    '(웃으며) 정말이야?',
+    '하지만 이제는 돌아갈 수 없어. 너무 늦었어.',
+    '내가 뭘 잘못했는데?',
+    '그리고 그날 밤 우리는 모두 떠났다.',
+]
+# 배역이 ROLES 보다 많이 필요하면 성 + 이름으로 만든다.
+SURNAMES = ['김', '이', '박', '최', '정', '강', '조', '윤', '장', '임']
+GIVEN_NAMES = ['민준', '서연', '도윤', '하은', '시우', '지우', '예준', '수아', '주원', '지아', '하준', '서윤']
+DIRECTIONS = ['(사이)', '철수가 퇴장한다.', '암전.', '무대 위로 조명이 들어온다.', '영희, 천천히 등장.', '[음악]', '모두 웃는다.', '커튼콜']
+
+# 스타일 이름 -> 앱에서 쓰는 config
+STYLE_CONFIGS = {
+    'columns': {'wrapper_regex': None, 'separator': None},      # 이름/대사를 다른 x 위치에 배치
+    'space':   {'wrapper_regex': None, 'separator': None},      # 철수  대사 (공백 2칸)
+    'bracket': {'wrapper_regex': r'^\s*\[(.+?)\]', 'separator': None},
+    'paren':   {'wrapper_regex': r'^\s*\((.+?)\)', 'separator': None},
+    'angle':   {'wrapper_regex': r'^\s*<(.+?)>', 'separator': None},
+    'colon':   {'wrapper_regex': None, 'separator': ':'},
+    'custom':  {'wrapper_regex': None, 'separator': '-'},       # 구분 기호 직접 입력
+}
+
+
+def _role_line(style, role, speech):
+    if style == 'space': return f"{role}  {speech}"
+    if style == 'bracket': return f"[{role}] {speech}"
+    if style == 'paren': return f"({role}) {speech}"
+    if style == 'angle': return f"<{role}> {speech}"
+    if style == 'colon': return f"{role}: {speech}"
+    if style == 'custom': return f"{role} - {speech}"
+    raise ValueError(style)
+
+
+def make_cast(size=len(ROLES)):
+    """배역 이름 size 개. ROLES 로 모자라면 성 + 이름 조합을 덧붙인다."""
+    if size <= len(ROLES): return ROLES[:size]
+    extra = [s + g for g in GIVEN_NAMES for s in SURNAMES]
+    if size > len(ROLES) + len(extra):
+        raise ValueError(f"배역은 최대 {len(ROLES) + len(extra)}명까지 만들 수 있습니다.")
+    return ROLES + extra[:size - len(ROLES)]
+
+
+def make_sample_script(path, style, pages=5, seed=0, cast=None, direction_ratio=0.2):
+    """
+    style: STYLE_CONFIGS 의 이름. cast: 배역 목록 (기본 ROLES) 또는 배역 수.
+    direction_ratio: 지문 줄 비율. 기본값이면 예전과 같은 PDF 가 나온다.
+    """
+    if style not in STYLE_CONFIGS: raise ValueError(style)
+    if cast is None: cast = ROLES
+    elif isinstance(cast, int): cast = make_cast(cast)
+    pdfmetrics.registerFont(UnicodeCIDFont(FONT_NAME))
+    rnd = random.Random(seed)
+    c = canvas.Canvas(path, pagesize=A4)
+    for _ in range(pages):
+        c.setFont(FONT_NAME, 11)
+        y = 800
+        while y > 60:
+            if rnd.random() < direction_ratio:
+                c.drawString(110, y, rnd.choice(DIRECTIONS))
+            else:
+                role, speech = rnd.choice(cast), rnd.choice(SPEECHES)
+                if style == 'columns':
+                    c.drawString(72, y, role)
+                    c.drawString(140, y, speech)
+                else:
+                    c.drawString(72, y, _role_line(style, role, speech))
+                # 대사가 다음 줄로 이어지는 경우
+                if rnd.random() < 0.3:
+                    y -= 16
+                    c.drawString(140 if style == 'columns' else 72, y, rnd.choice(SPEECHES))
+            y -= 18
+        c.showPage()
+    c.save()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="샘플 대본 PDF 만들기")
+    parser.add_argument('out')
+    parser.add_argument('--style', choices=list(STYLE_CONFIGS), default='bracket')
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--cast', type=int, default=len(ROLES))
+    parser.add_argument('--directions', type=float, default=0.2, help="지문 줄 비율")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    make_sample_script(args.out, args.style, args.pages, args.seed, cast=args.cast, direction_ratio=args.directions)
+    print(f"{args.out}: {args.style}, {args.pages}쪽, 배역 {args.cast}명")
+
+
+if __name__ == '__main__':
+    main()
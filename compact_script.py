@@ -0,0 +1,138 @@
+import sys
+from array import array
+
+# ---------------------------------------------------------
+# 세션에 보관하는 대본 (열 단위 저장)
+# ---------------------------------------------------------
+# 접속한 배우마다 대본 전체를 session_state 에 들고 있으므로 줄마다 dict 를 두면 메모리가 크게 는다.
+# 역할은 번호로, 종류는 1바이트로, 본문은 큰 문자열 몇 개에 이어 붙여 두고
+# 화면에서는 기존처럼 script[i]['role'] / ['text'] 로 읽는다.
+LINE_TYPES = ('dialogue', 'action')
+_TYPE_CODES = {name: code for code, name in enumerate(LINE_TYPES)}
+NO_PAGE = 0
+
+# 본문은 덩어리 단위로 이어 붙인다. (스트리밍 중 append 가 전체 재복사가 되지 않게)
+TEXT_CHUNK_LINES = 256
+
+
+class ScriptLine:
+    """CompactScript 한 줄의 읽기 전용 뷰. dict 처럼 line['text'], line.get('page') 로 읽는다."""
+    __slots__ = ('_script', '_i')
+
+    def __init__(self, script, i):
+        self._script = script
+        self._i = i
+
+    def __getitem__(self, key):
+        return self._script._field(self._i, key)
+
+    def get(self, key, default=None):
+        try:
+            return self._script._field(self._i, key)
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in CompactScript.FIELDS
+
+    def keys(self):
+        return CompactScript.FIELDS
+
+    def to_dict(self):
+        return {key: self[key] for key in CompactScript.FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, (ScriptLine, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, ScriptLine) else other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class CompactScript:
+    """
+    extract_script_data / iter_script_data 의 dict 를 append 로 받아 열 단위로 저장한다.
+    original_text 는 text 와 다를 때만 따로 보관하고, 같으면 text 로 되살린다.
+    """
+    FIELDS = ('role', 'text', 'original_text', 'type', 'page')
+
+    def __init__(self, entries=()):
+        self.roles = []                 # 역할 id -> 이름 (id 당 문자열 하나)
+        self._role_ids = {}
+        self._role = array('H')
+        self._type = array('B')
+        self._page = array('H')         # 0 = 페이지 정보 없음
+        self._chunks = []               # 완성된 본문 덩어리 (TEXT_CHUNK_LINES 줄씩)
+        self._offsets = array('I')      # 줄 i 본문 = 덩어리 i // N 의 [offsets[i], offsets[i] + lengths[i])
+        self._lengths = array('I')
+        self._tail = []                 # 아직 덩어리로 합치지 않은 마지막 줄들
+        self._tail_len = 0
+        self._originals = {}            # text 와 다른 original_text 만
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self):
+        return len(self._role)
+
+    def append(self, entry):
+        i = len(self._role)
+        role = entry['role']
+        role_id = self._role_ids.get(role)
+        if role_id is None:
+            role_id = self._role_ids[role] = len(self.roles)
+            self.roles.append(sys.intern(role))
+        text = entry['text']
+        original = entry.get('original_text', text)
+        if original != text: self._originals[i] = original
+
+        self._offsets.append(self._tail_len)
+        self._lengths.append(len(text))
+        self._tail.append(text)
+        self._tail_len += len(text)
+        if len(self._tail) == TEXT_CHUNK_LINES:
+            self._chunks.append("".join(self._tail))
+            self._tail = []
+            self._tail_len = 0
+
+        # 본문을 먼저 넣고 길이를 늘려야, 다른 스레드가 len() 만큼 읽어도 항상 완성된 줄만 보인다.
+        self._type.append(_TYPE_CODES[entry['type']])
+        self._page.append(entry.get('page') or NO_PAGE)
+        self._role.append(role_id)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def _text(self, i):
+        # 꼬리 목록을 먼저 잡아 둔다. (append 는 덩어리를 추가한 뒤 새 꼬리 목록으로 바꾸므로 안전)
+        tail = self._tail
+        chunk_idx, k = divmod(i, TEXT_CHUNK_LINES)
+        if chunk_idx < len(self._chunks):
+            start = self._offsets[i]
+            return self._chunks[chunk_idx][start:start + self._lengths[i]]
+        return tail[k]
+
+    def _field(self, i, key):
+        if key == 'role': return self.roles[self._role[i]]
+        if key == 'text': return self._text(i)
+        if key == 'original_text':
+            original = self._originals.get(i)
+            return original if original is not None else self._text(i)
+        if key == 'type': return LINE_TYPES[self._type[i]]
+        if key == 'page': return self._page[i] or None
+        raise KeyError(key)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError(i)
+        return ScriptLine(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield ScriptLine(self, i)
+
+    def to_dicts(self):
+        return [line.to_dict() for line in self]
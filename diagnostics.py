@@ -0,0 +1,185 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# ---------------------------------------------------------
+# 진단용 계측 (구간 시간 / 카운터)
+# ---------------------------------------------------------
+# 코드 곳곳에서 span('pdf.extract_words') / count('lines.matched') 로 기록하고,
+# 기록기(Recorder)가 걸려 있는 실행 흐름에서만 실제로 모은다. 걸려 있지 않으면 ContextVar 조회 한 번뿐이다.
+# 기록기는 세션마다 하나씩 만들어 use() 로 건다. (화면의 "진단 정보" 를 켠 세션만)
+# operation() 으로 감싼 작업은 끝날 때 그동안의 구간/카운터 변화를 JSON 한 줄로 로그에 남긴다.
+#
+# 구간은 포함 관계로 잰다. (예: 'numbering.coordinates' 안에 'pdf.extract_words' 가 들어 있음)
+# 백그라운드 스레드는 contextvars.copy_context() 로 시작해야 같은 기록기에 모인다.
+DIAGNOSTICS_DEFAULT = os.environ.get('SCRIPT_MATE_DIAGNOSTICS', '0').lower() in ('1', 'true', 'on')
+RECENT_OPERATIONS = 20
+
+logger = logging.getLogger('script_mate.diagnostics')
+
+_current = contextvars.ContextVar('script_mate_recorder', default=None)
+_NOOP = nullcontext()
+
+
+class Recorder:
+    """세션 하나의 누적 기록. 여러 스레드에서 함께 쓴다."""
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = {}     # 이름 -> [횟수, 합계 초, 최대 초]
+        self.counters = {}  # 이름 -> 값
+        self.operations = deque(maxlen=RECENT_OPERATIONS)  # 최근 operation 기록 (로그와 같은 dict)
+        self._lock = threading.Lock()
+
+    def add_span(self, name, elapsed):
+        with self._lock:
+            stat = self.spans.get(name)
+            if stat is None:
+                self.spans[name] = [1, elapsed, elapsed]
+            else:
+                stat[0] += 1
+                stat[1] += elapsed
+                if elapsed > stat[2]: stat[2] = elapsed
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stat[:] for name, stat in self.spans.items()}, dict(self.counters)
+
+    def merge(self, snapshot, operations=()):
+        """다른 프로세스(작업 워커)에서 모은 snapshot() 과 operation 기록을 이 기록기에 더한다."""
+        spans, counters = snapshot
+        with self._lock:
+            for name, (n, total, peak) in spans.items():
+                stat = self.spans.get(name)
+                if stat is None:
+                    self.spans[name] = [n, total, peak]
+                else:
+                    stat[0] += n
+                    stat[1] += total
+                    if peak > stat[2]: stat[2] = peak
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+        for record in operations:
+            self.log_operation(dict(record, recorder=self.name))
+
+    def log_operation(self, record):
+        self.operations.append(record)
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.operations.clear()
+
+    # --- 화면 표시용 ---
+    def span_rows(self):
+        spans, _ = self.snapshot()
+        return [{
+            '구간': name,
+            '횟수': n,
+            '합계 ms': round(total * 1000, 1),
+            '평균 ms': round(total / n * 1000, 2),
+            '최대 ms': round(peak * 1000, 1),
+        } for name, (n, total, peak) in sorted(spans.items(), key=lambda kv: -kv[1][1])]
+
+    def counter_rows(self):
+        _, counters = self.snapshot()
+        return [{'카운터': name, '값': value} for name, value in sorted(counters.items())]
+
+
+class _Span:
+    __slots__ = ('_recorder', '_name', '_start')
+
+    def __init__(self, recorder, name):
+        self._recorder = recorder
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._recorder.add_span(self._name, time.perf_counter() - self._start)
+
+
+class _Operation(_Span):
+    """끝날 때 구간 시간과 그동안 바뀐 구간/카운터를 구조화 로그로 남기는 구간."""
+    __slots__ = ('_before',)
+
+    def __enter__(self):
+        self._before = self._recorder.snapshot()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        self._recorder.add_span(self._name, elapsed)
+        spans_before, counters_before = self._before
+        spans, counters = self._recorder.snapshot()
+        record = {
+            'recorder': self._recorder.name,
+            'operation': self._name,
+            'ms': round(elapsed * 1000, 1),
+            'ok': exc_type is None,
+            'spans_ms': {name: round((stat[1] - spans_before.get(name, [0, 0.0])[1]) * 1000, 1)
+                         for name, stat in spans.items()
+                         if name != self._name and stat[0] != spans_before.get(name, [0])[0]},
+            'counters': {name: value - counters_before.get(name, 0)
+                         for name, value in counters.items() if value != counters_before.get(name, 0)},
+        }
+        self._recorder.log_operation(record)
+
+
+# --- 계측 지점에서 쓰는 함수 ---
+def span(name):
+    """with span('...'): 구간 시간. 기록기가 없으면 아무 일도 하지 않는다."""
+    recorder = _current.get()
+    if recorder is None: return _NOOP
+    return _Span(recorder, name)
+
+
+def operation(name):
+    """with operation('...'): span 과 같고, 끝나면 구조화 로그 한 줄을 남긴다."""
+    recorder = _current.get()
+    if recorder is None: return _NOOP
+    return _Operation(recorder, name)
+
+
+def timed(iterable, name):
+    """iterable 의 다음 항목을 만드는 시간만 name 구간으로 잰다. (꺼져 있으면 iterable 그대로)"""
+    recorder = _current.get()
+    if recorder is None: return iterable
+    return _timed(iterable, recorder, name)
+
+
+def _timed(iterable, recorder, name):
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            recorder.add_span(name, time.perf_counter() - start)
+            return
+        recorder.add_span(name, time.perf_counter() - start)
+        yield item
+
+
+def count(name, n=1):
+    recorder = _current.get()
+    if recorder is not None: recorder.add(name, n)
+
+
+# --- 기록기 연결 ---
+def use(recorder):
+    """현재 실행 흐름(스레드/컨텍스트)에 기록기를 건다. None 이면 끈다."""
+    _current.set(recorder)
@@ -0,0 +1,60 @@
+import re
+
+# ---------------------------------------------------------
+# 지문 판단 규칙 (연습용 대사 추출)
+# ---------------------------------------------------------
+# 규칙 묶음(지문 키워드 / 1인칭·접속사 시작 / 지문 어미)마다 정규식 하나로 모듈을 읽을 때 컴파일하고,
+# 한 페이지의 줄을 classify_lines() 로 한 번에 분류한다.
+# 판단은 말하는 배역이 있는지(is_speaking)에 따라 갈릴 수 있어 줄마다 세 값 중 하나로 돌려준다.
+#   DIALOGUE    : 항상 대사
+#   DIRECTION   : 항상 지문
+#   SILENT_ONLY : 말하는 배역이 없을 때만 지문 (지문 어미로 끝나는 20~35자 줄)
+# 규칙을 바꾸면 benchmarks/bench_direction_rules.py 로 정답 말뭉치와 비교한다.
+DIRECTION_KEYWORDS = ("사이", "퇴장", "등장", "암전", "막", "커튼콜")
+FIRST_PERSON_PREFIXES = ("나 ", "나는", "내가", "나의", "내 ", "우리는", "우리가")
+CONJUNCTION_PREFIXES = ("그리고", "그런데", "하지만", "그렇게", "그래서", "그러자", "또한")
+DIRECTION_ENDINGS = ("다", "함", "음", "장")
+
+KEYWORD_MAX_LEN = 15   # 키워드는 이보다 짧은 줄에서만 본다
+DIRECTION_MAX_LEN = 35 # 이보다 긴 줄은 대사
+SPEAKING_MAX_LEN = 20  # 말하는 중이면 이보다 짧아야 지문
+ENDING_WINDOW = 5      # 어미는 끝 5글자 안의 마지막 한글로 본다
+
+DIALOGUE, DIRECTION, SILENT_ONLY = 0, 1, 2
+
+
+def _alternation(words):
+    return '|'.join(re.escape(word) for word in words)
+
+
+_KEYWORD_RE = re.compile(_alternation(DIRECTION_KEYWORDS))
+_PROTECTED_RE = re.compile(_alternation(FIRST_PERSON_PREFIXES + CONJUNCTION_PREFIXES))
+# 끝 부분에서 한글이 아닌 글자(문장 부호 등)를 건너뛴 마지막 한글이 지문 어미인지
+_ENDING_RE = re.compile(f"[{''.join(DIRECTION_ENDINGS)}][^가-힣]*\\Z")
+
+
+def classify_line(line_text):
+    """줄 하나 -> DIALOGUE / DIRECTION / SILENT_ONLY"""
+    line_text = line_text.strip()
+    if not line_text: return DIALOGUE
+    n = len(line_text)
+
+    # 1. 괄호
+    if line_text.startswith('(') and line_text.endswith(')'): return DIRECTION
+    # 2. 지문 키워드 (짧은 줄만)
+    if n < KEYWORD_MAX_LEN and _KEYWORD_RE.search(line_text): return DIRECTION
+    # 3. 1인칭 / 접속사로 시작하면 대사, 4. 긴 줄은 대사
+    if n > DIRECTION_MAX_LEN or _PROTECTED_RE.match(line_text): return DIALOGUE
+    # 5. 어미
+    if not _ENDING_RE.search(line_text, max(0, n - ENDING_WINDOW)): return DIALOGUE
+    return DIRECTION if n < SPEAKING_MAX_LEN else SILENT_ONLY
+
+
+def classify_lines(lines):
+    """페이지 줄 목록 -> 같은 길이의 분류 목록"""
+    return [classify_line(line) for line in lines]
+
+
+def is_direction(verdict, is_speaking):
+    """classify_line 결과와 말하는 중인지로 지문 여부를 정한다."""
+    return verdict == DIRECTION or (verdict == SILENT_ONLY and not is_speaking)
@@ -0,0 +1,433 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Empty
+
+try:
+    import fcntl
+except ImportError:  # Windows: 호스트 전체 상한 없이 프로세스별 워커 수만 지킨다.
+    fcntl = None
+
+import script_model
+from compact_script import CompactScript
+from diagnostics import Recorder, operation, use
+
+# ---------------------------------------------------------
+# 무거운 작업 큐 (넘버링 / 연습용 대사 추출 / 등장인물 스캔 / 시작 문구 찾기)
+# ---------------------------------------------------------
+# 큰 PDF 파싱은 GIL 을 오래 잡아 같은 서버의 다른 사용자 rerun 까지 느려지므로
+# 서버 공용 프로세스 풀(워커 JOB_WORKERS 개)에서 돌린다.
+#   - 풀이 꽉 차면 제출 순서대로 기다린다. (화면에 대기 순번 표시)
+#   - 워커는 페이지마다 진행 상황(추출 작업은 읽은 대사까지)을 이벤트 큐로 보낸다.
+#   - 취소는 작업별 이벤트로 알리고, 워커가 다음 페이지로 넘어갈 때 멈춘다.
+#   - 화면이 JOB_LEASE_SECONDS 동안 상태를 보지 않으면(페이지를 떠난 경우) 취소한다.
+#   - SCRIPT_MATE_HOST_JOB_SLOTS 를 주면 같은 호스트의 여러 서버 프로세스(레플리카)를 합쳐
+#     동시에 도는 작업 수를 슬롯 파일 잠금으로 제한한다.
+JOB_WORKERS = int(os.environ.get('SCRIPT_MATE_JOB_WORKERS', '2'))
+HOST_JOB_SLOTS = int(os.environ.get('SCRIPT_MATE_HOST_JOB_SLOTS', '0') or 0)
+SLOT_DIR = os.environ.get('SCRIPT_MATE_JOB_SLOT_DIR') or os.path.join(tempfile.gettempdir(), 'script_mate_job_slots')
+JOB_LEASE_SECONDS = float(os.environ.get('SCRIPT_MATE_JOB_LEASE_SECONDS', '120'))
+# 등장인물 스캔은 앞쪽 이만큼의 페이지를 읽으면 중간 순위를 먼저 보여주고 나머지는 계속 센다.
+SCAN_PREVIEW_PAGES = int(os.environ.get('SCRIPT_MATE_SCAN_PREVIEW_PAGES', '5'))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# 단계별 진행률 구간. (넘버링은 좌표 분석이 대부분이고 PDF 쓰기는 짧다)
+STAGE_RANGES = {
+    'analyze': (0.0, 0.9),
+    'overlay': (0.9, 1.0),
+    'extract': (0.0, 1.0),
+    'scan': (0.0, 1.0),
+    'phrase': (0.0, 1.0),
+}
+CANCELLED_MESSAGE = "작업이 취소되었습니다."
+
+
+class JobCancelled(Exception):
+    """취소 요청을 받은 워커가 작업을 멈출 때 쓴다."""
+
+
+# ---------------------------------------------------------
+# 1. 워커 프로세스
+# ---------------------------------------------------------
+def _init_worker():
+    # 작업 안에서 다시 페이지 병렬 파싱용 프로세스를 띄우지 않는다. (동시 작업 수 = 워커 수)
+    script_model.PARSE_WORKERS = 0
+
+
+def _acquire_host_slot(cancel):
+    """호스트 전체 동시 작업 슬롯 하나를 잡는다. 프로세스가 죽으면 OS 가 잠금을 푼다."""
+    if HOST_JOB_SLOTS <= 0 or fcntl is None: return None
+    os.makedirs(SLOT_DIR, exist_ok=True)
+    while True:
+        for i in range(HOST_JOB_SLOTS):
+            f = open(os.path.join(SLOT_DIR, f'slot-{i}.lock'), 'a')
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except OSError:
+                f.close()
+        if cancel.is_set(): raise JobCancelled()
+        time.sleep(0.2)
+
+
+def _run_numbering(params, reporter):
+    from logic import analyze_and_get_coordinates, create_overlay_pdf, register_korean_font
+
+    coords = analyze_and_get_coordinates(
+        params['pdf_path'], params['roles'], params['config'],
+        start_page=params['start_page'], start_phrase=params['start_phrase'], start_at=params['start_at'],
+        progress=reporter('analyze'))
+    # 중간에 취소돼도 깨진 결과가 남지 않게 임시 파일에 쓴 뒤 바꾼다.
+    out_path = params['out_path']
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(out_path), suffix='.tmp')
+    os.close(fd)
+    try:
+        overlay_progress = reporter('overlay')
+        create_overlay_pdf(params['pdf_path'], tmp_path, coords, register_korean_font(), progress=overlay_progress)
+        # 저장하는 사이에 취소됐으면(같은 사용자가 다시 실행) 새 작업의 결과를 덮어쓰지 않는다.
+        overlay_progress(1, 1)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+    return {'numbers': len(coords), 'out_path': out_path}
+
+
+def _run_extract(params, reporter, lines):
+    from logic import iter_script_data
+
+    for entry in iter_script_data(
+            params['pdf_path'], params['my_role'], params['config'], allowed_roles=params['allowed_roles'],
+            start_page=params['start_page'], start_phrase=params['start_phrase'], start_at=params['start_at'],
+            progress=reporter('extract')):
+        lines.append(entry)
+    return None
+
+
+def _run_scan(params, send):
+    from logic import iter_candidate_counts, rank_candidates
+
+    counts = {}
+    for done, total, counts in iter_candidate_counts(params['pdf_path'], params['config']):
+        # 페이지마다 지금까지의 순위를 보낸다. (후보 이름 수만큼이라 작다)
+        send('scan', done, total, rank_candidates(counts))
+    return rank_candidates(counts)
+
+
+def _run_phrase(params, send):
+    from script_model import load_script
+
+    # 아직 파싱하지 않은 페이지를 읽어야 찾을 수 있으므로 페이지마다 진행 상황을 보낸다. (파싱 결과는 영구 캐시에 남아
+    # 이어지는 넘버링/추출 작업도 다시 파싱하지 않는다)
+    parsed_script = load_script(params['pdf_path'], params['config'].get('backend'))
+    for parsed in parsed_script.iter_pages():
+        send('phrase', parsed.index + 1, parsed_script.page_count, None)
+    return parsed_script.find_phrase(params['phrase'], layout=params['layout'])
+
+
+def _run_job(job_id, kind, params, events, cancel, diagnostics):
+    """[워커 프로세스] 작업 하나를 실행한다. 진행 상황과 결과는 모두 events 큐로 보낸다."""
+    recorder = Recorder(kind) if diagnostics else None
+    use(recorder)
+    lines = []  # 추출 작업에서 아직 보내지 않은 대사
+
+    def send(stage, done, total, output):
+        if cancel.is_set(): raise JobCancelled()
+        events.put(('progress', job_id, stage, done, total, output))
+
+    def reporter(stage):
+        def progress(done, total):
+            send(stage, done, total, lines[:])
+            lines.clear()
+        return progress
+
+    slot = None
+    result = error = None
+    try:
+        slot = _acquire_host_slot(cancel)
+        events.put(('started', job_id))
+        with operation(f'job.{kind}'):
+            if kind == 'numbering':
+                result = _run_numbering(params, reporter)
+            elif kind == 'scan':
+                result = _run_scan(params, send)
+            elif kind == 'phrase':
+                result = _run_phrase(params, send)
+            else:
+                result = _run_extract(params, reporter, lines)
+        state = DONE
+    except JobCancelled:
+        state, error = CANCELLED, CANCELLED_MESSAGE
+    except Exception as e:
+        state, error = FAILED, f"{type(e).__name__}: {e}"
+    finally:
+        if slot is not None: slot.close()
+        use(None)
+    report = (recorder.snapshot(), list(recorder.operations)) if recorder is not None else None
+    events.put(('finished', job_id, state, result, error, lines, report))
+
+
+# ---------------------------------------------------------
+# 2. 작업 상태 (서버 프로세스)
+# ---------------------------------------------------------
+class Job:
+    """
+    제출한 작업 하나. 화면은 이 객체를 세션에 두고 상태를 읽는다.
+    추출 작업은 읽은 대사를 lines(CompactScript)에 차례로 쌓고, wait_until 로 원하는 대사가 나오거나
+    끝날 때까지 기다릴 수 있으므로 읽은 앞부분으로 바로 연습을 시작할 수 있다.
+    스캔 작업은 candidates 에 지금까지 읽은 페이지 기준 순위를 두고, 끝나면 전체 스캔 결과로 바뀐다.
+    """
+
+    def __init__(self, kind, params, owner=None, recorder=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.owner = owner
+        self.recorder = recorder
+        self.state = QUEUED
+        self.stage = None
+        self.pages_done = 0
+        self.pages_total = 0
+        self.result = None
+        self.error = None
+        self.lines = CompactScript()
+        self.candidates = []
+        self.submitted = self.last_seen = time.time()
+        self.started = self.finished = None
+        self._cancel = None  # 워커에 넘긴 취소 이벤트 (Manager 프록시)
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in FINISHED
+
+    @property
+    def fraction(self):
+        """0~1 진행률."""
+        if self.state == DONE: return 1.0
+        low, high = STAGE_RANGES.get(self.stage, (0.0, 0.0))
+        if not self.pages_total: return low
+        return low + (high - low) * min(1.0, self.pages_done / self.pages_total)
+
+    @property
+    def preview_ready(self):
+        """스캔 작업: 앞쪽 SCAN_PREVIEW_PAGES 페이지를 읽었거나 끝났으면 중간 순위를 보여줄 수 있다."""
+        return self.done or (self.pages_total > 0 and self.pages_done >= min(SCAN_PREVIEW_PAGES, self.pages_total))
+
+    def _receive(self, output):
+        # self._cond 안에서 호출. 추출은 새로 읽은 대사, 스캔은 지금까지의 순위를 받는다.
+        if self.kind == 'scan':
+            if output is not None: self.candidates = output
+        elif output:
+            self.lines.extend(output)
+
+    def touch(self):
+        """화면이 아직 이 작업을 보고 있음을 알린다."""
+        self.last_seen = time.time()
+
+    def wait_until(self, predicate, timeout=None):
+        """predicate(lines) 가 참이 되거나 작업이 끝날 때까지 기다린다."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.done or predicate(self.lines), timeout=timeout)
+        return predicate(self.lines)
+
+
+class JobQueue:
+    """서버 공용 작업 큐. 풀과 Manager 프로세스는 첫 제출 때 띄운다."""
+
+    def __init__(self, workers=JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS):
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self._jobs = {}           # 끝나지 않은 작업 id -> Job
+        self._pending = deque()   # 워커를 기다리는 작업 (제출 순)
+        self._running = 0         # 풀에 넘긴 작업 수
+        self._pool = None
+        self._manager = None
+        self._events = None
+        # 풀 완료 콜백이 제출 중인 스레드에서 바로 불릴 수 있어 재진입 가능한 잠금을 쓴다.
+        self._lock = threading.RLock()
+
+    def _start(self):
+        if self._pool is not None: return
+        # 스레드가 많은 Streamlit 서버에서 fork 는 안전하지 않으므로 spawn 을 쓴다.
+        ctx = multiprocessing.get_context('spawn')
+        self._manager = ctx.Manager()
+        self._events = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_init_worker)
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    # --- 제출 / 취소 ---
+    def submit(self, kind, params, owner=None, recorder=None):
+        """
+        작업을 큐에 넣고 Job 을 돌려준다.
+        owner 가 같은 사용자의 같은 종류 작업이 아직 돌고 있으면 취소한다. (다시 누른 경우)
+        recorder 를 주면 워커에서 모은 진단 기록을 끝날 때 더한다.
+        """
+        with self._lock:
+            if owner is not None:
+                for old in [job for job in self._jobs.values() if job.owner == owner and job.kind == kind]:
+                    self.cancel(old)
+            self._start()
+            job = Job(kind, params, owner, recorder)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._dispatch()
+        return job
+
+    def _dispatch(self):
+        """잠금 안에서 호출. 빈 워커만큼 대기 작업을 풀에 넘긴다."""
+        while self._pending and self._running < self.workers:
+            job = self._pending.popleft()
+            job._cancel = self._manager.Event()
+            self._running += 1
+            pool = self._pool
+            future = pool.submit(_run_job, job.id, job.kind, job.params, self._events, job._cancel, job.recorder is not None)
+            future.add_done_callback(lambda f, job=job, pool=pool: self._slot_freed(job, pool, f))
+
+    def _slot_freed(self, job, pool, future):
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._running -= 1
+            # 워커가 비정상 종료하면 풀 전체를 쓸 수 없게 되므로 새로 만든다.
+            if isinstance(error, BrokenProcessPool) and self._pool is pool:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker)
+            self._dispatch()
+        if error is not None:
+            self._finish(job, FAILED, error=f"{type(error).__name__}: {error}")
+
+    def cancel(self, job):
+        """대기 중이면 바로 빼고, 실행 중이면 워커에 알린다. (다음 페이지에서 멈춤)"""
+        with self._lock:
+            queued = job in self._pending
+            if queued: self._pending.remove(job)
+        if queued:
+            self._finish(job, CANCELLED, error=CANCELLED_MESSAGE)
+        elif job._cancel is not None and not job.done:
+            try:
+                job._cancel.set()
+            except (EOFError, OSError):  # 서버 종료 중 (Manager 가 이미 내려감)
+                pass
+
+    def position(self, job):
+        """대기 순번 (1부터). 이미 워커에 넘어갔거나 끝났으면 0."""
+        with self._lock:
+            for i, pending in enumerate(self._pending, 1):
+                if pending is job: return i
+        return 0
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'running': self._running, 'queued': len(self._pending), 'host_slots': HOST_JOB_SLOTS}
+
+    # --- 워커 이벤트 처리 ---
+    def _listen(self):
+        last_expire = time.time()
+        while True:
+            try:
+                event = self._events.get(timeout=1)
+            except Empty:
+                event = None
+            except (EOFError, OSError):  # 서버 종료
+                return
+            if event is not None: self._apply(event)
+            if time.time() - last_expire >= 1:
+                self._expire()
+                last_expire = time.time()
+
+    def _apply(self, event):
+        kind, job_id = event[0], event[1]
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None: return
+        if kind == 'started':
+            with job._cond:
+                if job.state == QUEUED:
+                    job.state = RUNNING
+                    job.started = time.time()
+        elif kind == 'progress':
+            _, _, stage, done, total, output = event
+            with job._cond:
+                job._receive(output)
+                job.stage, job.pages_done, job.pages_total = stage, done, total
+                job._cond.notify_all()
+        elif kind == 'finished':
+            _, _, state, result, error, lines, report = event
+            with job._cond:
+                job._receive(result if job.kind == 'scan' else lines)
+            if report is not None and job.recorder is not None: job.recorder.merge(*report)
+            self._finish(job, state, result, error)
+
+    def _finish(self, job, state, result=None, error=None):
+        with job._cond:
+            if job.done: return
+            job.state, job.result, job.error = state, result, error
+            job.finished = time.time()
+            job._cond.notify_all()
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def _expire(self):
+        """화면이 한동안 상태를 보지 않은 작업(페이지를 떠난 사용자)은 취소한다."""
+        now = time.time()
+        with self._lock:
+            stale = [job for job in self._jobs.values() if now - job.last_seen > self.lease_seconds]
+        for job in stale:
+            self.cancel(job)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
+
+
+# ---------------------------------------------------------
+# 3. 화면에서 쓰는 제출 함수
+# ---------------------------------------------------------
+def submit_numbering(pdf_path, out_path, roles, config, start_page=1, start_phrase="", start_at=None, owner=None, recorder=None):
+    """좌표 분석 + 번호 PDF 쓰기. 끝나면 job.result = {'numbers', 'out_path'}"""
+    params = {
+        'pdf_path': pdf_path, 'out_path': out_path, 'roles': list(roles), 'config': config,
+        'start_page': start_page, 'start_phrase': start_phrase, 'start_at': start_at,
+    }
+    return get_job_queue().submit('numbering', params, owner, recorder)
+
+
+def submit_extract(pdf_path, my_role, config, allowed_roles=None, start_page=1, start_phrase="", start_at=None, owner=None, recorder=None):
+    """연습용 대사 추출. 읽은 대사는 페이지마다 job.lines 에 쌓인다."""
+    params = {
+        'pdf_path': pdf_path, 'my_role': my_role, 'config': config,
+        'allowed_roles': list(allowed_roles) if allowed_roles else None,
+        'start_page': start_page, 'start_phrase': start_phrase, 'start_at': start_at,
+    }
+    return get_job_queue().submit('extract', params, owner, recorder)
+
+
+def submit_scan(pdf_path, config, owner=None, recorder=None):
+    """등장인물 스캔. 읽는 동안 job.candidates 가 갱신되고, 끝나면 job.result(= scan_candidates 결과)와 같아진다."""
+    params = {'pdf_path': pdf_path, 'config': config}
+    return get_job_queue().submit('scan', params, owner, recorder)
+
+
+def submit_phrase_search(pdf_path, phrase, config, layout=False, owner=None, recorder=None):
+    """
+    시작 문구 찾기. 끝나면 job.result = ParsedScript.find_phrase 결과 (여러 곳이면 화면에서 고른다)
+    config: 이어서 돌릴 넘버링/추출과 같은 설정 (같은 backend 로 파싱해야 찾은 줄이 같다)
+    layout: 넘버링은 False(단어 묶음 줄), 연습용 추출은 True(레이아웃 줄)
+    """
+    params = {'pdf_path': pdf_path, 'phrase': phrase, 'config': config, 'layout': layout}
+    return get_job_queue().submit('phrase', params, owner, recorder)
@@ -1,22 +1,31 @@
-import pdfplumber
 import fitz  # PyMuPDF
 import re
 import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import tempfile
+from diagnostics import count, span, timed
+from direction_rules import classify_lines, is_direction
+from parse_cache import get_parse_cache, item_key
+from script_model import load_script
+from script_index import ScriptIndex
+from text_search import compact
 
 # ---------------------------------------------------------
 # 1. 공통 유틸
 # ---------------------------------------------------------
+# 글꼴 파일은 프로세스당 한 번만 읽어 두고 모든 PDF/페이지에서 재사용한다.
+_font_buffers = {}
+_fitz_fonts = {}
+
 def register_korean_font():
+    if 'NanumGothic' in _font_buffers:
+        return 'NanumGothic'
     font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'NanumGothic.ttf')
     if not os.path.exists(font_path):
         return "Helvetica"
     try:
-        pdfmetrics.registerFont(TTFont('NanumGothic', font_path))
+        with open(font_path, 'rb') as f:
+            font_buffer = f.read()
+        fitz.Font(fontbuffer=font_buffer)  # 깨진 글꼴 파일 검증
+        _font_buffers['NanumGothic'] = font_buffer
         return 'NanumGothic'
     except:
         return "Helvetica"
@@ -24,202 +33,295 @@ def register_korean_font():
 # ---------------------------------------------------------
 # 2. [공통] 등장인물 스캔
 # ---------------------------------------------------------
-def scan_candidates(pdf_path, config):
+def rank_candidates(counts):
+    """이름 -> 등장 횟수 를 후보 순위로. (많은 순, 같으면 먼저 나온 순)"""
+    return sorted(counts.items(), key=lambda x: x[1], reverse=True)
+
+def iter_candidate_counts(pdf_path, config):
+    """
+    scan_candidates 의 점진 버전. 페이지를 읽을 때마다 (읽은 페이지 수, 전체 페이지 수, 이름 -> 등장 횟수) 를 내보낸다.
+    dict 는 계속 갱신되는 같은 객체이고, 끝까지 읽은 뒤의 rank_candidates 결과가 scan_candidates 결과다.
+    """
     wrapper_regex = config.get('wrapper_regex')
     separator = config.get('separator')
+
+    # 같은 대본/형식 설정의 결과는 영구 캐시에서 바로 돌려준다.
+    parsed_script = load_script(pdf_path, config.get('backend'))
+    total_pages = parsed_script.page_count
+    cache = get_parse_cache()
+    cache_item = item_key(wrapper_regex=wrapper_regex, separator=separator)
+    if cache is not None:
+        cached = cache.get(parsed_script.cache_key, 'candidates', cache_item)
+        if cached is not None:
+            yield total_pages, total_pages, dict(cached)
+            return
     
-    text_content = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            extracted = page.extract_text(layout=True)
-            if extracted: text_content += extracted + "\n"
-    
-    lines = text_content.split('\n')
     candidates = {}
-    
-    for line in lines:
-        line = line.strip()
-        if not line: continue
-        
-        found_name = None
-        
-        if wrapper_regex:
-            match = re.match(wrapper_regex, line)
-            if match: found_name = match.group(1)
-        elif separator:
-            if separator in line:
-                parts = line.split(separator, 1)
-                found_name = parts[0].strip()
-        else:
-            parts = re.split(r'\s{2,}|\t', line, maxsplit=1)
-            if len(parts) == 2:
-                found_name = parts[0].strip()
-
-        if found_name:
-            if 1 <= len(found_name) <= 15:
-                candidates[found_name] = candidates.get(found_name, 0) + 1
+    scanned = 0
+    for parsed_page in parsed_script.iter_pages():
+        count('pages.processed')
+        with span('scan.match_roles'):
+            for line, name_end in zip(parsed_page.text_lines, parsed_page.name_ends):
+                scanned += 1
+            
+                found_name = None
             
-    return sorted(candidates.items(), key=lambda x: x[1], reverse=True)
+                if wrapper_regex:
+                    match = re.match(wrapper_regex, line)
+                    if match: found_name = match.group(1)
+                elif separator:
+                    if separator in line:
+                        parts = line.split(separator, 1)
+                        found_name = parts[0].strip()
+                elif name_end:
+                    # 자동: 단어 좌표에서 구한 첫 넓은 간격(공백 2칸 이상)이 이름/대사 경계
+                    found_name = line[:name_end]
+
+                if found_name:
+                    if 1 <= len(found_name) <= 15:
+                        candidates[found_name] = candidates.get(found_name, 0) + 1
+        yield parsed_page.index + 1, total_pages, candidates
+            
+    count('lines.scanned', scanned)
+    if wrapper_regex: count('regex.evals', scanned)
+    if cache is not None: cache.put(parsed_script.cache_key, 'candidates', cache_item, rank_candidates(candidates))
+
+def scan_candidates(pdf_path, config, progress=None):
+    """[(이름, 등장 횟수)] 순위. progress(읽은 페이지 수, 전체 페이지 수) 를 페이지마다 부른다."""
+    counts = {}
+    for done, total, counts in iter_candidate_counts(pdf_path, config):
+        if progress is not None: progress(done, total)
+    return rank_candidates(counts)
 
 # ---------------------------------------------------------
 # 3. [넘버링] 좌표 분석
 # ---------------------------------------------------------
-def analyze_and_get_coordinates(pdf_path, roles, config, start_page=1, start_phrase=""):
-    wrapper_regex = config.get('wrapper_regex')
-    separator = config.get('separator')
+def _literal_head(pattern):
+    """패턴이 매칭하는 첫 글자(리터럴)를 구한다. 알 수 없으면 None."""
+    p = pattern.lstrip('^')
+    while p.startswith('\\s*'): p = p[3:]
+    if p.startswith('\\') and len(p) > 1 and not p[1].isalnum(): return p[1]
+    if p and p[0] not in '.^$*+?{}[]\\|()': return p[0]
+    return None
+
+class RoleMatcher:
+    """
+    선택된 배역들을 실행당 한 번만 정규식으로 컴파일한다.
+    배역 순서대로 대안(alternation)을 이어 붙이므로, 먼저 선택된 배역이 우선한다.
+    줄 첫 글자로 후보 대안을 미리 걸러 배역 수와 무관하게 줄당 정규식 1회만 실행한다.
+    """
+    def __init__(self, roles, config):
+        wrapper_regex = config.get('wrapper_regex')
+        separator = config.get('separator')
+        self.roles = list(roles)
+        self.evals = 0  # 실행한 정규식 수 (진단용)
+
+        alternatives = []  # (배역 순번, 첫 글자, 패턴)
+        for i, role in enumerate(self.roles):
+            role_patterns = []
+            check_pattern = re.escape(role)
+            if wrapper_regex:
+                if '(.+?)' in wrapper_regex:
+                    check_pattern = wrapper_regex.replace('(.+?)', re.escape(role))
+                    check_pattern = check_pattern.replace('^', '').replace('\\s*', '')
+
+            if separator:
+                role_patterns.append(f"^{check_pattern}\\s*{re.escape(separator)}")
+            else:
+                role_patterns.append(f"^{re.escape(role)}" + r'(?:\s{2,}|\t)')
+                if wrapper_regex:
+                    role_patterns.append(wrapper_regex.replace('(.+?)', re.escape(role)))
+
+            for pattern in role_patterns:
+                alternatives.append((i, _literal_head(pattern), pattern))
+
+        def compile_group(group):
+            if not group: return None
+            return re.compile("|".join(f"(?P<r{i}_{n}>{pattern})" for n, (i, _, pattern) in enumerate(group)))
+
+        heads = {head for _, head, _ in alternatives if head is not None}
+        self._by_head = {
+            head: compile_group([alt for alt in alternatives if alt[1] in (head, None)])
+            for head in heads
+        }
+        self._fallback = compile_group([alt for alt in alternatives if alt[1] is None])
+
+    def match(self, line_text):
+        """줄 맨 앞에서 매칭되는 배역 이름을 돌려준다. 없으면 None."""
+        regex = self._by_head.get(line_text.lstrip()[:1], self._fallback)
+        if regex is None: return None
+        self.evals += 1
+        m = regex.match(line_text)
+        if not m: return None
+        return self.roles[int(m.lastgroup[1:].split('_')[0])]
+
+def resolve_start(parsed_script, start_page=1, start_phrase="", start_at=None):
+    """
+    시작 위치 -> (페이지 idx, 그 페이지의 시작 줄 정보 또는 None).
+    start_at: ParsedScript.find_phrase 결과 중 하나 (여러 곳에서 찾은 경우 사용자가 고른 위치)
+    start_phrase 만 주면 start_page 이후 첫 일치. 일치가 없으면 None.
+    """
+    start_page_idx = max(0, start_page - 1)
+    if start_at is None and start_phrase:
+        hits = parsed_script.find_phrase(start_phrase, start_page_idx)
+        if not hits: return None
+        start_at = hits[0]
+    if start_at is not None:
+        return start_at['page'], start_at
+    return start_page_idx, None
+
+def analyze_and_get_coordinates(pdf_path, roles, config, start_page=1, start_phrase="", start_at=None, progress=None):
+    """
+    번호를 찍을 줄마다 {'page', 'x', 'y', 'number', 'role'} (role = 그 줄에서 매칭된 배역).
+    progress(처리한 페이지 수, 전체 페이지 수) 를 페이지마다 부른다.
+    progress 가 예외를 던지면 그대로 중단된다. (작업 취소용)
+    """
     results = []
     
-    start_page_idx = max(0, start_page - 1)
     number_counter = 1
-    found_start_phrase = False if start_phrase else True
-    clean_start_phrase = start_phrase.replace(" ", "").replace("\t", "").replace("\n", "")
+    role_matcher = RoleMatcher(roles, config)
+    parsed_script = load_script(pdf_path, config.get('backend'))
+    start = resolve_start(parsed_script, start_page, start_phrase, start_at)
+    if start is None: return results
+    start_page_idx, start_hit = start
     
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_idx, page in enumerate(pdf.pages):
-            if page_idx < start_page_idx: continue
-            
-            words = page.extract_words(x_tolerance=3, y_tolerance=3, keep_blank_chars=True)
-            words.sort(key=lambda w: w['top'])
-            
-            lines_data = [] 
-            if words:
-                current_line = [words[0]]
-                current_top = words[0]['top']
-                for w in words[1:]:
-                    if abs(w['top'] - current_top) < 5:
-                        current_line.append(w)
-                    else:
-                        lines_data.append(current_line)
-                        current_line = [w]
-                        current_top = w['top']
-                lines_data.append(current_line)
-            
-            for line_words in lines_data:
-                line_words.sort(key=lambda w: w['x0'])
-                line_text = " ".join([w['text'] for w in line_words]).strip()
-                
-                if not found_start_phrase and clean_start_phrase:
-                    clean_line = line_text.replace(" ", "").replace("\t", "")
-                    if clean_start_phrase in clean_line:
-                        found_start_phrase = True
-                    else:
-                        continue 
-
-                matched_role = None
-                for role in roles:
-                    check_pattern = re.escape(role)
-                    if wrapper_regex:
-                        if '(.+?)' in wrapper_regex:
-                            check_pattern = config['wrapper_regex'].replace('(.+?)', re.escape(role))
-                            check_pattern = check_pattern.replace('^', '').replace('\\s*', '')
-                    
-                    if separator:
-                        full_regex_str = f"^{check_pattern}\\s*{re.escape(separator)}"
-                        if re.match(full_regex_str, line_text):
-                             matched_role = role
-                             break
-                    else:
-                        strict_space_pattern = re.compile(f"^{re.escape(role)}" + r'(\s{2,}|\t)')
-                        if strict_space_pattern.match(line_text):
-                            matched_role = role
-                            break
-                        if wrapper_regex:
-                             full_regex = config['wrapper_regex'].replace('(.+?)', re.escape(role))
-                             if re.match(full_regex, line_text):
-                                 matched_role = role
-                                 break
+    # 줄 텍스트와 첫 단어 좌표만 쓴다. (문서별로 보관되므로 다시 넘버링할 때는 파싱 없이 매칭만)
+    for page_lines in parsed_script.iter_page_lines(start_page_idx):
+        page_idx = page_lines.index
+        texts = page_lines.texts
+        first_line = 0
+        if start_hit is not None and page_idx == start_hit['page']:
+            first_line = start_hit['line']
+        count('pages.processed')
+        count('lines.scanned', max(0, len(texts) - first_line))
+        with span('numbering.match_roles'):
+            for line_idx in range(first_line, len(texts)):
+                matched_role = role_matcher.match(texts[line_idx])
                 
                 if matched_role:
-                    first_word = line_words[0]
                     results.append({
                         'page': page_idx,
-                        'x': first_word['x0'] - 20,
-                        'y': page.height - first_word['bottom'] + 2,
-                        'number': number_counter
+                        'x': page_lines.x0[line_idx] - 20,
+                        'y': page_lines.height - page_lines.bottom[line_idx] + 2,
+                        'number': number_counter,
+                        'role': matched_role,
                     })
                     number_counter += 1
+        if progress is not None: progress(page_idx - start_page_idx + 1, parsed_script.page_count - start_page_idx)
+    count('lines.matched', len(results))
+    count('regex.evals', role_matcher.evals)
     return results
 
 # ---------------------------------------------------------
 # 4. [넘버링] PDF 생성
 # ---------------------------------------------------------
-def create_overlay_pdf(original_pdf_path, output_path, coordinates, font_name):
-    doc = fitz.open(original_pdf_path)
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_overlay:
-        c = canvas.Canvas(tmp_overlay.name, pagesize=A4)
-        current_page = -1
+def _number_text_op(font_name, font_buffer):
+    """번호 문자열 -> PDF 텍스트 연산자 피연산자. 내장 Helvetica 는 문자 그대로, 임베드 글꼴은 글리프 ID 로."""
+    if not font_buffer:
+        return lambda text: f"({text})"
+    font = _fitz_fonts.get(font_name)
+    if font is None:
+        font = _fitz_fonts[font_name] = fitz.Font(fontbuffer=font_buffer)
+    glyphs = {c: f"{font.has_glyph(ord(c)):04x}" for c in "0123456789"}
+    return lambda text: "<" + "".join(glyphs[c] for c in text) + ">"
+
+def create_overlay_pdf(original_pdf_path, output_path, coordinates, font_name, progress=None):
+    """
+    원본 페이지에 번호를 직접 써 넣는다. (임시 오버레이 PDF 없이 실제 페이지 크기 기준)
+    coordinates 의 x/y 는 PDF 좌표계(왼쪽 아래 원점) 그대로 쓴다.
+    progress(번호를 넣은 페이지 수, 번호가 들어갈 페이지 수) 를 페이지마다 부른다.
+    """
+    with span('pdf.open'):
+        doc = fitz.open(original_pdf_path)
+    font_buffer = _font_buffers.get(font_name)
+    fitz_font = font_name if font_buffer else "helv"
+    to_operand = _number_text_op(font_name, font_buffer)
+
+    with span('overlay.render'):
+        ops_by_page = {}
         for item in coordinates:
-            while current_page < item['page']:
-                if current_page != -1: c.showPage()
-                current_page += 1
-                c.setFont(font_name, 10)
-                c.setFillColorRGB(1, 0, 0)
-            c.drawString(item['x'], item['y'], str(item['number']))
-        c.save()
-        tmp_path = tmp_overlay.name
-
-    overlay_doc = fitz.open(tmp_path)
-    for i in range(len(doc)):
-        if i < len(overlay_doc):
-            doc[i].show_pdf_page(doc[i].rect, overlay_doc, i)
-    doc.save(output_path)
-    overlay_doc.close()
-    os.remove(tmp_path)
+            if item['page'] >= len(doc): continue
+            ops_by_page.setdefault(item['page'], []).append(
+                f"1 0 0 1 {item['x']:.2f} {item['y']:.2f} Tm {to_operand(str(item['number']))} Tj"
+            )
+
+        for done, (page_idx, ops) in enumerate(ops_by_page.items(), 1):
+            page = doc[page_idx]
+            # 같은 글꼴 버퍼는 문서 안에서 xref 하나로 공유된다. (페이지당 리소스 등록 1회)
+            if font_buffer: page.insert_font(fontname=fitz_font, fontbuffer=font_buffer)
+            else: page.insert_font(fontname=fitz_font)
+            page.wrap_contents()
+
+            stream = "q\nBT\n1 0 0 rg\n/%s 10 Tf\n%s\nET\nQ" % (fitz_font, "\n".join(ops))
+            xref = doc.get_new_xref()
+            doc.update_object(xref, "<<>>")
+            doc.update_stream(xref, stream.encode())
+            contents = " ".join(f"{x} 0 R" for x in page.get_contents() + [xref])
+            doc.xref_set_key(page.xref, "Contents", f"[{contents}]")
+            if progress is not None: progress(done, len(ops_by_page))
+
+        if font_buffer: doc.subset_fonts()
+    with span('overlay.save'):
+        doc.save(output_path, garbage=3, deflate=True)
+        doc.close()
+    count('pages.numbered', len(ops_by_page))
+    count('bytes.written', os.path.getsize(output_path))
 
 # ---------------------------------------------------------
 # 5. [연습] 텍스트 추출 (로직 개선 적용 완료)
 # ---------------------------------------------------------
-def extract_script_data(pdf_path, my_role, config, allowed_roles=None, start_page=1, start_phrase=""):
+def iter_script_data(pdf_path, my_role, config, allowed_roles=None, start_page=1, start_phrase="", start_at=None, progress=None):
+    """
+    extract_script_data 의 스트리밍 버전. 페이지를 읽는 대로 대사/지문 dict 를 하나씩 내보낸다.
+    페이지를 넘어 이어지는 대사는 다음 역할/지문이 나오거나 문서가 끝날 때 flush 된다.
+    끝까지 읽은 결과는 영구 캐시에 저장해, 같은 대본/설정/배역/시작 위치면 파싱 없이 돌려준다.
+    (my_role 은 결과에 영향이 없어 캐시 키에 넣지 않는다)
+    progress(읽은 페이지 수, 전체 페이지 수) 는 페이지를 읽기 시작할 때마다와 끝에 부른다.
+    """
+    parsed_script = load_script(pdf_path, config.get('backend'))
+    # 시작 위치는 추출이 읽는 레이아웃 줄(text_lines) 기준이다. (단어 묶음 줄과는 글자 크기가 섞인 페이지에서 다르게 나뉜다)
+    # start_at 이 find_phrase(layout=True) 결과면 그 줄부터, 단어 묶음 줄 결과거나 문구만 주면 그 페이지 이후 레이아웃 줄의 첫 일치부터.
+    if start_at is not None and start_at.get('layout'):
+        start_page_idx, phrase, start_line = start_at['page'], None, start_at['line']
+    elif start_at is not None:
+        start_page_idx, phrase, start_line = start_at['page'], start_at['phrase'], 0
+    else:
+        start_page_idx, phrase, start_line = max(0, start_page - 1), compact(start_phrase), 0
+    total_pages = parsed_script.page_count - start_page_idx
+
+    cache = get_parse_cache()
+    cache_item = item_key(
+        wrapper_regex=config.get('wrapper_regex'),
+        separator=config.get('separator'),
+        roles=sorted(set(allowed_roles)) if allowed_roles else None,
+        start_page=start_page_idx,
+        start_phrase=phrase or None,
+        start_line=start_line,
+    )
+    if cache is not None:
+        cached = cache.get(parsed_script.cache_key, 'script', cache_item)
+        if cached is not None:
+            yield from cached
+            if progress is not None: progress(total_pages, total_pages)
+            return
+
     script_data = []
+    # 추출 시간만 잰다. (yield 뒤 호출 측이 쓰는 시간은 제외, 페이지 파싱은 포함)
+    for entry in timed(_iter_script_entries(parsed_script, config, allowed_roles, start_page_idx, phrase, start_line, progress), 'extract.lines'):
+        script_data.append(entry)
+        yield entry
+    count('lines.extracted', len(script_data))
+    if cache is not None: cache.put(parsed_script.cache_key, 'script', cache_item, script_data)
+
+def _iter_script_entries(parsed_script, config, allowed_roles, start_page_idx, start_phrase=None, start_line=0, progress=None):
+    script_data = []  # 아직 내보내지 않은 항목 (flush_buffer 등이 여기에 쌓는다)
     wrapper_regex = config.get('wrapper_regex')
     separator = config.get('separator')
     current_role = None
+    role_page = None
     buffer_text = []
     valid_roles_set = set(allowed_roles) if allowed_roles else None
 
-    start_page_idx = max(0, start_page - 1)
-    found_start_phrase = False if start_phrase else True
-    clean_start_phrase = start_phrase.replace(" ", "").replace("\t", "").replace("\n", "")
-
-    # [지문 판단 로직]
-    def is_likely_direction(line_text, is_speaking):
-        line_text = line_text.strip()
-        if not line_text: return False
-        
-        # 1. 괄호
-        if line_text.startswith('(') and line_text.endswith(')'): return True
-        
-        # 2. 지문 키워드
-        keywords = ["사이", "퇴장", "등장", "암전", "막", "커튼콜"]
-        for kw in keywords:
-            if kw in line_text and len(line_text) < 15: return True
-
-        # 3. 1인칭 보호
-        first_person_keywords = ["나 ", "나는", "내가", "나의", "내 ", "우리는", "우리가"]
-        for kw in first_person_keywords:
-            if line_text.startswith(kw): return False
-
-        # 4. 접속사 보호
-        conjunctions = ["그리고", "그런데", "하지만", "그렇게", "그래서", "그러자", "또한"]
-        for conj in conjunctions:
-            if line_text.startswith(conj): return False
-
-        # 5. 길이 및 어미 체크
-        if len(line_text) > 35: return False 
-
-        clean_end = re.sub(r'[^가-힣]', '', line_text[-5:])
-        ends_with_jimum = clean_end.endswith('다') or clean_end.endswith('함') or clean_end.endswith('음') or clean_end.endswith('장')
-        
-        if ends_with_jimum:
-            if not is_speaking:
-                return True
-            else:
-                if len(line_text) < 20: 
-                    return True
-                else:
-                    return False
-        return False
-
     def remove_parentheses(text):
         text = re.sub(r'\(.*?\)', '', text)
         text = re.sub(r'\[.*?\]', '', text)
@@ -236,89 +338,105 @@ def extract_script_data(pdf_path, my_role, config, allowed_roles=None, start_pag
                     'role': current_role,
                     'text': clean_speech,
                     'original_text': full_text,
-                    'type': 'dialogue'
+                    'type': 'dialogue',
+                    'page': role_page
                 })
         buffer_text = []
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_idx, page in enumerate(pdf.pages):
-            if page_idx < start_page_idx: continue
+    total_pages = parsed_script.page_count - start_page_idx
+    for parsed_page in parsed_script.iter_pages(start_page_idx):
+        if progress is not None: progress(parsed_page.index - start_page_idx, total_pages)
+        lines = parsed_page.text_lines
+        if not lines: continue
+        page_no = parsed_page.index + 1
+        
+        name_ends = parsed_page.name_ends
+        if parsed_page.index == start_page_idx and start_line:
+            lines, name_ends = lines[start_line:], name_ends[start_line:]
+        if start_phrase:
+            # 시작 문구 전의 줄은 건너뛴다. (문구가 있는 페이지까지)
+            first = next((i for i, line in enumerate(lines) if start_phrase in compact(line)), None)
+            if first is None: continue
+            lines, name_ends = lines[first:], name_ends[first:]
+            start_phrase = None
+        count('pages.processed')
+        count('lines.scanned', len(lines))
+        # 지문 여부는 페이지 줄 전체를 한 번에 분류해 두고, 말하는 중인지에 따라 고른다.
+        verdicts = classify_lines(lines)
+        for line, name_end, verdict in zip(lines, name_ends, verdicts):
 
-            text = page.extract_text(layout=True)
-            if not text: continue
+            # 역할 감지
+            found_name = None
+            content_text = ""
             
-            lines = text.split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line: continue 
-
-                if not found_start_phrase and clean_start_phrase:
-                    clean_line = line.replace(" ", "").replace("\t", "")
-                    if clean_start_phrase in clean_line: found_start_phrase = True
-                    else: continue 
+            if wrapper_regex:
+                match = re.match(wrapper_regex, line)
+                if match:
+                    found_name = match.group(1)
+                    content_text = line[match.end():].strip()
+                    if separator and content_text.startswith(separator): content_text = content_text[len(separator):].strip()
+            elif separator:
+                if separator in line:
+                    parts = line.split(separator, 1)
+                    found_name = parts[0].strip()
+                    content_text = parts[1].strip()
+            elif name_end:
+                found_name = line[:name_end]
+                content_text = line[name_end:].strip()
 
-                # 역할 감지
-                found_name = None
-                content_text = ""
+            # Case 1: 새로운 역할
+            if found_name and (not valid_roles_set or found_name in valid_roles_set) and (1 <= len(found_name) <= 15):
+                flush_buffer()
+                current_role = found_name
+                role_page = page_no
+                if content_text:
+                    buffer_text.append(content_text)
+            
+            # Case 2: 역할 아님
+            else:
+                is_speaking = (current_role is not None)
                 
-                if wrapper_regex:
-                    match = re.match(wrapper_regex, line)
-                    if match:
-                        found_name = match.group(1)
-                        content_text = line[match.end():].strip()
-                        if separator and content_text.startswith(separator): content_text = content_text[len(separator):].strip()
-                elif separator:
-                    if separator in line:
-                        parts = line.split(separator, 1)
-                        found_name = parts[0].strip()
-                        content_text = parts[1].strip()
-                else: 
-                    parts = re.split(r'\s{2,}|\t', line, maxsplit=1)
-                    if len(parts) == 2:
-                        found_name = parts[0].strip()
-                        content_text = parts[1].strip()
-
-                # Case 1: 새로운 역할
-                if found_name and (not valid_roles_set or found_name in valid_roles_set) and (1 <= len(found_name) <= 15):
+                is_continuation = False
+                if is_speaking and buffer_text:
+                    last_line = buffer_text[-1].strip()
+                    if not last_line.endswith('.') and not last_line.endswith('?') and not last_line.endswith('!'):
+                        is_continuation = True
+                        
+                if is_continuation:
+                    buffer_text.append(line)
+                elif is_direction(verdict, is_speaking):
                     flush_buffer()
-                    current_role = found_name
-                    if content_text:
-                        if is_likely_direction(content_text, is_speaking=False):
-                             buffer_text.append(content_text)
-                        else:
-                            buffer_text.append(content_text)
-                
-                # Case 2: 역할 아님
+                    current_role = None
+                    script_data.append({
+                        'role': '지문', 
+                        'text': line, 
+                        'original_text': line,
+                        'type': 'action',
+                        'page': page_no
+                    })
                 else:
-                    is_speaking = (current_role is not None)
-                    
-                    is_continuation = False
-                    if is_speaking and buffer_text:
-                        last_line = buffer_text[-1].strip()
-                        if not last_line.endswith('.') and not last_line.endswith('?') and not last_line.endswith('!'):
-                            is_continuation = True
-                            
-                    if is_continuation:
+                    if current_role:
                         buffer_text.append(line)
-                    elif is_likely_direction(line, is_speaking):
-                        flush_buffer()
-                        current_role = None
+                    else:
                         script_data.append({
                             'role': '지문', 
                             'text': line, 
                             'original_text': line,
-                            'type': 'action'
+                            'type': 'action',
+                            'page': page_no
                         })
-                    else:
-                        if current_role:
-                            buffer_text.append(line)
-                        else:
-                            script_data.append({
-                                'role': '지문', 
-                                'text': line, 
-                                'original_text': line,
-                                'type': 'action'
-                            })
 
+        # 페이지가 끝날 때마다 완성된 항목을 바로 내보낸다.
+        yield from script_data
+        script_data.clear()
+
+    if progress is not None: progress(total_pages, total_pages)
     flush_buffer()
-    return script_data
\ No newline at end of file
+    yield from script_data
+
+def extract_script_data(pdf_path, my_role, config, allowed_roles=None, start_page=1, start_phrase="", with_index=False, start_at=None, progress=None):
+    """with_index=True 면 (대사 목록, ScriptIndex) 를 돌려준다."""
+    script_data = list(iter_script_data(pdf_path, my_role, config, allowed_roles, start_page, start_phrase, start_at, progress))
+    if with_index:
+        return script_data, ScriptIndex().sync(script_data)
+    return script_data
@@ -1,12 +1,14 @@
 import streamlit as st
 import os
-import tempfile
+import uuid
 import sys
-import pdfplumber
 
 # 상위 폴더의 logic.py 경로 설정
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from logic import scan_candidates, analyze_and_get_coordinates, create_overlay_pdf, register_korean_font
+from script_model import load_script
+from upload_store import get_upload_store
+from diagnostics import DIAGNOSTICS_DEFAULT, Recorder, operation, use
+from jobs import DONE, QUEUED, get_job_queue, submit_numbering, submit_phrase_search, submit_scan
 
 # --- CSS ---
 st.markdown("""
@@ -29,9 +31,17 @@ st.markdown("""
 
 # --- 세션 초기화 ---
 if 'file_path' not in st.session_state: st.session_state['file_path'] = None
+if 'upload_digest' not in st.session_state: st.session_state['upload_digest'] = None
+if 'upload_owner' not in st.session_state: st.session_state['upload_owner'] = uuid.uuid4().hex
 if 'candidates' not in st.session_state: st.session_state['candidates'] = []
 if 'custom_roles' not in st.session_state: st.session_state['custom_roles'] = []
 if 'analysis_done' not in st.session_state: st.session_state['analysis_done'] = False 
+if 'scan_job' not in st.session_state: st.session_state['scan_job'] = None
+if 'scan_config' not in st.session_state: st.session_state['scan_config'] = {}
+if 'phrase_job' not in st.session_state: st.session_state['phrase_job'] = None
+if 'touched_candidates' not in st.session_state: st.session_state['touched_candidates'] = set()
+if 'numbering_job' not in st.session_state: st.session_state['numbering_job'] = None
+if 'numbering_diagnostics' not in st.session_state: st.session_state['numbering_diagnostics'] = Recorder('numbering')
 
 # --- 콜백 함수 ---
 def add_custom_role():
@@ -46,6 +56,67 @@ def add_custom_role():
 def clear_custom_roles():
     st.session_state['custom_roles'] = []
 
+def render_job_progress(job, text, cancel_key):
+    """작업 큐 대기 순번 또는 진행률 + 취소 버튼"""
+    queue = get_job_queue()
+    if job.state == QUEUED:
+        position = queue.position(job)
+        if position:
+            st.info(f"⏳ 대기 중입니다. 앞에 {position - 1}개 작업이 있습니다.")
+        else:
+            st.info("⏳ 다른 작업이 끝나기를 기다리는 중입니다...")
+    else:
+        st.progress(job.fraction, text=f"{text} · {job.pages_done} / {job.pages_total}쪽")
+    if st.button("⏹️ 작업 취소", key=cancel_key):
+        queue.cancel(job)
+
+# 작업이 도는 동안 이 영역만 주기적으로 다시 그린다. (끝나면 화면 전체를 다시 그려 결과를 보인다)
+@st.fragment(run_every=0.5)
+def numbering_job_status(job):
+    job.touch()
+    if job.done:
+        st.rerun()
+    render_job_progress(job, "번호 위치 분석" if job.stage == 'analyze' else "PDF 만드는 중", "cancel_numbering")
+
+# 시작 문구 찾기: 끝나면 화면 전체를 다시 그려 찾은 위치를 보인다.
+@st.fragment(run_every=0.5)
+def phrase_job_status(job):
+    job.touch()
+    if job.done:
+        st.rerun()
+    render_job_progress(job, "시작 문구 찾는 중", "cancel_phrase")
+
+# 등장인물 스캔: 앞쪽 몇 페이지의 순위가 나올 때까지
+@st.fragment(run_every=0.5)
+def scan_job_status(job):
+    job.touch()
+    if job.preview_ready:
+        st.rerun()
+    render_job_progress(job, "등장인물 분석 중", "cancel_scan")
+
+# 등장인물 스캔: 후보를 보여준 뒤 나머지 페이지를 세는 동안 (순위가 바뀌면 화면 전체를 다시 그린다)
+@st.fragment(run_every=1)
+def scan_refresh(job):
+    job.touch()
+    if job.done or job.candidates is not st.session_state['candidates']:
+        st.rerun()
+    st.caption(f"🔄 나머지 페이지를 세는 중입니다 ({job.pages_done} / {job.pages_total}쪽). 끝나면 횟수와 순서가 확정됩니다.")
+
+def render_diagnostics(recorder):
+    if recorder.operations:
+        last = recorder.operations[-1]
+        st.caption(f"마지막 작업: {last['operation']} · {last['ms']:.0f} ms")
+    st.dataframe(recorder.span_rows(), hide_index=True)
+    st.dataframe(recorder.counter_rows(), hide_index=True)
+    if st.button("기록 초기화", key="diag_reset"):
+        recorder.reset()
+        st.rerun()
+
+# --- 진단 정보 (켠 세션만 구간 시간/카운터를 모은다) ---
+with st.sidebar:
+    diagnostics_on = st.toggle("🩺 진단 정보", value=DIAGNOSTICS_DEFAULT, help="단계별 소요 시간과 처리량을 기록해 화면 아래에 보여줍니다.")
+use(st.session_state['numbering_diagnostics'] if diagnostics_on else None)
+
 # --- UI 시작 ---
 # [수정] 타이틀에 gradient-text 클래스 적용
 st.markdown('<div class="main-header">📝 <span class="gradient-text">Script Numbering</span></div>', unsafe_allow_html=True)
@@ -54,24 +125,33 @@ st.markdown('<div class="main-header">📝 <span class="gradient-text">Script Nu
 uploaded_file = st.file_uploader("📂 PDF 파일 업로드", type=['pdf'])
 
 if uploaded_file is not None:
-    if st.session_state['file_path'] is None or st.session_state.get('uploaded_name') != uploaded_file.name:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            st.session_state['file_path'] = tmp_file.name
-            st.session_state['uploaded_name'] = uploaded_file.name
+    # 업로드는 내용 해시로 한 번만 저장한다. (같은 이름이라도 내용이 다르면 새 파일)
+    upload_store = get_upload_store()
+    owner = f"{st.session_state['upload_owner']}:numbering"
+    if (st.session_state.get('upload_file_id') != uploaded_file.file_id
+            or not upload_store.touch(st.session_state['upload_digest'], owner)):
+        with operation('numbering.upload'):
+            digest, file_path = upload_store.put(uploaded_file.getvalue(), owner)
+        st.session_state['upload_file_id'] = uploaded_file.file_id
+        if digest != st.session_state['upload_digest']:
+            if st.session_state['upload_digest']: upload_store.release(st.session_state['upload_digest'], owner)
+            st.session_state['upload_digest'] = digest
             st.session_state['analysis_done'] = False 
             st.session_state['custom_roles'] = []
+            st.session_state['scan_job'] = None
+        st.session_state['file_path'] = file_path
+        st.session_state['uploaded_name'] = uploaded_file.name
 
     # STEP 1: 설정 (미리보기 포함)
     st.markdown('<div class="step-header">STEP 1. 대본 형식 설정</div>', unsafe_allow_html=True)
     
     with st.expander("🔍 대본 내용 미리보기 (형식 확인용)", expanded=True):
         if st.session_state['file_path']:
-            with pdfplumber.open(st.session_state['file_path']) as pdf:
-                total_pages = len(pdf.pages)
-                preview_page = st.number_input("확인할 페이지", min_value=1, max_value=total_pages, value=1, key='preview_p_1')
-                extracted_txt = pdf.pages[preview_page - 1].extract_text(layout=True)
-                st.text_area("텍스트 내용 (실제 인식 공백)", extracted_txt, height=200, help="이 내용을 보고 아래 설정을 선택하세요.")
+            parsed_script = load_script(st.session_state['file_path'])
+            total_pages = parsed_script.page_count
+            preview_page = st.number_input("확인할 페이지", min_value=1, max_value=total_pages, value=1, key='preview_p_1')
+            extracted_txt = "\n".join(parsed_script.page(preview_page - 1).text_lines)
+            st.text_area("텍스트 내용 (실제 인식 공백)", extracted_txt, height=200, help="이 내용을 보고 아래 설정을 선택하세요.")
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -83,21 +163,39 @@ if uploaded_file is not None:
         custom_sep = st.text_input("기호 입력", max_chars=1) if sep_label == '직접 입력' else ""
 
     if st.button("🔍 등장인물 분석하기", type="primary"):
-        with st.spinner("설정된 규칙으로 대본을 분석 중입니다..."):
-            wrapper_regex = None
-            if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
-            elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
-            elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
-            
-            separator = None
-            if '콜론' in sep_label: separator = ':'
-            elif '직접' in sep_label: separator = custom_sep
-            
-            config = {'wrapper_regex': wrapper_regex, 'separator': separator}
-            
-            st.session_state['candidates'] = scan_candidates(st.session_state['file_path'], config)
+        wrapper_regex = None
+        if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
+        elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
+        elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
+        
+        separator = None
+        if '콜론' in sep_label: separator = ':'
+        elif '직접' in sep_label: separator = custom_sep
+        
+        config = {'wrapper_regex': wrapper_regex, 'separator': separator}
+        st.session_state['scan_config'] = config
+        
+        # 앞쪽 몇 페이지의 순위를 먼저 보여주고, 나머지 페이지는 작업 큐에서 계속 센다.
+        with operation('numbering.scan'):
+            st.session_state['scan_job'] = submit_scan(
+                st.session_state['file_path'], config, owner=owner,
+                recorder=st.session_state['numbering_diagnostics'] if diagnostics_on else None)
+        st.session_state['analysis_done'] = False
+        st.session_state['touched_candidates'] = set()
+
+    scan_job = st.session_state['scan_job']
+    if scan_job is not None and scan_job.params['pdf_path'] == st.session_state['file_path']:
+        if not scan_job.preview_ready:
+            scan_job_status(scan_job)
+        elif scan_job.state != DONE and scan_job.done and not scan_job.candidates:
+            st.error(f"등장인물을 분석하지 못했습니다: {scan_job.error}")
+            st.session_state['scan_job'] = None
+        else:
+            if scan_job.state != DONE and scan_job.done:
+                st.warning(f"⚠️ 대본 일부만 분석했습니다: {scan_job.error}")
+            st.session_state['candidates'] = scan_job.candidates
             st.session_state['analysis_done'] = True
-            st.rerun()
+            if scan_job.done: st.session_state['scan_job'] = None
 
     # STEP 2: 배역 확정
     if st.session_state['analysis_done']:
@@ -106,7 +204,10 @@ if uploaded_file is not None:
         candidate_list = st.session_state['candidates']
         selected_from_list = []
         
-        if not candidate_list:
+        scan_job = st.session_state['scan_job']
+        if scan_job is not None and not scan_job.done:
+            scan_refresh(scan_job)
+        elif not candidate_list:
             st.warning("⚠️ 설정된 규칙으로 찾은 배역이 없습니다. (자동 모드는 2칸 이상 공백이 필요합니다)")
         
         c1, c2 = st.columns([2, 1], gap="medium")
@@ -116,9 +217,11 @@ if uploaded_file is not None:
             if candidate_list:
                 with st.container(height=300, border=True):
                     cols = st.columns(2)
+                    touched = st.session_state['touched_candidates']
                     for i, (name, cnt) in enumerate(candidate_list):
-                        default_chk = True if i < 5 else False
-                        if cols[i % 2].checkbox(f"{name} ({cnt})", value=default_chk, key=f"chk_{i}"):
+                        # 직접 바꾸지 않은 체크는 순위를 따라간다. (상위 5명 기본 선택, 스캔 중 순위가 바뀌어도)
+                        if name not in touched: st.session_state[f"chk_{name}"] = i < 5
+                        if cols[i % 2].checkbox(f"{name} ({cnt})", key=f"chk_{name}", on_change=touched.add, args=(name,)):
                             selected_from_list.append(name)
         
         with c2:
@@ -146,11 +249,35 @@ if uploaded_file is not None:
         start_option = st.radio("시작 기준", ('처음부터', '페이지 번호로', '특정 문구로'), horizontal=True)
         start_val_page = 1
         start_val_phrase = ""
+        start_hit = None
         
         if start_option == '페이지 번호로':
             start_val_page = st.number_input("시작 페이지", min_value=1, value=1)
         elif start_option == '특정 문구로':
             start_val_phrase = st.text_input("시작 문구")
+            # 같은 문구가 여러 곳에 있으면 어디서 시작할지 고른다. (공백 무시)
+            if start_val_phrase.strip():
+                # 아직 읽지 않은 페이지까지 찾아야 하므로 작업 큐에서 찾는다. (문구가 바뀔 때만 다시 제출)
+                phrase_job = st.session_state['phrase_job']
+                # 분석(스캔)에 쓴 설정 그대로 찾는다. (같은 backend 로 파싱)
+                phrase_config = st.session_state['scan_config']
+                if phrase_job is None or phrase_job.params != {'pdf_path': st.session_state['file_path'], 'phrase': start_val_phrase, 'config': phrase_config, 'layout': False}:
+                    phrase_job = submit_phrase_search(st.session_state['file_path'], start_val_phrase, phrase_config, owner=owner,
+                        recorder=st.session_state['numbering_diagnostics'] if diagnostics_on else None)
+                    st.session_state['phrase_job'] = phrase_job
+                hits = phrase_job.result or []
+                if not phrase_job.done:
+                    phrase_job_status(phrase_job)
+                elif phrase_job.state != DONE:
+                    st.warning(f"문구를 찾지 못했습니다: {phrase_job.error}")
+                elif not hits:
+                    st.warning("문구를 찾지 못했습니다.")
+                elif len(hits) == 1:
+                    start_hit = hits[0]
+                    st.caption(f"📍 {start_hit['page']+1}페이지: {start_hit['text']}")
+                else:
+                    start_hit = st.selectbox(f"📍 {len(hits)}곳에서 찾았습니다. 시작 위치를 고르세요", hits,
+                                             format_func=lambda h: f"{h['page']+1}페이지 · {h['text'][:40]}")
 
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -158,30 +285,47 @@ if uploaded_file is not None:
             if not final_roles:
                 st.error("배역을 최소 1명 이상 선택해야 합니다.")
             else:
-                with st.spinner("작업 중..."):
-                    wrapper_regex = None
-                    if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
-                    elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
-                    elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
-                    
-                    separator = None
-                    if '콜론' in sep_label: separator = ':'
-                    elif '직접' in sep_label: separator = custom_sep
-                    
-                    style_config = {'wrapper_regex': wrapper_regex, 'separator': separator}
-                    font_name = register_korean_font()
-                    
-                    coords = analyze_and_get_coordinates(
+                wrapper_regex = None
+                if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
+                elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
+                elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
+                
+                separator = None
+                if '콜론' in sep_label: separator = ':'
+                elif '직접' in sep_label: separator = custom_sep
+                
+                style_config = {'wrapper_regex': wrapper_regex, 'separator': separator}
+                
+                # 결과 파일은 원본과 같은 폴더에 두어 원본이 정리될 때 함께 지워지게 한다.
+                out_path = upload_store.derived_path(st.session_state['upload_digest'], f"numbered-{st.session_state['upload_owner']}.pdf")
+                # 무거운 분석/PDF 생성은 서버 공용 작업 큐에서 돌린다. (이전 작업이 돌고 있으면 취소됨)
+                with operation('numbering.submit'):
+                    st.session_state['numbering_job'] = submit_numbering(
                         st.session_state['file_path'],
+                        out_path,
                         final_roles,
                         style_config,
                         start_page=start_val_page,
-                        start_phrase=start_val_phrase
+                        start_phrase=start_val_phrase,
+                        start_at=start_hit,
+                        owner=owner,
+                        recorder=st.session_state['numbering_diagnostics'] if diagnostics_on else None
                     )
-                    
-                    out_path = st.session_state['file_path'].replace(".pdf", "_numbered.pdf")
-                    create_overlay_pdf(st.session_state['file_path'], out_path, coords, font_name)
-                    
-                    st.success("완료!")
-                    with open(out_path, "rb") as f:
-                        st.download_button("📥 다운로드", f.read(), f"{st.session_state['uploaded_name']}_넘버링.pdf", "application/pdf")
\ No newline at end of file
+
+        job = st.session_state['numbering_job']
+        if job is not None and job.params['pdf_path'] == st.session_state['file_path']:
+            if not job.done:
+                numbering_job_status(job)
+            elif job.state == DONE and os.path.exists(job.result['out_path']):
+                if st.session_state.get('numbering_recorded') != job.id:
+                    upload_store.record_derived(st.session_state['upload_digest'], job.result['out_path'])
+                    st.session_state['numbering_recorded'] = job.id
+                st.success(f"완료! (번호 {job.result['numbers']}개)")
+                with open(job.result['out_path'], "rb") as f:
+                    st.download_button("📥 다운로드", f.read(), f"{st.session_state['uploaded_name']}_넘버링.pdf", "application/pdf")
+            elif job.state != DONE:
+                st.error(f"넘버링하지 못했습니다: {job.error}")
+
+if diagnostics_on:
+    with st.expander("🩺 진단 정보", expanded=True):
+        render_diagnostics(st.session_state['numbering_diagnostics'])
@@ -1,23 +1,18 @@
 import streamlit as st
 import os
 import sys
-import tempfile
-import difflib
-import re
+import uuid
 import time
-import pdfplumber
 import textwrap
-import asyncio
-import edge_tts
-import nest_asyncio
-import base64
-import uuid
-
-# 비동기 충돌 방지
-nest_asyncio.apply()
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from logic import extract_script_data, scan_candidates
+from script_model import load_script
+from scoring import prepare, similarity_prepared
+from script_index import ScriptIndex
+from upload_store import get_upload_store
+from tts import get_audio, get_tts_provider, CuePrefetcher
+from diagnostics import DIAGNOSTICS_DEFAULT, Recorder, operation, span, use
+from jobs import DONE, QUEUED, get_job_queue, submit_extract, submit_phrase_search, submit_scan
 
 # --- CSS ---
 st.markdown("""
@@ -36,74 +31,220 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 로직 함수들 ---
-def clean_text_for_comparison(text):
-    text = re.sub(r'\([^)]*\)', '', text) 
-    text = re.sub(r'\[[^\]]*\]', '', text) 
-    text = re.sub(r'[^가-힣a-zA-Z0-9]', '', text)
-    return text
-
-def check_similarity(original, user_input):
-    if not user_input: return 0.0
-    clean_org = clean_text_for_comparison(original)
-    clean_user = clean_text_for_comparison(user_input)
-    if not clean_org and not clean_user: return 100.0 
-    if not clean_org or not clean_user: return 0.0
-    matcher = difflib.SequenceMatcher(None, clean_org, clean_user)
-    return matcher.ratio() * 100
-
-def is_pure_direction(text):
-    cleaned = clean_text_for_comparison(text)
-    return len(cleaned) == 0 
+def check_similarity(compare_text, user_input, jamo=False):
+    # compare_text: 정규화한 대사 (scoring.prepare, 채점할 때만 만든다)
+    # 비트 병렬 편집 거리 (scoring.py, 기존 difflib 점수와 같은 척도). jamo=True 면 자모 하나 틀린 것을 음절 전체 오답보다 가볍게 본다.
+    return similarity_prepared(compare_text, user_input, jamo)
 
-# [핵심] 심플하고 강력한 순정 오디오 플레이어 (항상 보임)
-async def get_audio_html(text, voice, rate_str):
-    try:
-        communicate = edge_tts.Communicate(text, voice, rate=rate_str)
-        mp3_data = b""
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                mp3_data += chunk["data"]
-                
-        if len(mp3_data) == 0: return None
+def voice_for_role(role, gender_map):
+    speaker_gender = gender_map.get(role, '여성')
+    return "ko-KR-InJoonNeural" if speaker_gender == '남성' else "ko-KR-SunHiNeural"
 
-        b64_audio = base64.b64encode(mp3_data).decode()
-        unique_id = f"audio_{uuid.uuid4()}"
-        
-        # autoplay: 자동 재생 시도
-        # controls: 실패하더라도 사용자가 누를 수 있게 컨트롤 바 표시
-        html_code = f"""
-            <div style="margin-top: 5px; margin-bottom: 10px;">
-                <audio id="{unique_id}" controls autoplay playsinline style="width: 100%;">
-                    <source src="data:audio/mp3;base64,{b64_audio}" type="audio/mp3">
-                </audio>
-                <script>
-                    // 로드 후 즉시 재생 시도 (브라우저 정책에 따라 막힐 수 있음)
-                    var audio = document.getElementById("{unique_id}");
-                    audio.volume = 1.0;
-                    var playPromise = audio.play();
-                    if (playPromise !== undefined) {{
-                        playPromise.catch(error => {{
-                            console.log("Autoplay blocked. User needs to click play.");
-                        }});
-                    }}
-                </script>
-            </div>
-        """
-        return html_code
-    except Exception as e:
-        return None
+PREFETCH_AHEAD = 3
+HISTORY_WINDOW = 20  # 지난 대사는 최근 N줄만 그린다. (더 보기로 N줄씩 늘림)
+
+def render_history(script, start, stop, my_role):
+    for i in range(start, stop):
+        line = script[i]
+        role = line['role']
+        display_text = f"**[{i+1}] {role}:** {line['text']}"
+        with st.chat_message("user" if role == my_role else "assistant", avatar="👤" if role == my_role else "🤖"):
+            st.markdown(f"<span class='past-msg'>{display_text}</span>", unsafe_allow_html=True)
+
+def move_to(index):
+    """현재 위치를 옮기고 화면 전체를 다시 그린다. (지난 대사 창도 기본 크기로)"""
+    st.session_state['current_index'] = index
+    st.session_state['history_shown'] = HISTORY_WINDOW
+    st.rerun()
+
+def first_line_ready(job):
+    """내 첫 대사가 나왔거나 읽기가 끝났으면 연습을 시작할 수 있다."""
+    return job.done or any(line['role'] == job.params['my_role'] for line in job.lines)
+
+def render_job_progress(job, text, cancel_key):
+    """작업 큐 대기 순번 또는 진행률 + 취소 버튼"""
+    queue = get_job_queue()
+    if job.state == QUEUED:
+        position = queue.position(job)
+        if position:
+            st.info(f"⏳ 대기 중입니다. 앞에 {position - 1}개 작업이 있습니다.")
+        else:
+            st.info("⏳ 다른 작업이 끝나기를 기다리는 중입니다...")
+    else:
+        st.progress(job.fraction, text=f"{text} {job.pages_done} / {job.pages_total}쪽")
+    if st.button("⏹️ 작업 취소", key=cancel_key):
+        queue.cancel(job)
+
+# 대사 추출 작업의 대기 순번/진행률. 이 영역만 주기적으로 다시 그리고, 시작할 수 있게 되면 화면 전체를 다시 그린다.
+@st.fragment(run_every=0.5)
+def extract_job_status(job):
+    job.touch()
+    if first_line_ready(job):
+        st.rerun()
+    render_job_progress(job, "대본을 정리하고 있습니다...", "cancel_extract")
+
+# 시작 문구 찾기: 끝나면 화면 전체를 다시 그려 찾은 위치를 보인다.
+@st.fragment(run_every=0.5)
+def phrase_job_status(job):
+    job.touch()
+    if job.done:
+        st.rerun()
+    render_job_progress(job, "시작 문구 찾는 중...", "cancel_prac_phrase")
+
+# 등장인물 스캔: 앞쪽 몇 페이지의 순위가 나올 때까지
+@st.fragment(run_every=0.5)
+def scan_job_status(job):
+    job.touch()
+    if job.preview_ready:
+        st.rerun()
+    render_job_progress(job, "등장인물 분석 중...", "cancel_prac_scan")
+
+# 등장인물 스캔: 후보를 보여준 뒤 나머지 페이지를 세는 동안 (순위가 바뀌면 화면 전체를 다시 그린다)
+@st.fragment(run_every=1)
+def scan_refresh(job):
+    job.touch()
+    if job.done or job.candidates is not st.session_state['prac_candidates']:
+        st.rerun()
+    st.caption(f"🔄 나머지 페이지를 세는 중입니다 ({job.pages_done} / {job.pages_total}쪽). 끝나면 횟수와 순서가 확정됩니다.")
+
+# 연습 중에도 뒷부분을 읽는 동안 진행 상황을 보이고, 작업이 화면을 떠난 것으로 취급되지 않게 한다.
+@st.fragment(run_every=2)
+def loading_status(job):
+    job.touch()
+    if job.done:
+        st.rerun()
+    st.caption(f"📄 대본 뒷부분을 불러오는 중 · {job.pages_done} / {job.pages_total}쪽")
+
+# 다음 내 대사가 아직 읽히지 않았으면 이 영역만 다시 그리고, 새 대사가 들어오거나 읽기가 끝나면 화면 전체를 다시 그린다.
+@st.fragment(run_every=0.5)
+def next_line_wait(job, shown_lines):
+    job.touch()
+    if job.done or len(job.lines) > shown_lines:
+        st.rerun()
+    st.info("⏳ 다음 대사를 불러오는 중입니다...")
+
+def render_diagnostics(recorder):
+    if recorder.operations:
+        last = recorder.operations[-1]
+        st.caption(f"마지막 작업: {last['operation']} · {last['ms']:.0f} ms")
+    st.dataframe(recorder.span_rows(), hide_index=True)
+    st.dataframe(recorder.counter_rows(), hide_index=True)
+    if st.button("기록 초기화", key="diag_reset"):
+        recorder.reset()
+        st.rerun()
+
+# [핵심] 심플하고 강력한 순정 오디오 플레이어 (항상 보임)
+def render_cue_audio(text, voice, rate_str):
+    """
+    상대 대사 음성을 st.audio 로 붙인다. 오디오가 없으면 False.
+    bytes 는 미디어 파일 매니저에 내용 해시 URL 로 올라가므로, 매 rerun 마다 base64 로 다시 보내지 않고
+    같은 대사는 브라우저 캐시를 탄다.
+    """
+    # 같은 대사/목소리/속도는 서버 공용 캐시에서, 미리 합성 중이면 그 결과를 기다린다.
+    audio_data = get_audio(text, voice, rate_str)
+    if len(audio_data) == 0: return False
+    # autoplay: 자동 재생 시도 (브라우저 정책에 따라 막히면 컨트롤 바로 재생)
+    st.audio(audio_data, format=get_tts_provider().mime_type, autoplay=True)
+    return True
 
 # --- 세션 초기화 ---
 if 'script_data' not in st.session_state: st.session_state['script_data'] = []
+if 'script_loader' not in st.session_state: st.session_state['script_loader'] = None
+if 'practice_job' not in st.session_state: st.session_state['practice_job'] = None
+if 'script_index' not in st.session_state: st.session_state['script_index'] = None
 if 'my_role' not in st.session_state: st.session_state['my_role'] = ""
 if 'current_index' not in st.session_state: st.session_state['current_index'] = 0
 if 'is_practice_started' not in st.session_state: st.session_state['is_practice_started'] = False
 if 'prac_file_path' not in st.session_state: st.session_state['prac_file_path'] = None
+if 'prac_upload_digest' not in st.session_state: st.session_state['prac_upload_digest'] = None
+if 'upload_owner' not in st.session_state: st.session_state['upload_owner'] = uuid.uuid4().hex
 if 'prac_candidates' not in st.session_state: st.session_state['prac_candidates'] = []
 if 'prac_custom_roles' not in st.session_state: st.session_state['prac_custom_roles'] = []
 if 'prac_analysis_done' not in st.session_state: st.session_state['prac_analysis_done'] = False
+if 'prac_scan_job' not in st.session_state: st.session_state['prac_scan_job'] = None
+if 'prac_scan_config' not in st.session_state: st.session_state['prac_scan_config'] = {}
+if 'prac_phrase_job' not in st.session_state: st.session_state['prac_phrase_job'] = None
+if 'prac_touched_candidates' not in st.session_state: st.session_state['prac_touched_candidates'] = set()
 if 'last_played_index' not in st.session_state: st.session_state['last_played_index'] = -1
 if 'role_gender_map' not in st.session_state: st.session_state['role_gender_map'] = {}
+if 'tts_prefetcher' not in st.session_state: st.session_state['tts_prefetcher'] = CuePrefetcher()
+if 'history_shown' not in st.session_state: st.session_state['history_shown'] = HISTORY_WINDOW
+if 'practice_diagnostics' not in st.session_state: st.session_state['practice_diagnostics'] = Recorder('practice')
+
+# --- 진단 정보 (켠 세션만 구간 시간/카운터를 모은다) ---
+with st.sidebar:
+    diagnostics_on = st.toggle("🩺 진단 정보", value=DIAGNOSTICS_DEFAULT, help="단계별 소요 시간과 처리량을 기록해 화면 아래에 보여줍니다.")
+st.session_state['diagnostics_active'] = st.session_state['practice_diagnostics'] if diagnostics_on else None
+use(st.session_state['diagnostics_active'])
+
+# --- 입력/채점/TTS 영역 ---
+# 오답 입력은 이 영역만 다시 실행한다. 정답/점프처럼 위치가 바뀔 때만 화면 전체를 다시 그린다.
+@st.fragment
+def practice_input(script, index, target_index, my_role, cue_index, tts_enabled, rate_str, gender_map, is_loading, jamo_scoring):
+    # 이 영역만 다시 실행될 때도 같은 진단 기록기에 모은다.
+    use(st.session_state.get('diagnostics_active'))
+    current_line = script[target_index]
+
+    if tts_enabled and cue_index is not None and st.session_state['last_played_index'] != target_index:
+        try:
+            cue_line = script[cue_index]
+            voice_code = voice_for_role(cue_line['role'], gender_map)
+            with operation('practice.cue_audio'):
+                has_audio = render_cue_audio(cue_line['text'], voice_code, rate_str)
+            if not has_audio:
+                # 데이터가 없을 때 표시
+                st.caption("🔇 오디오 데이터 생성 불가")
+
+            st.session_state['last_played_index'] = target_index
+
+        except Exception as e:
+            st.error(f"⚠️ 오디오 재생 오류: {e}")
+
+    # 다음 내 대사들의 큐는 백그라운드에서 미리 합성한다. (점프/속도 변경 시 이전 작업은 취소)
+    # 지금 재생할 큐를 받은 뒤에 예약해, 이 세션의 미리 합성이 지금 큐보다 먼저 줄을 서지 않게 한다.
+    prefetcher = st.session_state['tts_prefetcher']
+    if tts_enabled:
+        prefetcher.schedule([
+            (script[i]['text'], voice_for_role(script[i]['role'], gender_map), rate_str)
+            for i in index.upcoming_cues(my_role, target_index, PREFETCH_AHEAD)
+        ])
+    else:
+        prefetcher.cancel()
+
+    wrapped_text = textwrap.fill(current_line['text'], width=45)
+    with st.expander("💡 힌트 보기"): st.code(wrapped_text, language=None)
+
+    user_input = st.chat_input("대사 입력 (숫자: 대사 번호, p숫자: 페이지로 이동)")
+
+    if user_input:
+        user_input = user_input.strip()
+        if user_input[:1] in ('p', 'P') and user_input[1:].isdigit():
+            jump_idx = index.first_line_of_page(int(user_input[1:]))
+            if jump_idx is not None:
+                st.session_state['last_played_index'] = -1
+                move_to(jump_idx)
+            elif is_loading:
+                st.toast(f"⏳ {user_input[1:]}페이지는 아직 불러오는 중입니다", icon="⚠️")
+            else:
+                st.toast(f"❌ {user_input[1:]}페이지 대사 없음", icon="⚠️")
+        elif user_input.isdigit():
+            jump_idx = int(user_input) - 1
+            if 0 <= jump_idx < len(script):
+                st.session_state['last_played_index'] = -1
+                move_to(jump_idx)
+            elif is_loading:
+                st.toast(f"⏳ {user_input}번 대사는 아직 불러오는 중입니다", icon="⚠️")
+            else:
+                st.toast(f"❌ {user_input}번 대사 없음", icon="⚠️")
+        else:
+            with span('practice.scoring'):
+                score = check_similarity(prepare(current_line['text']), user_input, jamo_scoring)
+            if score >= 80:
+                st.toast(f"🎉 정답! ({score:.0f}%)", icon="✅")
+                time.sleep(0.5)
+                move_to(target_index + 1)
+            else:
+                st.toast(f"❌ 땡! ({score:.0f}%)", icon="🚨")
 
 # --- 콜백 ---
 def add_prac_custom_role():
@@ -127,28 +268,35 @@ if not st.session_state['is_practice_started']:
     uploaded_file = st.file_uploader("📂 PDF 파일 업로드", type=['pdf'])
 
     if uploaded_file is not None:
-        if st.session_state['prac_file_path'] is None or st.session_state.get('prac_filename') != uploaded_file.name:
+        # 업로드는 내용 해시로 한 번만 저장한다. (사용자끼리 파일 이름이 겹쳐도 섞이지 않음)
+        upload_store = get_upload_store()
+        owner = f"{st.session_state['upload_owner']}:practice"
+        if (st.session_state.get('prac_file_id') != uploaded_file.file_id
+                or not upload_store.touch(st.session_state['prac_upload_digest'], owner)):
             try:
-                temp_dir = tempfile.gettempdir()
-                file_path = os.path.join(temp_dir, uploaded_file.name)
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
+                with operation('practice.upload'):
+                    digest, file_path = upload_store.put(uploaded_file.getvalue(), owner)
+                st.session_state['prac_file_id'] = uploaded_file.file_id
+                if digest != st.session_state['prac_upload_digest']:
+                    if st.session_state['prac_upload_digest']: upload_store.release(st.session_state['prac_upload_digest'], owner)
+                    st.session_state['prac_upload_digest'] = digest
+                    st.session_state['prac_analysis_done'] = False
+                    st.session_state['prac_custom_roles'] = []
+                    st.session_state['prac_scan_job'] = None
+                    st.session_state['role_gender_map'] = {}
                 st.session_state['prac_file_path'] = file_path
                 st.session_state['prac_filename'] = uploaded_file.name
-                st.session_state['prac_analysis_done'] = False
-                st.session_state['prac_custom_roles'] = []
-                st.session_state['role_gender_map'] = {}
             except Exception as e:
                 st.error(f"파일 저장 중 오류가 발생했습니다: {e}")
 
         st.markdown('<div class="step-header">STEP 1. 대본 형식 설정</div>', unsafe_allow_html=True)
         with st.expander("🔍 대본 내용 미리보기 (형식 확인용)", expanded=True):
             if st.session_state['prac_file_path'] and os.path.exists(st.session_state['prac_file_path']):
-                with pdfplumber.open(st.session_state['prac_file_path']) as pdf:
-                    total_pages = len(pdf.pages)
-                    preview_page = st.number_input("확인할 페이지", min_value=1, max_value=total_pages, value=1, key="p_preview_1")
-                    extracted_txt = pdf.pages[preview_page - 1].extract_text(layout=True)
-                    st.text_area("텍스트 내용", extracted_txt, height=200)
+                parsed_script = load_script(st.session_state['prac_file_path'])
+                total_pages = parsed_script.page_count
+                preview_page = st.number_input("확인할 페이지", min_value=1, max_value=total_pages, value=1, key="p_preview_1")
+                extracted_txt = "\n".join(parsed_script.page(preview_page - 1).text_lines)
+                st.text_area("텍스트 내용", extracted_txt, height=200)
         st.markdown("<br>", unsafe_allow_html=True)
 
         col1, col2 = st.columns(2)
@@ -165,23 +313,44 @@ if not st.session_state['is_practice_started']:
             if not st.session_state['prac_file_path']:
                 st.error("PDF 파일이 저장되지 않았습니다. 다시 업로드해주세요.")
             else:
-                with st.spinner("분석 중..."):
-                    wrapper_regex = None
-                    if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
-                    elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
-                    elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
-                    separator = None
-                    if sep_style == 'calc_strict': separator = None
-                    elif sep_style == ':': separator = ':'
-                    elif sep_style == '직접 입력': separator = custom_sep
-                    
-                    config = {'wrapper_regex': wrapper_regex, 'separator': separator}
-                    st.session_state['prac_candidates'] = scan_candidates(st.session_state['prac_file_path'], config)
-                    st.session_state['prac_analysis_done'] = True
-                    st.rerun()
+                wrapper_regex = None
+                if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
+                elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
+                elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
+                separator = None
+                if sep_style == 'calc_strict': separator = None
+                elif sep_style == ':': separator = ':'
+                elif sep_style == '직접 입력': separator = custom_sep
+                
+                config = {'wrapper_regex': wrapper_regex, 'separator': separator}
+                st.session_state['prac_scan_config'] = config
+                # 앞쪽 몇 페이지의 순위를 먼저 보여주고, 나머지 페이지는 작업 큐에서 계속 센다.
+                with operation('practice.scan'):
+                    st.session_state['prac_scan_job'] = submit_scan(
+                        st.session_state['prac_file_path'], config, owner=owner,
+                        recorder=st.session_state['practice_diagnostics'] if diagnostics_on else None)
+                st.session_state['prac_analysis_done'] = False
+                st.session_state['prac_touched_candidates'] = set()
+
+        scan_job = st.session_state['prac_scan_job']
+        if scan_job is not None and scan_job.params['pdf_path'] == st.session_state['prac_file_path']:
+            if not scan_job.preview_ready:
+                scan_job_status(scan_job)
+            elif scan_job.state != DONE and scan_job.done and not scan_job.candidates:
+                st.error(f"등장인물을 분석하지 못했습니다: {scan_job.error}")
+                st.session_state['prac_scan_job'] = None
+            else:
+                if scan_job.state != DONE and scan_job.done:
+                    st.warning(f"⚠️ 대본 일부만 분석했습니다: {scan_job.error}")
+                st.session_state['prac_candidates'] = scan_job.candidates
+                st.session_state['prac_analysis_done'] = True
+                if scan_job.done: st.session_state['prac_scan_job'] = None
 
         if st.session_state['prac_analysis_done']:
             st.markdown('<div class="step-header">STEP 2. 배역 확정</div>', unsafe_allow_html=True)
+            scan_job = st.session_state['prac_scan_job']
+            if scan_job is not None and not scan_job.done:
+                scan_refresh(scan_job)
             c1, c2 = st.columns([2, 1], gap="medium")
             selected_from_list = []
             
@@ -190,9 +359,11 @@ if not st.session_state['is_practice_started']:
                 if st.session_state['prac_candidates']:
                     with st.container(height=300, border=True):
                         cols = st.columns(2)
+                        touched = st.session_state['prac_touched_candidates']
                         for i, (name, cnt) in enumerate(st.session_state['prac_candidates']):
-                            default_chk = True if i < 5 else False
-                            if cols[i % 2].checkbox(f"{name} ({cnt})", value=default_chk, key=f"p_chk_{i}"):
+                            # 직접 바꾸지 않은 체크는 순위를 따라간다. (상위 5명 기본 선택, 스캔 중 순위가 바뀌어도)
+                            if name not in touched: st.session_state[f"p_chk_{name}"] = i < 5
+                            if cols[i % 2].checkbox(f"{name} ({cnt})", key=f"p_chk_{name}", on_change=touched.add, args=(name,)):
                                 selected_from_list.append(name)
                 else:
                     st.warning("후보가 없습니다.")
@@ -237,10 +408,35 @@ if not st.session_state['is_practice_started']:
             start_option = st.radio("시작 기준", ('처음부터', '페이지 번호로', '특정 대사/문구로'), horizontal=True)
             start_val_page = 1
             start_val_phrase = ""
+            start_hit = None
             if start_option == '페이지 번호로':
                 start_val_page = st.number_input("시작 페이지", min_value=1, value=1)
             elif start_option == '특정 대사/문구로':
                 start_val_phrase = st.text_input("시작 문구 입력", placeholder="예: 2막 시작, 또는 첫 대사")
+                # 같은 문구가 여러 곳에 있으면 어디서 시작할지 고른다. (공백 무시)
+                if start_val_phrase.strip():
+                    # 아직 읽지 않은 페이지까지 찾아야 하므로 작업 큐에서 찾는다. (문구가 바뀔 때만 다시 제출)
+                    phrase_job = st.session_state['prac_phrase_job']
+                    # 분석(스캔)에 쓴 설정 그대로 찾는다. (같은 backend 로 파싱)
+                    phrase_config = st.session_state['prac_scan_config']
+                    if phrase_job is None or phrase_job.params != {'pdf_path': st.session_state['prac_file_path'], 'phrase': start_val_phrase, 'config': phrase_config, 'layout': True}:
+                        # 추출이 읽는 레이아웃 줄에서 찾아야 고른 위치에서 그대로 시작한다.
+                        phrase_job = submit_phrase_search(st.session_state['prac_file_path'], start_val_phrase, phrase_config, layout=True, owner=owner,
+                            recorder=st.session_state['practice_diagnostics'] if diagnostics_on else None)
+                        st.session_state['prac_phrase_job'] = phrase_job
+                    hits = phrase_job.result or []
+                    if not phrase_job.done:
+                        phrase_job_status(phrase_job)
+                    elif phrase_job.state != DONE:
+                        st.warning(f"문구를 찾지 못했습니다: {phrase_job.error}")
+                    elif not hits:
+                        st.warning("문구를 찾지 못했습니다.")
+                    elif len(hits) == 1:
+                        start_hit = hits[0]
+                        st.caption(f"📍 {start_hit['page']+1}페이지: {start_hit['text']}")
+                    else:
+                        start_hit = st.selectbox(f"📍 {len(hits)}곳에서 찾았습니다. 시작 위치를 고르세요", hits,
+                                                 format_func=lambda h: f"{h['page']+1}페이지 · {h['text'][:40]}")
 
             st.markdown("<br>", unsafe_allow_html=True)
             
@@ -250,35 +446,51 @@ if not st.session_state['is_practice_started']:
                 elif not my_role or my_role == "배역을 먼저 확정하세요":
                     st.error("내 배역을 선택해주세요.")
                 else:
-                    with st.spinner("대본을 정리하고 있습니다..."):
-                        wrapper_regex = None
-                        if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
-                        elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
-                        elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
-                        separator = None
-                        if sep_style == 'calc_strict': separator = None
-                        elif sep_style == ':': separator = ':'
-                        elif sep_style == '직접 입력': separator = custom_sep
-                        
-                        config = {'wrapper_regex': wrapper_regex, 'separator': separator}
-                        
-                        full_script = extract_script_data(
+                    wrapper_regex = None
+                    if '대괄호' in name_style: wrapper_regex = r'^\s*\[(.+?)\]'
+                    elif '소괄호' in name_style: wrapper_regex = r'^\s*\((.+?)\)'
+                    elif '꺽쇠' in name_style: wrapper_regex = r'^\s*<(.+?)>'
+                    separator = None
+                    if sep_style == 'calc_strict': separator = None
+                    elif sep_style == ':': separator = ':'
+                    elif sep_style == '직접 입력': separator = custom_sep
+                    
+                    config = {'wrapper_regex': wrapper_regex, 'separator': separator}
+                    
+                    # 서버 공용 작업 큐에서 읽는다. 뒤쪽 페이지는 계속 읽고, 내 첫 대사가 나오면 바로 시작한다.
+                    with operation('practice.submit'):
+                        st.session_state['practice_job'] = submit_extract(
                             st.session_state['prac_file_path'], 
                             my_role, 
                             config, 
                             allowed_roles=final_roles,
                             start_page=start_val_page if start_option == '페이지 번호로' else 1,
-                            start_phrase=start_val_phrase if start_option == '특정 대사/문구로' else ""
+                            start_phrase=start_val_phrase if start_option == '특정 대사/문구로' else "",
+                            start_at=start_hit if start_option == '특정 대사/문구로' else None,
+                            owner=owner,
+                            recorder=st.session_state['practice_diagnostics'] if diagnostics_on else None
                         )
-                        
-                        if full_script:
-                            st.session_state['script_data'] = full_script
-                            st.session_state['my_role'] = my_role
-                            st.session_state['current_index'] = 0
-                            st.session_state['is_practice_started'] = True
-                            st.rerun()
-                        else:
-                            st.error("대사를 추출하지 못했습니다. (시작 문구를 확인해보세요)")
+
+            job = st.session_state['practice_job']
+            if job is not None and job.params['pdf_path'] == st.session_state['prac_file_path']:
+                if not first_line_ready(job):
+                    extract_job_status(job)
+                elif job.lines:
+                    st.session_state['script_data'] = job.lines
+                    st.session_state['script_index'] = None
+                    st.session_state['script_loader'] = job
+                    st.session_state['practice_job'] = None
+                    st.session_state['my_role'] = job.params['my_role']
+                    st.session_state['current_index'] = 0
+                    st.session_state['history_shown'] = HISTORY_WINDOW
+                    st.session_state['is_practice_started'] = True
+                    st.rerun()
+                else:
+                    st.session_state['practice_job'] = None
+                    if job.error:
+                        st.error(f"대사를 추출하지 못했습니다: {job.error}")
+                    else:
+                        st.error("대사를 추출하지 못했습니다. (시작 문구를 확인해보세요)")
 
 # ==============================================================================
 # VIEW 2: 연습 화면
@@ -292,34 +504,52 @@ else:
         speed_val = st.slider("말하기 속도", -50, 50, 0, 10, format="%d%%")
         rate_str = f"{speed_val:+d}%"
         st.info("💡 배역 성별 설정에 따라\n목소리가 자동 변경됩니다.\n(남: 인준 / 여: 선히)")
+        st.markdown("### 🎯 채점 설정")
+        jamo_scoring = st.toggle("자모 단위 채점 (오타에 관대)", value=False)
     
     script = st.session_state['script_data']
     start_index = st.session_state['current_index']
     my_role = st.session_state['my_role']
     gender_map = st.session_state.get('role_gender_map', {})
+    loader = st.session_state.get('script_loader')
+    is_loading = loader is not None and not loader.done
+    if is_loading: loading_status(loader)
+    # 스트리밍 중이면 새로 들어온 줄만 색인에 더한다.
+    if st.session_state['script_index'] is None: st.session_state['script_index'] = ScriptIndex()
+    index = st.session_state['script_index'].sync(script)
 
-    # 1. 과거 내역
-    for i in range(start_index):
-        line = script[i]
-        role = line['role']
-        text = line['text']
-        display_text = f"**[{i+1}] {role}:** {text}"
-        
-        if role == my_role:
-            with st.chat_message("user", avatar="👤"):
-                st.markdown(f"<span class='past-msg'>{display_text}</span>", unsafe_allow_html=True)
-        else:
-            with st.chat_message("assistant", avatar="🤖"):
-                st.markdown(f"<span class='past-msg'>{display_text}</span>", unsafe_allow_html=True)
+    with st.sidebar:
+        st.markdown("### 🔎 대사 찾아 이동")
+        jump_query = st.text_input("찾을 문구", placeholder="대사 일부 (공백 무시)")
+        if jump_query.strip():
+            found_lines = index.find(jump_query, script)
+            if not found_lines:
+                st.caption("일치하는 대사가 없습니다.")
+            else:
+                jump_to = st.selectbox(f"{len(found_lines)}곳", found_lines,
+                                       format_func=lambda i: f"[{i+1}] {script[i]['role']}: {script[i]['text'][:30]}")
+                if st.button("이 대사로 이동"):
+                    st.session_state['last_played_index'] = -1
+                    move_to(jump_to)
+    if loader is not None and loader.error:
+        st.warning(f"⚠️ 대본 뒷부분을 읽지 못했습니다: {loader.error}")
+
+    # 1. 과거 내역 (최근 history_shown 줄만, 나머지는 요청 시)
+    history_start = max(0, start_index - st.session_state['history_shown'])
+    if history_start > 0:
+        if st.button(f"⬆️ 이전 대사 더 보기 ({history_start}줄 숨김)"):
+            st.session_state['history_shown'] += HISTORY_WINDOW
+            st.rerun()
+    render_history(script, history_start, start_index, my_role)
 
     st.markdown("---")
 
-    # 2. 현재 & TTS 큐
-    target_index = -1
-    cue_line_text = ""
-    cue_line_role = ""
-    
-    for i in range(start_index, len(script)):
+    # 2. 현재 & TTS 큐 (다음 내 대사/큐는 색인 조회)
+    found = index.next_line(my_role, start_index)
+    target_index = found if found is not None else -1
+    cue_index = index.cue_before(target_index, start_index) if found is not None else None
+
+    for i in range(start_index, found if found is not None else len(script)):
         line = script[i]
         role = line['role']
         text = line['text']
@@ -327,66 +557,24 @@ else:
         if role != my_role:
             with st.chat_message("assistant", avatar="🤖"):
                 st.markdown(f"**[{i+1}] {role}:** {text}")
-            cue_line_text = text
-            cue_line_role = role
         else:
-            if is_pure_direction(text):
-                with st.chat_message("user", avatar="👤"):
-                    st.markdown(f"<span style='color:gray'>**[{i+1}] {role}:** {text} (지문 스킵)</span>", unsafe_allow_html=True)
-                continue 
-            else:
-                target_index = i
-                break 
+            # 괄호 지문뿐인 내 줄
+            with st.chat_message("user", avatar="👤"):
+                st.markdown(f"<span style='color:gray'>**[{i+1}] {role}:** {text} (지문 스킵)</span>", unsafe_allow_html=True)
     
     # 3. 입력창 및 TTS 재생
     if target_index != -1:
-        current_line = script[target_index]
-        st.progress((target_index / len(script)), text=f"No. {target_index+1} / {len(script)}")
+        total_text = f"{len(script)}+ (불러오는 중)" if is_loading else f"{len(script)}"
+        my_total = f"{index.role_counts[my_role]}+" if is_loading else f"{index.role_counts[my_role]}"
+        st.progress((target_index / len(script)), text=f"No. {target_index+1} / {total_text} · 내 대사 {index.role_rank(target_index)+1} / {my_total}")
         
         st.chat_message("user", avatar="👤").write(f"**[{target_index+1}] {my_role}:** ❓❓❓")
-        
-        if tts_enabled and cue_line_text and st.session_state['last_played_index'] != target_index:
-            try:
-                speaker_gender = gender_map.get(cue_line_role, '여성')
-                voice_code = "ko-KR-InJoonNeural" if speaker_gender == '남성' else "ko-KR-SunHiNeural"
-                
-                audio_html = asyncio.run(get_audio_html(cue_line_text, voice_code, rate_str))
-                
-                if audio_html:
-                    st.markdown(audio_html, unsafe_allow_html=True)
-                else:
-                    # 데이터가 없을 때 표시
-                    st.caption("🔇 오디오 데이터 생성 불가")
-
-                st.session_state['last_played_index'] = target_index
-                
-            except Exception as e:
-                st.error(f"⚠️ 오디오 재생 오류: {e}")
-
-        wrapped_text = textwrap.fill(current_line['text'], width=45)
-        with st.expander("💡 힌트 보기"): st.code(wrapped_text, language=None)
 
-        user_input = st.chat_input("대사 입력 (숫자 입력 시 이동)")
+        practice_input(script, index, target_index, my_role, cue_index,
+                       tts_enabled, rate_str, gender_map, is_loading, jamo_scoring)
 
-        if user_input:
-            user_input = user_input.strip()
-            if user_input.isdigit():
-                jump_idx = int(user_input) - 1
-                if 0 <= jump_idx < len(script):
-                    st.session_state['current_index'] = jump_idx
-                    st.session_state['last_played_index'] = -1 
-                    st.rerun()
-                else:
-                    st.toast(f"❌ {user_input}번 대사 없음", icon="⚠️")
-            else:
-                score = check_similarity(current_line['text'], user_input)
-                if score >= 80:
-                    st.toast(f"🎉 정답! ({score:.0f}%)", icon="✅")
-                    time.sleep(0.5)
-                    st.session_state['current_index'] = target_index + 1
-                    st.rerun()
-                else:
-                    st.toast(f"❌ 땡! ({score:.0f}%)", icon="🚨")
+    elif is_loading:
+        next_line_wait(loader, len(script))
 
     else:
         st.balloons()
@@ -398,5 +586,10 @@ else:
 
     st.divider()
     if st.button("❌ 종료 및 설정으로"):
+        if is_loading: get_job_queue().cancel(loader)
         st.session_state['is_practice_started'] = False
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+if diagnostics_on:
+    with st.expander("🩺 진단 정보", expanded=True):
+        render_diagnostics(st.session_state['practice_diagnostics'])
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+from diagnostics import count
+
+# ---------------------------------------------------------
+# 영구 파싱 캐시 (SQLite, 여러 프로세스/레플리카 공용)
+# ---------------------------------------------------------
+# 같은 대본을 여러 배우가 열거나 다른 레플리카로 접속해도 PDF 를 다시 파싱하지 않도록
+# 파싱 결과를 로컬 SQLite 파일에 저장한다.
+#   doc  = "{내용 sha256}:{백엔드}:v{PARSER_VERSION}"
+#   kind = 'page'       : 페이지별 단어/레이아웃 줄 (item = 페이지 idx)
+#          'lines'      : 페이지별 넘버링용 줄 텍스트 + 첫 단어 좌표 (item = 페이지 idx)
+#          'candidates' : scan_candidates 결과 (item = 형식 설정)
+#          'script'     : extract_script_data 결과 (item = 형식 설정 + 배역 + 시작 위치)
+# 값은 JSON 을 zlib 으로 압축해 저장한다. 용량을 넘으면 오래 안 쓴 항목부터 지운다.
+# SCRIPT_MATE_PARSE_CACHE=off 로 끌 수 있다.
+PARSE_CACHE_PATH = os.environ.get('SCRIPT_MATE_PARSE_CACHE') or os.path.join(tempfile.gettempdir(), 'script_mate_parse_cache.sqlite3')
+PARSE_CACHE_LIMIT_BYTES = int(os.environ.get('SCRIPT_MATE_PARSE_CACHE_MB', '256')) * 1024 * 1024
+
+# 페이지 파싱(script_model)이나 추출 규칙(logic)을 바꿔 결과가 달라지면 올린다. (이전 항목은 자연히 밀려난다)
+PARSER_VERSION = 2
+
+KINDS = ('page', 'lines', 'candidates', 'script')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    doc TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    item TEXT NOT NULL,
+    value BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (doc, kind, item)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+def doc_key(content_hash, backend):
+    return f"{content_hash}:{backend}:v{PARSER_VERSION}"
+
+
+def item_key(**fields):
+    """설정 dict 등을 순서와 무관한 문자열 키로 만든다."""
+    return json.dumps(fields, ensure_ascii=False, sort_keys=True)
+
+
+def _encode(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _decode(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class ParseCache:
+    """
+    값은 JSON 으로 바꿀 수 있어야 한다. (튜플은 리스트로 돌아오므로 호출 측에서 되돌린다)
+    캐시 오류(잠김, 손상 등)는 적중 실패로 처리해 파싱은 항상 계속된다.
+    """
+
+    def __init__(self, path=PARSE_CACHE_PATH, limit_bytes=PARSE_CACHE_LIMIT_BYTES):
+        self.path = path
+        self.limit_bytes = limit_bytes
+        self.hits = {kind: 0 for kind in KINDS}    # 이 프로세스의 적중/실패 수
+        self.misses = {kind: 0 for kind in KINDS}
+        self.evictions = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 다른 프로세스가 쓰는 중이면 timeout 동안 기다린다. (WAL 이라 읽기는 막히지 않는다)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def _count(self, kind, hit, n=1):
+        counter = self.hits if hit else self.misses
+        counter[kind] = counter.get(kind, 0) + n
+        if n: count(f"cache.{kind}.{'hit' if hit else 'miss'}", n)
+
+    # --- 조회 ---
+    def get(self, doc, kind, item):
+        """저장된 값. 없으면 None."""
+        item = str(item)
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT value FROM entries WHERE doc=? AND kind=? AND item=?', (doc, kind, item)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        'UPDATE entries SET last_used=? WHERE doc=? AND kind=? AND item=?', (time.time(), doc, kind, item))
+            except sqlite3.Error:
+                self.errors += 1
+                row = None
+            self._count(kind, row is not None)
+        return _decode(row[0]) if row is not None else None
+
+    def get_many(self, doc, kind, items):
+        """{item: 값} (저장된 것만). 페이지 여러 장을 한 번에 읽을 때 쓴다."""
+        items = [str(item) for item in items]
+        if not items: return {}
+        found = {}
+        with self._lock:
+            try:
+                # SQLite 변수 개수 제한을 넘지 않게 나눠 조회한다.
+                for k in range(0, len(items), 500):
+                    part = items[k:k + 500]
+                    marks = ','.join('?' * len(part))
+                    rows = self._conn.execute(
+                        f'SELECT item, value FROM entries WHERE doc=? AND kind=? AND item IN ({marks})', (doc, kind, *part))
+                    found.update(rows)
+                    if found:
+                        self._conn.execute(
+                            f'UPDATE entries SET last_used=? WHERE doc=? AND kind=? AND item IN ({marks})', (time.time(), doc, kind, *part))
+            except sqlite3.Error:
+                self.errors += 1
+                found = {}
+            self._count(kind, True, len(found))
+            self._count(kind, False, len(items) - len(found))
+        return {item: _decode(blob) for item, blob in found.items()}
+
+    # --- 저장 ---
+    def put(self, doc, kind, item, value):
+        self.put_many(doc, kind, {item: value})
+
+    def put_many(self, doc, kind, values):
+        """{item: 값} 을 한 트랜잭션으로 저장한 뒤 용량을 넘으면 정리한다."""
+        if not values: return
+        now = time.time()
+        rows = []
+        for item, value in values.items():
+            blob = _encode(value)
+            rows.append((doc, kind, str(item), blob, len(blob), now))
+        with self._lock:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self._conn.executemany(
+                        'INSERT OR REPLACE INTO entries (doc, kind, item, value, bytes, last_used) VALUES (?, ?, ?, ?, ?, ?)', rows)
+                    self._evict()
+                    self._conn.execute('COMMIT')
+                except BaseException:
+                    self._conn.execute('ROLLBACK')
+                    raise
+            except sqlite3.Error:
+                self.errors += 1
+                return
+        count('cache.bytes_written', sum(row[4] for row in rows))
+
+    # --- 정리 ---
+    def _total_bytes(self):
+        return self._conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM entries').fetchone()[0]
+
+    def _evict(self):
+        """트랜잭션 안에서 호출. 용량을 넘으면 오래 안 쓴 항목부터 지운다."""
+        excess = self._total_bytes() - self.limit_bytes
+        if excess <= 0: return
+        victims = []
+        for rowid, size in self._conn.execute('SELECT rowid, bytes FROM entries ORDER BY last_used'):
+            if excess <= 0: break
+            victims.append((rowid,))
+            excess -= size
+        self._conn.executemany('DELETE FROM entries WHERE rowid=?', victims)
+        self.evictions += len(victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+
+    def stats(self):
+        """적중률은 이 프로세스 기준, 항목 수/용량은 캐시 파일 전체 기준."""
+        with self._lock:
+            try:
+                by_kind = {kind: (count, size) for kind, count, size in self._conn.execute(
+                    'SELECT kind, COUNT(*), SUM(bytes) FROM entries GROUP BY kind')}
+            except sqlite3.Error:
+                by_kind = {}
+            kinds = {}
+            for kind in KINDS:
+                hits, misses = self.hits[kind], self.misses[kind]
+                count, size = by_kind.get(kind, (0, 0))
+                kinds[kind] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': hits / (hits + misses) if hits + misses else None,
+                    'items': count,
+                    'bytes': size,
+                }
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else None,
+                'items': sum(k['items'] for k in kinds.values()),
+                'bytes': sum(k['bytes'] for k in kinds.values()),
+                'limit_bytes': self.limit_bytes,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'kinds': kinds,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_parse_cache = None
+_parse_cache_ready = False
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache():
+    """공용 ParseCache. 꺼져 있거나 파일을 열 수 없으면 None."""
+    global _parse_cache, _parse_cache_ready
+    with _parse_cache_lock:
+        if not _parse_cache_ready:
+            _parse_cache_ready = True
+            if PARSE_CACHE_PATH.lower() not in ('off', '0', 'none'):
+                try:
+                    _parse_cache = ParseCache()
+                except (sqlite3.Error, OSError):
+                    _parse_cache = None
+        return _parse_cache
+
+
+def set_parse_cache(cache):
+    """벤치마크 등에서 캐시를 바꾸거나 None 으로 끈다."""
+    global _parse_cache, _parse_cache_ready
+    with _parse_cache_lock:
+        _parse_cache = cache
+        _parse_cache_ready = True
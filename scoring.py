@@ -0,0 +1,139 @@
+import re
+from functools import lru_cache
+
+# ---------------------------------------------------------
+# 1. 비교용 정규화
+# ---------------------------------------------------------
+def clean_text_for_comparison(text):
+    text = re.sub(r'\([^)]*\)', '', text)
+    text = re.sub(r'\[[^\]]*\]', '', text)
+    text = re.sub(r'[^가-힣a-zA-Z0-9]', '', text)
+    return text
+
+
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+
+
+def decompose_jamo(text):
+    """완성형 한글 음절을 초성/중성/종성 자모로 푼다. (나머지 글자는 그대로)"""
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            idx = code - HANGUL_BASE
+            out.append(chr(0x1100 + idx // 588))
+            out.append(chr(0x1161 + (idx % 588) // 28))
+            if idx % 28: out.append(chr(0x11A7 + idx % 28))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+@lru_cache(maxsize=4096)
+def prepare(text, jamo=False):
+    """채점에 쓰는 비교 문자열. 대본 대사는 매번 같으므로 캐시해 둔다."""
+    cleaned = clean_text_for_comparison(text)
+    return decompose_jamo(cleaned) if jamo else cleaned
+
+
+# ---------------------------------------------------------
+# 2. 편집 거리 (비트 병렬)
+# ---------------------------------------------------------
+# 패턴(짧은 쪽)의 각 글자 위치를 비트로 두고 텍스트 한 글자마다 열 전체를 정수 연산 몇 번으로 갱신한다.
+# 파이썬 정수는 길이 제한이 없으므로 긴 독백도 한 번에 처리된다.
+def pattern_masks(pattern):
+    masks = {}
+    bit = 1
+    for ch in pattern:
+        masks[ch] = masks.get(ch, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _levenshtein_with_masks(masks, m, text):
+    """Myers / Hyyrö: 삽입/삭제/치환 각 1"""
+    if m == 0: return len(text)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, dist = full, 0, m
+    for ch in text:
+        eq = masks.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & last: dist += 1
+        elif mh & last: dist -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return dist
+
+
+def _indel_with_masks(masks, m, text):
+    """Hyyrö LCS: 삽입/삭제만 (치환 = 2). len(a) + len(b) - 2 * LCS"""
+    full = (1 << m) - 1
+    v = full
+    for ch in text:
+        u = v & masks.get(ch, 0)
+        v = ((v + u) | (v - u)) & full
+    lcs = m - bin(v).count('1')
+    return m + len(text) - 2 * lcs
+
+
+_DISTANCES = {'indel': _indel_with_masks, 'levenshtein': _levenshtein_with_masks}
+
+
+def _distance(a, b, metric):
+    if len(a) < len(b): a, b = b, a  # 짧은 쪽을 패턴으로 -> 정수 크기 감소
+    return _DISTANCES[metric](pattern_masks(b), len(b), a)
+
+
+def levenshtein(a, b):
+    return _distance(a, b, 'levenshtein')
+
+
+def indel_distance(a, b):
+    return _distance(a, b, 'indel')
+
+
+def _ratio(dist, len_a, len_b, metric):
+    # indel: 2 * LCS / (길이 합) -> difflib ratio() 와 같은 척도 (기존 80% 기준 유지)
+    # levenshtein: 1 - 거리 / 긴 쪽 길이
+    if metric == 'indel': return (1 - dist / (len_a + len_b)) * 100
+    return (1 - dist / max(len_a, len_b)) * 100
+
+
+# ---------------------------------------------------------
+# 3. 점수
+# ---------------------------------------------------------
+def similarity(original, user_input, jamo=False, metric='indel'):
+    """0~100. 정규화 결과가 둘 다 비면 100, 한쪽만 비면 0."""
+    return similarity_prepared(prepare(original), user_input, jamo, metric)
+
+
+def similarity_prepared(org, user_input, jamo=False, metric='indel'):
+    """org 는 이미 정규화된 대사 (prepare(original))"""
+    if not user_input: return 0.0
+    if jamo: org = decompose_jamo(org)
+    user = prepare(user_input, jamo)
+    if not org and not user: return 100.0
+    if not org or not user: return 0.0
+    return _ratio(_distance(org, user, metric), len(org), len(user), metric)
+
+
+def similarity_many(user_input, candidates, jamo=False, metric='indel'):
+    """입력 하나를 여러 대사와 비교한다. 입력 쪽 비트 마스크를 한 번만 만든다."""
+    user = prepare(user_input, jamo) if user_input else ""
+    masks = pattern_masks(user)
+    distance = _DISTANCES[metric]
+    scores = []
+    for original in candidates:
+        org = prepare(original, jamo)
+        if not user_input: scores.append(0.0)
+        elif not org and not user: scores.append(100.0)
+        elif not org or not user: scores.append(0.0)
+        else: scores.append(_ratio(distance(masks, len(user), org), len(org), len(user), metric))
+    return scores
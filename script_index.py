@@ -0,0 +1,97 @@
+from array import array
+from bisect import bisect_left
+
+from scoring import prepare
+from text_search import LineIndex
+
+# ---------------------------------------------------------
+# 대본 색인
+# ---------------------------------------------------------
+# 연습 화면은 매 rerun 마다 "다음 내 대사 / 직전 상대 대사(큐)" 를 찾아야 한다.
+# 줄이 들어올 때 한 번만 정규화/분류해 두고, rerun 에서는 표 조회만 한다.
+# 스트리밍 중에도 쓸 수 있도록 줄을 뒤에 덧붙이는 방식으로만 갱신한다.
+# 대본(CompactScript)처럼 세션마다 하나씩 들고 있으므로 줄 단위 값은 array 열로 두고,
+# 대본에서 다시 얻을 수 있는 텍스트(채점용 정규화 텍스트, 찾기용 텍스트)는 보관하지 않는다.
+class ScriptIndex:
+    def __init__(self):
+        self.role_names = []         # 역할 id -> 이름
+        self._role_ids = {}
+        self._role = array('H')      # i -> 역할 id
+        self._run_start = array('I') # i -> 같은 역할이 연속된 구간의 시작
+        self.page_first_line = {}    # 페이지 번호 -> 그 페이지에서 시작하는 첫 줄
+        self.role_counts = {}        # 역할 -> 연습할 줄 수 (정규화하면 비는 줄, 즉 괄호 지문뿐인 대사는 제외)
+        self._role_lines = {}        # 역할 -> 연습할 줄 번호 array('I') (오름차순)
+        self._search = LineIndex()   # i -> 원문 (대사 찾기, 원문은 대본에서 읽는다)
+
+    def __len__(self):
+        return len(self._role)
+
+    def add(self, entry):
+        i = len(self._role)
+        role = entry['role']
+        role_id = self._role_ids.get(role)
+        if role_id is None:
+            role_id = self._role_ids[role] = len(self.role_names)
+            self.role_names.append(role)
+        is_direction = len(prepare(entry['text'])) == 0
+        page = entry.get('page')
+
+        if page is not None and page not in self.page_first_line:
+            self.page_first_line[page] = i
+        self._run_start.append(self._run_start[i - 1] if i > 0 and self._role[i - 1] == role_id else i)
+        self._search.add(entry['text'])
+        self._role.append(role_id)
+
+        if is_direction: return
+        self.role_counts[role] = self.role_counts.get(role, 0) + 1
+        self._role_lines.setdefault(role, array('I')).append(i)
+
+    def sync(self, lines):
+        """lines 중 아직 색인하지 않은 뒷부분만 반영한다. (스트리밍 중 rerun 마다 호출)"""
+        for k in range(len(self._role), len(lines)):
+            self.add(lines[k])
+        return self
+
+    # --- 조회 ---
+    def role(self, i):
+        return self.role_names[self._role[i]]
+
+    def role_rank(self, i):
+        """i 가 같은 역할의 연습할 줄 중 몇 번째인지 (0부터, 해당 없으면 -1)"""
+        lines = self._role_lines.get(self.role(i), ())
+        k = bisect_left(lines, i)
+        return k if k < len(lines) and lines[k] == i else -1
+
+    def next_line(self, role, start):
+        """start 이후(포함) role 의 연습할 첫 줄. 아직 없으면 None."""
+        lines = self._role_lines.get(role)
+        if lines is None: return None
+        k = bisect_left(lines, start)
+        return lines[k] if k < len(lines) else None
+
+    def cue_before(self, index, start=0):
+        """index 직전의 다른 역할 줄(지문 포함). start 보다 앞이면 None."""
+        if index <= 0: return None
+        prev = index - 1
+        if self._role[prev] == self._role[index]:
+            prev = self._run_start[prev] - 1
+        return prev if prev >= start else None
+
+    def upcoming_cues(self, role, after_index, count):
+        """after_index 다음부터 role 의 연습할 줄 count 개 각각의 큐 (없는 경우 건너뜀)"""
+        cues = []
+        target = after_index
+        while len(cues) < count:
+            target = self.next_line(role, target + 1)
+            if target is None: break
+            cue = self.cue_before(target, after_index + 1)
+            if cue is not None: cues.append(cue)
+            after_index = target
+        return cues
+
+    def first_line_of_page(self, page):
+        return self.page_first_line.get(page)
+
+    def find(self, phrase, lines):
+        """phrase 가 들어 있는 줄 번호들 (공백 무시). lines: 색인한 대본 (sync 에 넘긴 것)"""
+        return self._search.search(phrase, lambda i: lines[i]['text'])
@@ -0,0 +1,574 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+from diagnostics import count, span
+from parse_cache import doc_key, get_parse_cache
+from text_search import NgramIndex, compact
+
+# ---------------------------------------------------------
+# 1. 페이지 모델
+# ---------------------------------------------------------
+# 단어 dict 에서 실제로 쓰는 키만 남겨 메모리를 줄인다.
+WORD_KEYS = ('text', 'x0', 'x1', 'top', 'bottom')
+
+
+@dataclass
+class ParsedPage:
+    index: int
+    width: float
+    height: float
+    words: list        # extract_words 결과 (top 정렬)
+    lines: list        # [{'text': str, 'words': [word, ...]}] - 줄 안의 단어는 x0 정렬
+    text_lines: list   # extract_text(layout=True) 의 줄을 앞뒤 공백 없이 (빈 줄 제외, 단어 사이 공백은 같음)
+    name_ends: list    # text_lines 마다 이름/대사 경계 (처음으로 2칸 이상 벌어진 곳, 없으면 0)
+
+
+@dataclass
+class PageLines:
+    """
+    넘버링에 필요한 줄 정보만 모은 것. (줄 텍스트 + 줄 첫 단어 좌표, ParsedPage.lines 와 같은 순서)
+    단어 목록/레이아웃 텍스트 없이 작게 보관하므로 배역이나 시작 위치만 바꿔 다시 넘버링할 때는
+    이것만으로 매칭한다.
+    """
+    index: int
+    height: float
+    texts: list    # 줄 텍스트
+    x0: list       # 줄 첫 단어 x0
+    bottom: list   # 줄 첫 단어 bottom
+
+
+def group_words_into_lines(words, y_gap=5):
+    """top 좌표가 y_gap 이내인 단어들을 한 줄로 묶는다."""
+    words = sorted(words, key=lambda w: w['top'])
+    grouped = []
+    if words:
+        current_line = [words[0]]
+        current_top = words[0]['top']
+        for w in words[1:]:
+            if abs(w['top'] - current_top) < y_gap:
+                current_line.append(w)
+            else:
+                grouped.append(current_line)
+                current_line = [w]
+                current_top = w['top']
+        grouped.append(current_line)
+
+    lines = []
+    for line_words in grouped:
+        line_words.sort(key=lambda w: w['x0'])
+        lines.append({
+            'text': " ".join([w['text'] for w in line_words]).strip(),
+            'words': line_words,
+        })
+    return words, lines
+
+
+def build_page(page_idx, width, height, words, text_lines, name_ends):
+    with span('pdf.group_lines'):
+        words = [{k: w[k] for k in WORD_KEYS} for w in words]
+        words, lines = group_words_into_lines(words)
+    return ParsedPage(
+        index=page_idx,
+        width=width,
+        height=height,
+        words=words,
+        lines=lines,
+        text_lines=text_lines,
+        name_ends=name_ends,
+    )
+
+
+def page_to_cache(parsed):
+    """영구 캐시에 넣을 dict. 줄 묶음은 단어에서 다시 만들 수 있으므로 저장하지 않는다."""
+    return {'width': parsed.width, 'height': parsed.height, 'words': parsed.words,
+            'text_lines': parsed.text_lines, 'name_ends': parsed.name_ends}
+
+
+def page_from_cache(page_idx, data):
+    return build_page(page_idx, data['width'], data['height'], data['words'], data['text_lines'], data['name_ends'])
+
+
+def page_lines(parsed):
+    lines = parsed.lines
+    return PageLines(
+        index=parsed.index,
+        height=parsed.height,
+        texts=[line['text'] for line in lines],
+        x0=[line['words'][0]['x0'] for line in lines],
+        bottom=[line['words'][0]['bottom'] for line in lines],
+    )
+
+
+def lines_to_cache(lines):
+    return {'height': lines.height, 'texts': lines.texts, 'x0': lines.x0, 'bottom': lines.bottom}
+
+
+def lines_from_cache(page_idx, data):
+    return PageLines(page_idx, data['height'], data['texts'], data['x0'], data['bottom'])
+
+
+# ---------------------------------------------------------
+# 2. 추출 백엔드 (pdfplumber / PyMuPDF)
+# ---------------------------------------------------------
+# 백엔드는 같은 모양의 단어 dict(text, x0, x1, top, bottom)와 레이아웃 줄(layout_lines)을 만들어야 한다.
+# 기본값은 SCRIPT_MATE_PDF_BACKEND 로, 호출마다 config['backend'] 로 바꿀 수 있다.
+DEFAULT_BACKEND = os.environ.get('SCRIPT_MATE_PDF_BACKEND', 'pdfplumber')
+
+# pdfplumber 기본값과 같은 값 (layout 텍스트의 줄/공백 재현용)
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+X_DENSITY = 7.25
+
+
+class PdfplumberDocument:
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_path):
+        self._pdf = pdfplumber.open(pdf_path)
+        self.page_count = len(self._pdf.pages)
+
+    def parse_page(self, page_idx):
+        page = self._pdf.pages[page_idx]
+        with span('pdf.extract_words'):
+            words = page.extract_words(x_tolerance=X_TOLERANCE, y_tolerance=Y_TOLERANCE, keep_blank_chars=True)
+        with span('pdf.layout_lines'):
+            text_lines, name_ends = layout_lines(chars_to_words(page.chars, keep_blank_chars=False))
+        parsed = build_page(page_idx, page.width, page.height, words, text_lines, name_ends)
+        page.close()
+        count('pages.parsed')
+        return parsed
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _cluster_by_top(objs, tolerance):
+    """pdfplumber cluster_objects 와 같은 방식: top 을 정렬해 tolerance 안쪽으로 이어지는 값끼리 묶는다."""
+    groups = []
+    last_top = None
+    for obj in sorted(objs, key=lambda o: o['top']):
+        if last_top is not None and obj['top'] <= last_top + tolerance:
+            groups[-1].append(obj)
+        else:
+            groups.append([obj])
+        last_top = obj['top']
+    return groups
+
+
+def chars_to_words(chars, keep_blank_chars):
+    """pdfplumber WordExtractor(x/y_tolerance=3) 의 단어 분리 규칙을 문자 목록에 적용한다."""
+    words = []
+
+    def merge(word_chars):
+        words.append({
+            'text': "".join(c['text'] for c in word_chars),
+            'x0': min(c['x0'] for c in word_chars),
+            'x1': max(c['x1'] for c in word_chars),
+            'top': min(c['top'] for c in word_chars),
+            'bottom': max(c['bottom'] for c in word_chars),
+        })
+
+    for line_chars in _cluster_by_top(chars, Y_TOLERANCE):
+        current = []
+        for c in sorted(line_chars, key=lambda c: c['x0']):
+            if not keep_blank_chars and c['text'].isspace():
+                if current: merge(current)
+                current = []
+                continue
+            if current:
+                prev = current[-1]
+                if c['x0'] < prev['x0'] or c['x0'] > prev['x1'] + X_TOLERANCE or abs(c['top'] - prev['top']) > Y_TOLERANCE:
+                    merge(current)
+                    current = []
+            current.append(c)
+        if current: merge(current)
+    return words
+
+
+def layout_lines(words):
+    """
+    extract_text(layout=True) 의 각 줄을 페이지 크기만큼 공백으로 채우지 않고 바로 만든다.
+    단어 사이 공백 수는 layout 과 같이 x0 를 X_DENSITY 칸으로 나눈 위치로 정하므로, 앞뒤 공백을 뺀 줄은 layout 과 같다.
+    이름/대사 경계는 처음으로 2칸 이상 벌어진 단어 사이다. (layout 줄을 '\\s{2,}|\\t' 로 나누던 것과 같음)
+    words 는 keep_blank_chars=False 로 나눈 단어. -> (줄 텍스트 목록, 이름 끝 위치 목록)
+    """
+    texts = []
+    name_ends = []
+    for line_words in _cluster_by_top(words, Y_TOLERANCE):
+        parts = []
+        text_len = 0  # 앞 공백을 뺀 줄 길이
+        line_len = 0  # 앞 공백을 포함한 layout 줄 길이 (칸 위치 계산용)
+        name_end = 0
+        for w in sorted(line_words, key=lambda w: w['x0']):
+            spaces = max(min(1, line_len), round(w['x0'] / X_DENSITY) - line_len)
+            if parts:
+                if spaces > 1 and not name_end: name_end = text_len
+                parts.append(" " * spaces)
+                text_len += spaces
+            parts.append(w['text'])
+            text_len += len(w['text'])
+            line_len += spaces + len(w['text'])
+        texts.append("".join(parts))
+        name_ends.append(name_end)
+    return texts, name_ends
+
+
+# 합성 공백을 끄고 원래 공백 문자는 살려야 pdfplumber 와 같은 문자 목록이 나온다.
+FITZ_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_INHIBIT_SPACES | fitz.TEXT_MEDIABOX_CLIP
+
+
+class FitzDocument:
+    name = 'fitz'
+
+    def __init__(self, pdf_path):
+        self._doc = fitz.open(pdf_path)
+        self.page_count = len(self._doc)
+
+    def page_chars(self, page):
+        chars = []
+        for block in page.get_text("rawdict", flags=FITZ_TEXT_FLAGS)['blocks']:
+            for line in block.get('lines', []):
+                for text_span in line['spans']:
+                    size = text_span['size']
+                    descender = text_span['descender']
+                    for ch in text_span['chars']:
+                        # pdfminer 와 같이 글자 높이 = 글꼴 크기, 아래쪽 = 기준선 - descender
+                        bottom = ch['origin'][1] - descender * size
+                        chars.append({
+                            'text': ch['c'],
+                            'x0': ch['bbox'][0],
+                            'x1': ch['bbox'][2],
+                            'top': bottom - size,
+                            'bottom': bottom,
+                        })
+        return chars
+
+    def parse_page(self, page_idx):
+        page = self._doc[page_idx]
+        width, height = page.rect.width, page.rect.height
+        with span('pdf.extract_words'):
+            chars = self.page_chars(page)
+            words = chars_to_words(chars, keep_blank_chars=True)
+        with span('pdf.layout_lines'):
+            text_lines, name_ends = layout_lines(chars_to_words(chars, keep_blank_chars=False))
+        count('pages.parsed')
+        return build_page(page_idx, width, height, words, text_lines, name_ends)
+
+    def close(self):
+        self._doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+BACKENDS = {
+    PdfplumberDocument.name: PdfplumberDocument,
+    FitzDocument.name: FitzDocument,
+}
+
+
+def open_document(pdf_path, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 PDF 백엔드: {backend}")
+    with span('pdf.open'):
+        return BACKENDS[backend](pdf_path)
+
+
+def document_page_count(pdf_path):
+    """페이지 수만 센다. (pdfplumber 는 여는 데만 페이지 수에 비례한 시간이 들어 백엔드와 무관하게 PyMuPDF 로 센다)"""
+    with span('pdf.open'):
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+
+
+def _parse_page_range(pdf_path, backend, start, stop):
+    """[워커 프로세스] start~stop-1 페이지를 파싱한다."""
+    with open_document(pdf_path, backend) as doc:
+        return [doc.parse_page(page_idx) for page_idx in range(start, stop)]
+
+
+# ---------------------------------------------------------
+# 3. 문서 모델 (페이지 단위 지연 파싱)
+# ---------------------------------------------------------
+# 병렬 파싱은 옵트인: SCRIPT_MATE_PARSE_WORKERS=4 처럼 워커 수를 지정한다. (0/1 = 직렬)
+PARSE_WORKERS = int(os.environ.get('SCRIPT_MATE_PARSE_WORKERS', '0') or 0)
+# 남은 페이지가 이보다 적으면 프로세스 기동 비용이 더 커서 직렬로 처리한다.
+MIN_PARALLEL_PAGES = 16
+# 직렬 파싱 중 이만큼 모이면 영구 캐시에 한 번에 기록한다.
+CACHE_WRITE_PAGES = 16
+
+
+class ParsedScript:
+    """
+    PDF 한 개의 파싱 결과. 페이지는 처음 요청될 때 한 번만 파싱된다.
+    파싱하기 전에 영구 캐시(parse_cache)를 먼저 보고, 새로 파싱한 페이지는 캐시에 기록한다.
+    넘버링용 줄 정보(PageLines)는 페이지와 따로 보관/캐시해 다시 넘버링할 때 페이지를 읽지 않는다.
+    """
+
+    def __init__(self, pdf_path, content_hash, backend=None):
+        self.pdf_path = pdf_path
+        self.content_hash = content_hash
+        self.backend = backend or DEFAULT_BACKEND
+        self._pages = {}
+        self._lines = {}              # 페이지 idx -> PageLines
+        # 줄 묶음별(False: 단어 묶음 lines, True: 레이아웃 text_lines) (페이지, 줄) -> 줄 텍스트. 처음 찾을 때 색인한다.
+        self._phrases = {False: NgramIndex(), True: NgramIndex()}
+        self._indexed = {False: set(), True: set()}  # 색인에 넣은 페이지
+        self._lock = threading.RLock()
+        self.cache_key = doc_key(content_hash, self.backend)
+        self.page_count = document_page_count(pdf_path)
+
+    def page(self, page_idx):
+        with self._lock:
+            if page_idx not in self._pages:
+                self._load_cached([page_idx])
+            if page_idx not in self._pages:
+                with open_document(self.pdf_path, self.backend) as doc:
+                    parsed = doc.parse_page(page_idx)
+                self._store(parsed)
+                self._save([parsed])
+            return self._pages[page_idx]
+
+    def _load_cached(self, page_indices):
+        # self._lock 안에서 호출
+        cache = get_parse_cache()
+        if cache is None or not page_indices: return
+        for item, data in cache.get_many(self.cache_key, 'page', page_indices).items():
+            self._store(page_from_cache(int(item), data))
+
+    def _save(self, parsed_pages):
+        cache = get_parse_cache()
+        if cache is None or not parsed_pages: return
+        cache.put_many(self.cache_key, 'page', {parsed.index: page_to_cache(parsed) for parsed in parsed_pages})
+
+    def _store(self, parsed):
+        # self._lock 안에서 호출
+        if parsed.index in self._pages: return
+        self._pages[parsed.index] = parsed
+        if parsed.index not in self._lines: self._lines[parsed.index] = page_lines(parsed)
+
+    def iter_page_lines(self, start=0):
+        """
+        start 페이지부터 순서대로 PageLines 를 돌려준다.
+        메모리 -> 영구 캐시('lines') 순으로 찾고, 없는 페이지만 iter_pages 로 읽은 뒤 캐시에 기록한다.
+        """
+        start = max(0, start)
+        with self._lock:
+            missing = [i for i in range(start, self.page_count) if i not in self._lines]
+            if missing:
+                self._load_cached_lines(missing)
+                missing = [i for i in missing if i not in self._lines]
+        if not missing:
+            return (self._lines[i] for i in range(start, self.page_count))
+        return self._iter_page_lines_from_pages(start, missing)
+
+    def _iter_page_lines_from_pages(self, start, missing):
+        try:
+            for parsed in self.iter_pages(start):
+                yield self._lines[parsed.index]
+        finally:
+            cache = get_parse_cache()
+            if cache is not None:
+                with self._lock:
+                    fresh = {i: lines_to_cache(self._lines[i]) for i in missing if i in self._lines}
+                cache.put_many(self.cache_key, 'lines', fresh)
+
+    def _load_cached_lines(self, page_indices):
+        # self._lock 안에서 호출
+        cache = get_parse_cache()
+        if cache is None: return
+        for item, data in cache.get_many(self.cache_key, 'lines', page_indices).items():
+            self._lines[int(item)] = lines_from_cache(int(item), data)
+
+    def iter_pages(self, start=0, workers=None):
+        """
+        start 페이지부터 순서대로 ParsedPage 를 돌려준다.
+        workers > 1 이면 아직 파싱되지 않은 페이지를 구간별로 나눠 프로세스 풀에서 파싱하고,
+        결과는 항상 페이지 순서대로 내보낸다. (페이지 간 상태는 호출 측에서 순서대로 처리)
+        """
+        workers = PARSE_WORKERS if workers is None else workers
+        start = max(0, start)
+        with self._lock:
+            missing = [i for i in range(start, self.page_count) if i not in self._pages]
+            if missing:
+                self._load_cached(missing)
+                missing = [i for i in missing if i not in self._pages]
+        if workers > 1 and len(missing) >= MIN_PARALLEL_PAGES:
+            return self._iter_pages_parallel(start, missing, workers)
+        return self._iter_pages_serial(start)
+
+    def _iter_pages_serial(self, start):
+        doc = None
+        fresh = []  # 아직 영구 캐시에 기록하지 않은 페이지
+        try:
+            for page_idx in range(start, self.page_count):
+                with self._lock:
+                    parsed = self._pages.get(page_idx)
+                    if parsed is None:
+                        if doc is None:
+                            doc = open_document(self.pdf_path, self.backend)
+                        parsed = doc.parse_page(page_idx)
+                        self._store(parsed)
+                        fresh.append(parsed)
+                if len(fresh) >= CACHE_WRITE_PAGES:
+                    self._save(fresh)
+                    fresh = []
+                yield parsed
+        finally:
+            if doc is not None:
+                doc.close()
+            self._save(fresh)
+
+    def _iter_pages_parallel(self, start, missing, workers):
+        # 연속 구간으로 나눠야 워커마다 파일을 한 번만 연다.
+        chunk_size = min(32, max(4, -(-len(missing) // (workers * 2))))
+        ranges = []
+        for page_idx in missing:
+            if ranges and ranges[-1][1] == page_idx and ranges[-1][1] - ranges[-1][0] < chunk_size:
+                ranges[-1][1] = page_idx + 1
+            else:
+                ranges.append([page_idx, page_idx + 1])
+
+        # 스레드가 많은 Streamlit 서버에서 fork 는 안전하지 않으므로 spawn 을 쓴다.
+        ctx = multiprocessing.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        try:
+            futures = [pool.submit(_parse_page_range, self.pdf_path, self.backend, a, b) for a, b in ranges]
+            next_idx = start
+            for future in futures:
+                with span('pdf.parallel_wait'):
+                    chunk = future.result()
+                count('pages.parsed', len(chunk))
+                with self._lock:
+                    for parsed in chunk:
+                        self._store(parsed)
+                self._save(chunk)
+                # 앞서 이미 캐시돼 있던 페이지도 순서대로 함께 내보낸다.
+                stop = chunk[-1].index + 1 if chunk else next_idx
+                for page_idx in range(next_idx, stop):
+                    yield self._pages[page_idx]
+                next_idx = stop
+            for page_idx in range(next_idx, self.page_count):
+                yield self._pages[page_idx]
+        finally:
+            # 호출 측이 중간에 멈추면(작업 취소, 시작 문구를 찾음 등) 남은 구간을 기다리지 않고 취소한다.
+            # 이미 워커에서 돌고 있는 구간은 끝까지 돌지만 결과는 버려진다.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def pages(self):
+        return list(self.iter_pages())
+
+    def find_phrase(self, phrase, start=0, layout=False):
+        """
+        start 페이지부터 phrase 가 들어 있는 줄(공백 무시)을 모두 찾는다.
+        layout=False 면 넘버링이 읽는 단어 묶음 줄(lines), True 면 연습용 추출이 읽는 레이아웃 줄(text_lines)에서 찾는다.
+        두 줄 묶음은 글자 크기가 섞인 페이지에서 다르게 나뉠 수 있으므로, 결과를 쓸 쪽의 줄 묶음으로 찾아야 한다.
+        [{'page', 'line', 'text', 'phrase', 'layout'}] (line = 그 줄 묶음에서의 줄 idx)
+        """
+        if len(self._pages) < self.page_count:
+            for _ in self.iter_pages(start): pass  # 아직 파싱되지 않은 페이지를 색인에 넣는다.
+        index, indexed = self._phrases[layout], self._indexed[layout]
+        with self._lock:
+            for page_idx, parsed in self._pages.items():
+                if page_idx in indexed: continue
+                indexed.add(page_idx)
+                texts = parsed.text_lines if layout else [line['text'] for line in parsed.lines]
+                for line_idx, text in enumerate(texts):
+                    index.add((page_idx, line_idx), text)
+            keys = index.search(phrase)
+        hits = []
+        for page_idx, line_idx in keys:
+            if page_idx < start: continue
+            parsed = self._pages[page_idx]
+            hits.append({
+                'page': page_idx,
+                'line': line_idx,
+                'text': parsed.text_lines[line_idx] if layout else parsed.lines[line_idx]['text'],
+                'phrase': compact(phrase),
+                'layout': layout,
+            })
+        return hits
+
+
+# ---------------------------------------------------------
+# 4. 내용 해시 기반 캐시
+# ---------------------------------------------------------
+MAX_CACHED_SCRIPTS = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# 화면은 rerun 마다 load_script 를 부르므로, 파일이 그대로면(경로/수정 시각/크기) 내용 해시를 다시 계산하지 않는다.
+MAX_HASHED_FILES = 64
+
+_hashes = OrderedDict()  # (경로, st_mtime_ns, st_size) -> sha256
+_hashes_lock = threading.Lock()
+
+
+def file_content_hash(pdf_path):
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+    with _hashes_lock:
+        digest = _hashes.get(key)
+        if digest is not None:
+            _hashes.move_to_end(key)
+            return digest
+
+    h = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _hashes_lock:
+        _hashes[key] = digest
+        while len(_hashes) > MAX_HASHED_FILES:
+            _hashes.popitem(last=False)
+    return digest
+
+
+def load_script(pdf_path, backend=None):
+    """같은 내용의 PDF 는 경로가 달라도 같은 ParsedScript 를 재사용한다. (백엔드별로 따로 캐시)"""
+    backend = backend or DEFAULT_BACKEND
+    key = (file_content_hash(pdf_path), backend)
+    with _cache_lock:
+        parsed = _cache.get(key)
+        if parsed is not None:
+            _cache.move_to_end(key)
+            parsed.pdf_path = pdf_path
+            count('cache.script.hit')
+            return parsed
+
+    count('cache.script.miss')
+    parsed = ParsedScript(pdf_path, key[0], backend)
+    with _cache_lock:
+        parsed = _cache.setdefault(key, parsed)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_SCRIPTS:
+            _cache.popitem(last=False)
+    return parsed
+
+
+def clear_script_cache():
+    """메모리 캐시를 비운다. (벤치마크에서 매번 처음부터 파싱할 때)"""
+    with _cache_lock:
+        _cache.clear()
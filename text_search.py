@@ -0,0 +1,91 @@
+from array import array
+
+# ---------------------------------------------------------
+# 공백 무시 n-gram 색인 (시작 문구 / 대사 찾기)
+# ---------------------------------------------------------
+_WHITESPACE = str.maketrans('', '', ' \t\n')
+
+
+def compact(text):
+    """비교용: 공백/탭/줄바꿈 제거 (시작 문구 비교 규칙과 같음)"""
+    return text.translate(_WHITESPACE)
+
+
+class NgramIndex:
+    """
+    key -> 텍스트 를 글자 2-gram 으로 색인한다.
+    검색은 문구의 2-gram 목록 교집합으로 후보를 좁힌 뒤 부분 문자열 검사로 확정한다.
+    """
+
+    def __init__(self):
+        self._texts = {}     # key -> compact 텍스트
+        self._postings = {}  # 2-gram(한 글자 문구용 1-gram 포함) -> key 집합
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, key, text):
+        text = compact(text)
+        self._texts[key] = text
+        for gram in set(text):
+            self._postings.setdefault(gram, set()).add(key)
+        for gram in {text[i:i + 2] for i in range(len(text) - 1)}:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def search(self, phrase):
+        """phrase 를 포함하는 key 를 정렬해서 돌려준다."""
+        phrase = compact(phrase)
+        if not phrase: return []
+        if len(phrase) == 1:
+            return sorted(self._postings.get(phrase, ()))
+        grams = {phrase[i:i + 2] for i in range(len(phrase) - 1)}
+        postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        if not postings[0]: return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates: return []
+        return sorted(key for key in candidates if phrase in self._texts[key])
+
+
+class LineIndex:
+    """
+    0, 1, 2 ... 차례로 붙는 줄 번호 -> 텍스트 를 NgramIndex 와 같은 방식으로 색인한다. (연습 대본의 대사 찾기)
+    세션마다 하나씩 대본 전체를 색인하므로 색인 목록은 줄 번호 오름차순 array('I') 로 두고,
+    텍스트는 보관하지 않고 검색할 때 text_of(줄 번호) 로 받아 확인한다.
+    """
+
+    def __init__(self):
+        self._postings = {}  # 2-gram(한 글자 문구용 1-gram 포함) -> 줄 번호 array('I')
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, text):
+        """다음 줄 번호로 text 를 색인하고 그 번호를 돌려준다."""
+        i = self._count
+        text = compact(text)
+        for gram in set(text) | {text[k:k + 2] for k in range(len(text) - 1)}:
+            posting = self._postings.get(gram)
+            if posting is None:
+                self._postings[gram] = array('I', (i,))
+            else:
+                posting.append(i)
+        self._count += 1
+        return i
+
+    def search(self, phrase, text_of):
+        """phrase 를 포함하는 줄 번호를 오름차순으로 돌려준다."""
+        phrase = compact(phrase)
+        if not phrase: return []
+        if len(phrase) == 1:
+            return list(self._postings.get(phrase, ()))
+        grams = {phrase[k:k + 2] for k in range(len(phrase) - 1)}
+        postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        if not postings[0]: return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates: return []
+        return sorted(i for i in candidates if phrase in compact(text_of(i)))
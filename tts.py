@@ -0,0 +1,422 @@
+import asyncio
+import hashlib
+import io
+import math
+import os
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+import edge_tts
+
+from diagnostics import count, span
+
+# ---------------------------------------------------------
+# 1. 오디오 캐시 (메모리 + 디스크, 용량 제한 LRU)
+# ---------------------------------------------------------
+# 같은 대사/목소리/속도는 한 번만 합성한다. 서버 전체(모든 세션)가 공유한다.
+MEMORY_LIMIT_BYTES = int(os.environ.get('SCRIPT_MATE_TTS_MEMORY_MB', '64')) * 1024 * 1024
+DISK_LIMIT_BYTES = int(os.environ.get('SCRIPT_MATE_TTS_DISK_MB', '512')) * 1024 * 1024
+DISK_DIR = os.environ.get('SCRIPT_MATE_TTS_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'script_mate_tts')
+# 디스크 폴더는 여러 프로세스/복제본이 함께 쓸 수 있다. 용량 상한은 폴더 전체 기준이므로
+# 상한을 넘었거나 이 간격이 지나면 폴더를 다시 읽어 다른 곳에서 쓴 파일까지 센다.
+DISK_SCAN_SECONDS = int(os.environ.get('SCRIPT_MATE_TTS_DISK_SCAN_SECONDS', '60'))
+
+
+def audio_cache_key(text, voice, rate, provider=None):
+    provider = provider or get_tts_provider().name
+    return hashlib.sha256(f"{provider}\n{voice}\n{rate}\n{text}".encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """
+    key -> 오디오 bytes. 메모리 계층에서 밀려난 항목은 디스크 계층에 남고,
+    두 계층 모두 바이트 상한을 넘으면 가장 오래 쓰이지 않은 항목부터 지운다.
+    디스크 색인에 없는 key 는 파일이 있는지 확인해, 다른 프로세스가 쓴 파일이면 받아들인다.
+    """
+
+    def __init__(self, memory_limit=MEMORY_LIMIT_BYTES, disk_dir=DISK_DIR, disk_limit=DISK_LIMIT_BYTES):
+        self.memory_limit = memory_limit
+        self.disk_dir = disk_dir
+        self.disk_limit = disk_limit
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()    # key -> size
+        self._disk_bytes = 0
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir and self.disk_limit > 0:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.audio")
+
+    def _load_disk_index(self):
+        # 재시작 후에도 디스크 계층을 이어 쓴다.
+        self._scan_disk()
+        self._evict_disk()
+
+    def _scan_disk(self):
+        """폴더를 다시 읽어 색인을 맞춘다. (다른 프로세스가 쓰거나 지운 파일 반영, 수정 시각 = 마지막 사용 시각)"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.audio'): continue
+            try:
+                st = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-len('.audio')], st.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_bytes = sum(self._disk.values())
+        self._last_scan = time.monotonic()
+
+    def _adopt_disk(self, key):
+        """색인에 없는 key 의 파일이 폴더에 있으면(다른 프로세스가 씀) 색인에 넣는다. 있으면 True."""
+        if not self.disk_dir or self.disk_limit <= 0: return False
+        try:
+            size = os.stat(self._disk_path(key)).st_size
+        except OSError:
+            return False
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = size
+                self._disk_bytes += size
+        return True
+
+    def _put_memory(self, key, data):
+        if len(data) > self.memory_limit: return
+        old = self._memory.pop(key, None)
+        if old is not None: self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        if self._disk_bytes > self.disk_limit or time.monotonic() - self._last_scan > DISK_SCAN_SECONDS:
+            self._scan_disk()
+        while self._disk_bytes > self.disk_limit and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def contains(self, key):
+        """적중/실패 통계에 영향 없이 존재 여부만 확인한다."""
+        with self._lock:
+            if key in self._memory or key in self._disk: return True
+        return self._adopt_disk(key)
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            indexed = key in self._disk
+        if not indexed and not self._adopt_disk(key):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._disk_path(key))
+        except OSError:
+            # 다른 프로세스가 지웠을 수 있다.
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None: self._disk_bytes -= size
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._disk: self._disk.move_to_end(key)
+            self._put_memory(key, data)
+            self.disk_hits += 1
+        return data
+
+    def put(self, key, data):
+        if not data: return
+        with self._lock:
+            self._put_memory(key, data)
+            if not self.disk_dir or self.disk_limit <= 0 or len(data) > self.disk_limit or key in self._disk:
+                return
+        if self._adopt_disk(key): return
+        # 원자적으로 기록 (여러 프로세스가 같은 폴더를 공유해도 깨진 파일이 보이지 않도록)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            return
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_items': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_items': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+            }
+
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache()
+        return _audio_cache
+
+
+def set_audio_cache(cache):
+    global _audio_cache
+    with _audio_cache_lock:
+        _audio_cache = cache
+
+
+# ---------------------------------------------------------
+# 2. 음성 합성 제공자 (Edge TTS / 오프라인 스텁)
+# ---------------------------------------------------------
+class EdgeTTSProvider:
+    name = 'edge'
+    mime_type = 'audio/mp3'
+
+    async def synthesize(self, text, voice, rate_str):
+        communicate = edge_tts.Communicate(text, voice, rate=rate_str)
+        chunks = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                chunks.append(chunk["data"])
+        return b"".join(chunks)
+
+
+class StubTTSProvider:
+    """
+    네트워크 없이 쓰는 결정적 대역. 같은 입력이면 항상 같은 WAV 를 만들고,
+    latency(+ 글자당 지연)만큼 기다려 실제 합성 시간을 흉내 낸다. (벤치마크/스테이징용)
+    """
+    name = 'stub'
+    mime_type = 'audio/wav'
+
+    def __init__(self, latency=0.3, per_char_latency=0.0, sample_rate=8000):
+        self.latency = latency
+        self.per_char_latency = per_char_latency
+        self.sample_rate = sample_rate
+
+    def render(self, text, voice, rate_str):
+        seed = int(hashlib.sha256(f"{voice}\n{rate_str}\n{text}".encode('utf-8')).hexdigest()[:8], 16)
+        freq = 220 + seed % 440
+        n_samples = int(self.sample_rate * min(10.0, 0.08 * max(1, len(text))))
+        frames = bytearray()
+        for i in range(n_samples):
+            value = int(8000 * math.sin(2 * math.pi * freq * i / self.sample_rate))
+            frames += value.to_bytes(2, 'little', signed=True)
+        buf = io.BytesIO()
+        with wave.open(buf, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(bytes(frames))
+        return buf.getvalue()
+
+    async def synthesize(self, text, voice, rate_str):
+        await asyncio.sleep(self.latency + self.per_char_latency * len(text))
+        return self.render(text, voice, rate_str)
+
+
+def _provider_from_env():
+    name = os.environ.get('SCRIPT_MATE_TTS_PROVIDER', 'edge')
+    if name == 'stub':
+        latency_ms = float(os.environ.get('SCRIPT_MATE_TTS_STUB_LATENCY_MS', '300'))
+        return StubTTSProvider(latency=latency_ms / 1000)
+    return EdgeTTSProvider()
+
+
+_provider = None
+
+
+def get_tts_provider():
+    global _provider
+    if _provider is None:
+        _provider = _provider_from_env()
+    return _provider
+
+
+def set_tts_provider(provider):
+    """제공자를 바꾼다. 캐시 키에 제공자 이름이 들어가므로 이전 오디오와 섞이지 않는다."""
+    global _provider
+    _provider = provider
+
+
+async def synthesize(text, voice, rate_str):
+    """오디오 bytes 를 돌려준다. 캐시에 있으면 합성하지 않는다. 합성 결과가 없으면 b""."""
+    provider = get_tts_provider()
+    cache = get_audio_cache()
+    key = audio_cache_key(text, voice, rate_str, provider.name)
+    audio_data = cache.get(key)
+    if audio_data is not None:
+        return audio_data
+
+    audio_data = await provider.synthesize(text, voice, rate_str)
+    cache.put(key, audio_data)
+    return audio_data
+
+
+# ---------------------------------------------------------
+# 3. 백그라운드 합성 워커 + 미리 합성(prefetch)
+# ---------------------------------------------------------
+PREFETCH_CONCURRENCY = int(os.environ.get('SCRIPT_MATE_TTS_CONCURRENCY', '4'))
+
+
+class SynthesisWorker:
+    """
+    서버 전체가 공유하는 이벤트 루프 스레드에서 합성을 돌린다.
+    같은 음성을 동시에 여러 곳에서 요청하면 진행 중인 작업 하나를 함께 기다린다.
+    작업마다 요청자(owner)를 세어, 아무도 원하지 않게 되면 취소한다.
+    미리 합성은 동시 실행 수(max_concurrency)를 나눠 쓰고, 지금 재생할 큐(foreground)는
+    그 줄을 서지 않는다. 차례를 기다리던 미리 합성을 지금 재생하려 하면 그 작업을 취소하고 바로 합성한다.
+    """
+
+    def __init__(self, max_concurrency=PREFETCH_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = None  # 워커 루프 안에서 만든다 (3.9 의 Semaphore 는 만들 때의 루프에 묶인다)
+        self._inflight = {}  # key -> [future, owners, started]
+        self._lock = threading.Lock()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+    async def _run(self, text, voice, rate_str, started):
+        if started.is_set():
+            return await synthesize(text, voice, rate_str)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            started.set()
+            return await synthesize(text, voice, rate_str)
+
+    def _finished(self, key, future):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is future:
+                del self._inflight[key]
+
+    def submit(self, text, voice, rate_str, owner, foreground=False):
+        """concurrent.futures.Future(오디오 bytes) 를 돌려준다."""
+        key = audio_cache_key(text, voice, rate_str)
+        queued = None
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and not entry[0].cancelled():
+                if not foreground or entry[2].is_set():
+                    entry[1].add(owner)
+                    return entry[0]
+                queued = entry[0]
+            started = threading.Event()
+            if foreground: started.set()
+            future = asyncio.run_coroutine_threadsafe(self._run(text, voice, rate_str, started), self._loop)
+            self._inflight[key] = [future, {owner}, started]
+        if queued is not None:
+            # 미리 합성한 쪽(CuePrefetcher)은 다음 schedule() 에서 취소된 작업을 보고 이 작업에 다시 붙는다.
+            queued.cancel()
+            count('tts.prefetch.promoted')
+        future.add_done_callback(lambda f: self._finished(key, f))
+        return future
+
+    def release(self, key, owner):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is None: return
+            entry[1].discard(owner)
+            if entry[1]: return
+        # cancel() 이 완료 콜백(_finished)을 바로 부르므로 잠금 밖에서 취소한다.
+        entry[0].cancel()
+
+
+_worker = None
+
+
+def get_synthesis_worker():
+    global _worker
+    with _audio_cache_lock:
+        if _worker is None:
+            _worker = SynthesisWorker()
+        return _worker
+
+
+def get_audio(text, voice, rate_str, timeout=30):
+    """동기 버전. 미리 합성 중인 같은 음성이 있으면 그 결과를 기다린다. 미리 합성의 동시 실행 제한은 받지 않는다."""
+    with span('tts.get_audio'):
+        cache = get_audio_cache()
+        key = audio_cache_key(text, voice, rate_str)
+        audio_data = cache.get(key)
+        if audio_data is not None:
+            count('tts.cache.hit')
+            count('tts.bytes', len(audio_data))
+            return audio_data
+        count('tts.cache.miss')
+        owner = object()
+        worker = get_synthesis_worker()
+        future = worker.submit(text, voice, rate_str, owner, foreground=True)
+        try:
+            with span('tts.wait_synthesis'):
+                audio_data = future.result(timeout=timeout)
+        finally:
+            worker.release(key, owner)
+        count('tts.bytes', len(audio_data))
+        return audio_data
+
+
+class CuePrefetcher:
+    """
+    세션별 미리 합성 목록. schedule() 을 부를 때마다 새 목록에 없는 작업
+    (번호 점프, 속도 변경 등으로 더 이상 필요 없는 큐)은 취소하고 새 큐만 추가한다.
+    """
+
+    def __init__(self):
+        self._pending = {}  # key -> future
+
+    def schedule(self, cues):
+        """cues: [(text, voice, rate_str), ...]"""
+        cache = get_audio_cache()
+        worker = get_synthesis_worker()
+        wanted = {audio_cache_key(*cue): cue for cue in cues}
+
+        for key in list(self._pending):
+            if key not in wanted or self._pending[key].done():
+                worker.release(key, self)
+                del self._pending[key]
+
+        for key, (text, voice, rate_str) in wanted.items():
+            if key in self._pending or cache.contains(key): continue
+            self._pending[key] = worker.submit(text, voice, rate_str, self)
+            count('tts.prefetch.submitted')
+
+    def cancel(self):
+        self.schedule([])
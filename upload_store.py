@@ -0,0 +1,207 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from diagnostics import count, span
+
+# ---------------------------------------------------------
+# 업로드 저장소 (내용 해시 중복 제거, 세션 참조, TTL/용량 제한)
+# ---------------------------------------------------------
+# 업로드한 PDF 는 내용 SHA-256 폴더에 한 번만 저장하고, 넘버링 결과 같은 파생 파일도 같은 폴더에 둔다.
+#   {root}/{sha256}/source.pdf
+#   {root}/{sha256}/{파생 파일}
+# 원본을 지우면 파생 파일도 함께 지워진다.
+UPLOAD_DIR = os.environ.get('SCRIPT_MATE_UPLOAD_DIR') or os.path.join(tempfile.gettempdir(), 'script_mate_uploads')
+QUOTA_BYTES = int(os.environ.get('SCRIPT_MATE_UPLOAD_QUOTA_MB', '1024')) * 1024 * 1024
+TTL_SECONDS = float(os.environ.get('SCRIPT_MATE_UPLOAD_TTL_HOURS', '24')) * 3600
+# 세션은 끝날 때 알려 주지 않으므로, 이 시간 동안 touch 가 없으면 참조가 끝난 것으로 본다.
+LEASE_SECONDS = float(os.environ.get('SCRIPT_MATE_UPLOAD_LEASE_MINUTES', '60')) * 60
+# 새 업로드가 없어도 TTL/용량 제한이 지켜지도록 touch 에서도 정리한다. (이 간격에 한 번)
+SWEEP_SECONDS = float(os.environ.get('SCRIPT_MATE_UPLOAD_SWEEP_SECONDS', '300'))
+
+SOURCE_NAME = 'source.pdf'
+
+
+class UploadStore:
+    def __init__(self, root=UPLOAD_DIR, quota_bytes=QUOTA_BYTES, ttl=TTL_SECONDS, lease=LEASE_SECONDS, sweep_interval=SWEEP_SECONDS):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.ttl = ttl
+        self.lease = lease
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._entries = OrderedDict()  # digest -> {'bytes', 'last_used'} (오래 안 쓴 순)
+        self._refs = {}                # digest -> {owner: 마지막 touch 시각}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    # --- 경로 ---
+    def _entry_dir(self, digest):
+        return os.path.join(self.root, digest)
+
+    def source_path(self, digest):
+        return os.path.join(self._entry_dir(digest), SOURCE_NAME)
+
+    def derived_path(self, digest, name):
+        """원본에 딸린 파생 파일 경로. 다 쓰고 나면 record_derived 로 크기를 반영한다."""
+        return os.path.join(self._entry_dir(digest), name)
+
+    @staticmethod
+    def _dir_bytes(path):
+        total = 0
+        for name in os.listdir(path):
+            try:
+                total += os.path.getsize(os.path.join(path, name))
+            except OSError:
+                pass
+        return total
+
+    def _load_index(self):
+        # 재시작 후에도 이어 쓴다. (폴더 수정 시각 = 마지막 사용 시각)
+        found = []
+        for digest in os.listdir(self.root):
+            path = self._entry_dir(digest)
+            if not os.path.isfile(os.path.join(path, SOURCE_NAME)): continue
+            try:
+                found.append((os.stat(path).st_mtime, digest, self._dir_bytes(path)))
+            except OSError:
+                continue
+        for last_used, digest, size in sorted(found):
+            self._entries[digest] = {'bytes': size, 'last_used': last_used}
+            self._total_bytes += size
+        with self._lock:
+            self._evict(time.time())
+
+    # --- 참조 ---
+    def _touch(self, digest, owner, now):
+        entry = self._entries.get(digest)
+        if entry is None: return False
+        entry['last_used'] = now
+        self._entries.move_to_end(digest)
+        if owner is not None:
+            self._refs.setdefault(digest, {})[owner] = now
+        return True
+
+    def touch(self, digest, owner=None):
+        """세션이 계속 쓰고 있음을 알린다. (rerun 마다 호출) 저장소에 없으면 False."""
+        now = time.time()
+        with self._lock:
+            ok = self._touch(digest, owner, now)
+            if now - self._last_sweep >= self.sweep_interval:
+                self._evict(now, keep=digest)
+        if ok:
+            try:
+                os.utime(self._entry_dir(digest))
+            except OSError:
+                pass
+        return ok
+
+    def release(self, digest, owner):
+        with self._lock:
+            refs = self._refs.get(digest)
+            if refs is not None:
+                refs.pop(owner, None)
+                if not refs: del self._refs[digest]
+
+    def _live_refs(self, digest, now):
+        refs = self._refs.get(digest)
+        if not refs: return 0
+        for owner in [o for o, seen in refs.items() if now - seen > self.lease]:
+            del refs[owner]
+        if not refs: del self._refs[digest]
+        return len(refs)
+
+    # --- 저장 ---
+    def put(self, data, owner=None):
+        """PDF bytes 를 저장하고 (digest, 원본 경로) 를 돌려준다. 같은 내용이면 다시 쓰지 않는다."""
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            exists = digest in self._entries and os.path.isfile(self.source_path(digest))
+            if exists:
+                self._touch(digest, owner, now)
+        if not exists:
+            entry_dir = self._entry_dir(digest)
+            os.makedirs(entry_dir, exist_ok=True)
+            # 원자적으로 기록 (같은 파일을 동시에 올려도 깨진 PDF 가 보이지 않도록)
+            with span('upload.save'):
+                fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.source_path(digest))
+            count('bytes.written', len(data))
+            with self._lock:
+                if digest not in self._entries:
+                    self._entries[digest] = {'bytes': len(data), 'last_used': now}
+                    self._total_bytes += len(data)
+                self._touch(digest, owner, now)
+        with self._lock:
+            self._evict(now, keep=digest)
+        return digest, self.source_path(digest)
+
+    def record_derived(self, digest, path):
+        """파생 파일을 다 쓴 뒤 호출 -> 용량 계산에 넣는다."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None: return
+            size = self._dir_bytes(self._entry_dir(digest))
+            self._total_bytes += size - entry['bytes']
+            entry['bytes'] = size
+            self._evict(time.time(), keep=digest)
+
+    # --- 정리 ---
+    def _remove(self, digest):
+        entry = self._entries.pop(digest)
+        self._total_bytes -= entry['bytes']
+        self._refs.pop(digest, None)
+        self.evictions += 1
+        shutil.rmtree(self._entry_dir(digest), ignore_errors=True)
+
+    def _evict(self, now, keep=None):
+        """self._lock 안에서 호출. 참조 중인 항목(과 keep)은 지우지 않는다."""
+        self._last_sweep = now
+        # 1) TTL 이 지난 항목
+        for digest, entry in list(self._entries.items()):
+            if now - entry['last_used'] <= self.ttl: break  # 오래 안 쓴 순이므로 여기서 끝
+            if digest != keep and not self._live_refs(digest, now):
+                self._remove(digest)
+        # 2) 용량 초과 -> 오래 안 쓴 항목부터
+        if self._total_bytes <= self.quota_bytes: return
+        for digest in list(self._entries):
+            if self._total_bytes <= self.quota_bytes: break
+            if digest != keep and not self._live_refs(digest, now):
+                self._remove(digest)
+
+    def cleanup(self):
+        with self._lock:
+            self._evict(time.time())
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return {
+                'items': len(self._entries),
+                'bytes': self._total_bytes,
+                'quota_bytes': self.quota_bytes,
+                'referenced': sum(1 for digest in self._entries if self._live_refs(digest, now)),
+                'evictions': self.evictions,
+            }
+
+
+_upload_store = None
+_upload_store_lock = threading.Lock()
+
+
+def get_upload_store():
+    global _upload_store
+    with _upload_store_lock:
+        if _upload_store is None:
+            _upload_store = UploadStore()
+        return _upload_store